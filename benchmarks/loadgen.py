@@ -0,0 +1,354 @@
+"""
+End-to-end load test of the game server with headless bot players.
+
+Starts a local uvicorn worker of codejam.server:app, plays a number of rooms with bots
+drawing strokes and guessing in the chat, and reports broadcast latency, message
+throughput and CPU and memory of the server. Runs offline on a single Linux box:
+
+    python -m benchmarks.loadgen --rooms 10 --players 5 --duration 30
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import websockets
+
+from codejam.serialization import dumps, loads
+from codejam.server.interfaces.topics import (
+    ChatOperations,
+    DrawOperations,
+    GameOperations,
+    HeartbeatOperations,
+    TopicEnum,
+)
+
+WORDS = ["cat", "house", "tree", "sun", "boat", "dog", "car", "apple", "moon", "river"]
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Returns q-th percentile of values, None when there are none."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+class Stats:
+    """Measurements shared by all bots of the run."""
+
+    def __init__(self):
+        self.sent_at: Dict[str, float] = {}
+        self.latencies: List[float] = []
+        self.sent = 0
+        self.received = 0
+        self.errors: Dict[str, int] = {}
+        self.turns = 0
+
+    def track(self, key: str) -> None:
+        """Remember when a message with the key was sent."""
+        self.sent_at[key] = time.perf_counter()
+        self.sent += 1
+
+    def arrived(self, key: Optional[str]) -> None:
+        """Record latency of a broadcast message received by one player."""
+        self.received += 1
+        sent_at = self.sent_at.get(key)
+        if sent_at is not None:
+            self.latencies.append(time.perf_counter() - sent_at)
+
+
+class ServerProcess:
+    """Local uvicorn worker with CPU and memory sampled from /proc."""
+
+    def __init__(self, port: int):
+        self.port = port
+        self.process: Optional[subprocess.Popen] = None
+        self.directory = tempfile.TemporaryDirectory()
+        self.cpu_samples: List[float] = []
+        self.rss_samples: List[int] = []
+        self._last: Optional[tuple] = None
+
+    @property
+    def url(self) -> str:
+        """Websocket url of the server."""
+        return f"ws://127.0.0.1:{self.port}"
+
+    async def start(self, timeout: float = 15) -> None:
+        """Start the server and wait until it accepts connections."""
+        env = {
+            **os.environ,
+            "CODEJAM_LEADERBOARD_DB": os.path.join(self.directory.name, "leaderboard.sqlite3"),
+            "CODEJAM_SNAPSHOT_DB": os.path.join(self.directory.name, "snapshots.sqlite3"),
+            "CODEJAM_LOG_LEVEL": "WARNING",
+        }
+        self.process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                "codejam.server:app",
+                "--port",
+                str(self.port),
+                "--log-level",
+                "warning",
+            ],
+            env=env,
+        )
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                with socket.create_connection(("127.0.0.1", self.port), timeout=0.5):
+                    return
+            except OSError:
+                await asyncio.sleep(0.1)
+        raise RuntimeError(f"Server did not start on port {self.port}")
+
+    def sample(self) -> None:
+        """Record CPU usage since the previous sample and resident memory."""
+        with open(f"/proc/{self.process.pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+        now = time.monotonic()
+        if self._last:
+            self.cpu_samples.append((cpu - self._last[0]) / (now - self._last[1]) * 100)
+        self._last = (cpu, now)
+        with open(f"/proc/{self.process.pid}/statm") as f:
+            self.rss_samples.append(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE"))
+
+    async def monitor(self, interval: float = 1.0) -> None:
+        """Sample the server until cancelled."""
+        while True:
+            self.sample()
+            await asyncio.sleep(interval)
+
+    def stop(self) -> None:
+        """Stop the server and remove its databases."""
+        self.process.terminate()
+        self.process.wait(timeout=10)
+        self.directory.cleanup()
+
+
+class Room:
+    """Game played by a group of bots."""
+
+    def __init__(self, players: int):
+        self.players = players
+        self.game_id: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.joined = 0
+        self.ready = asyncio.Event()
+        self.drawer: Optional[str] = None
+        self.phrase: Optional[str] = None
+
+
+class Bot:
+    """Headless player creating or joining a room, drawing and guessing."""
+
+    def __init__(
+        self,
+        username: str,
+        room: Room,
+        stats: Stats,
+        creator: bool,
+        stroke_rate: float,
+        chat_interval: float,
+        win_chance: float,
+    ):
+        self.username = username
+        self.room = room
+        self.stats = stats
+        self.creator = creator
+        self.stroke_rate = stroke_rate
+        self.chat_interval = chat_interval
+        self.win_chance = win_chance
+        self.websocket = None
+
+    def message(self, topic: TopicEnum, operation, value: Dict = None) -> str:
+        """Encode message of the bot."""
+        game_id = self.room.game_id.result() if self.room.game_id.done() else None
+        return dumps(
+            {
+                "topic": {"type": topic.value, "operation": operation.value},
+                "username": self.username,
+                "game_id": game_id,
+                "value": value,
+            }
+        )
+
+    async def run(self, url: str, deadline: float) -> None:
+        """Play until the deadline."""
+        async with websockets.connect(f"{url}/ws/{self.username}") as self.websocket:
+            reader = asyncio.create_task(self.read())
+            try:
+                await self.enter_room()
+                while time.monotonic() < deadline:
+                    if self.room.drawer == self.username:
+                        await self.draw(deadline=deadline)
+                    else:
+                        await self.guess()
+            finally:
+                reader.cancel()
+
+    async def enter_room(self) -> None:
+        """Create the room or join it, the creator starts the game when all joined."""
+        if self.creator:
+            value = {"success": False, "game_id": ""}
+            await self.websocket.send(self.message(TopicEnum.GAME, GameOperations.CREATE, value))
+            await self.room.game_id
+            await self.room.ready.wait()
+            await self.websocket.send(self.message(TopicEnum.GAME, GameOperations.START))
+        else:
+            await self.room.game_id
+            await self.websocket.send(self.message(TopicEnum.GAME, GameOperations.JOIN))
+
+    async def draw(self, deadline: float, points: int = 20) -> None:
+        """Stream a single stroke as cumulative line updates."""
+        x, y = random.uniform(0, 800), random.uniform(0, 600)
+        line: List[float] = [x, y]
+        for _ in range(points):
+            if self.room.drawer != self.username or time.monotonic() >= deadline:
+                return
+            x, y = x + random.uniform(-10, 10), y + random.uniform(-10, 10)
+            line += [round(x, 2), round(y, 2)]
+            draw_id = uuid.uuid4().hex
+            data = {"line": line, "colour": [0, 0, 0, 1], "width": 2}
+            value = {"draw_id": draw_id, "data": data}
+            self.stats.track(draw_id)
+            await self.websocket.send(self.message(TopicEnum.DRAW, DrawOperations.LINE, value))
+            await asyncio.sleep(1 / self.stroke_rate)
+
+    async def guess(self) -> None:
+        """Post a guess, sometimes the right one."""
+        await asyncio.sleep(random.uniform(0.5, 1.5) * self.chat_interval)
+        if self.room.phrase and random.random() < self.win_chance:
+            text = self.room.phrase
+        else:
+            key = uuid.uuid4().hex
+            text = f"{random.choice(WORDS)} {key}"
+            self.stats.track(key)
+        value = {"sender": self.username, "message": text}
+        await self.websocket.send(self.message(TopicEnum.CHAT, ChatOperations.SAY, value))
+
+    async def read(self) -> None:
+        """Handle messages of the server."""
+        async for raw in self.websocket:
+            message = loads(raw)
+            topic, operation = message["topic"]["type"], message["topic"]["operation"]
+            value = message["value"] or {}
+            if topic == TopicEnum.HEARTBEAT.value:
+                message["topic"]["operation"] = HeartbeatOperations.PONG.value
+                await self.websocket.send(dumps(message))
+            elif topic == TopicEnum.ERROR.value:
+                exception = value.get("exception")
+                self.stats.errors[exception] = self.stats.errors.get(exception, 0) + 1
+            elif topic == TopicEnum.DRAW.value:
+                if message["username"] != self.username:
+                    self.stats.arrived(key=value.get("draw_id"))
+            elif topic == TopicEnum.CHAT.value:
+                if message["username"] != self.username:
+                    self.stats.arrived(key=value.get("message", "").split(" ")[-1])
+            elif operation == GameOperations.CREATE.value:
+                self.room.game_id.set_result(value["game_id"])
+            elif operation == GameOperations.JOIN.value and self.creator:
+                self.room.joined += 1
+                if self.room.joined == self.room.players - 1:
+                    self.room.ready.set()
+            elif operation == GameOperations.TURN.value:
+                turn = value["turn"]
+                self.room.drawer = turn["drawer"]
+                if turn["drawer"] == self.username:
+                    self.room.phrase = turn["phrase"]
+                    self.stats.turns += 1
+
+
+async def run(args: argparse.Namespace) -> Dict:
+    """Play all rooms and return the report."""
+    server = None if args.url else ServerProcess(port=args.port)
+    if server:
+        await server.start()
+    url = args.url or server.url
+    stats = Stats()
+    monitor = asyncio.create_task(server.monitor()) if server else None
+    started = time.monotonic()
+    deadline = started + args.duration
+    try:
+        bots = []
+        for room_no in range(args.rooms):
+            room = Room(players=args.players)
+            for player_no in range(args.players):
+                bots.append(
+                    Bot(
+                        username=f"bot-{room_no}-{player_no}",
+                        room=room,
+                        stats=stats,
+                        creator=player_no == 0,
+                        stroke_rate=args.stroke_rate,
+                        chat_interval=args.chat_interval,
+                        win_chance=args.win_chance,
+                    )
+                )
+        results = await asyncio.gather(
+            *(bot.run(url=url, deadline=deadline) for bot in bots), return_exceptions=True
+        )
+        elapsed = time.monotonic() - started
+    finally:
+        if monitor:
+            monitor.cancel()
+        if server:
+            server.stop()
+    latencies = [round(x * 1000, 3) for x in stats.latencies]
+    return {
+        "rooms": args.rooms,
+        "players": args.players,
+        "duration": round(elapsed, 2),
+        "bot_failures": sum(1 for x in results if isinstance(x, Exception)),
+        "sent_per_second": round(stats.sent / elapsed, 1),
+        "received_per_second": round(stats.received / elapsed, 1),
+        "latency_ms": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "mean": round(statistics.fmean(latencies), 3) if latencies else None,
+        },
+        "turns": stats.turns,
+        "errors": stats.errors,
+        "server": {
+            "cpu_percent_mean": round(statistics.fmean(server.cpu_samples), 1)
+            if server and server.cpu_samples
+            else None,
+            "rss_bytes_max": max(server.rss_samples) if server and server.rss_samples else None,
+        },
+    }
+
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    """Command line options."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rooms", type=int, default=10)
+    parser.add_argument("--players", type=int, default=5, help="bots per room, at least 3")
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--stroke-rate", type=float, default=20, help="updates per second")
+    parser.add_argument("--chat-interval", type=float, default=2, help="seconds")
+    parser.add_argument("--win-chance", type=float, default=0.02)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--url", help="use running server, e.g. ws://127.0.0.1:8000")
+    parser.add_argument("--json", help="write the report to this file")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    options = parse_args()
+    report = asyncio.run(run(options))
+    text = dumps(report)
+    if options.json:
+        with open(options.json, "w") as f:
+            f.write(text)
+    print(text)
@@ -0,0 +1,281 @@
+"""
+Microbenchmarks of the message pipeline.
+
+Every case is timed in repeated batches with the garbage collector disabled, the best
+and the median time of a single call are reported. Results are written as json so two
+runs can be compared:
+
+    python -m benchmarks.microbench --output before.json
+    python -m benchmarks.microbench --compare before.json
+"""
+import argparse
+import asyncio
+import gc
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from typing import Any, Callable, Coroutine, Dict, List, Optional
+
+os.environ.setdefault("CODEJAM_LEADERBOARD_DB", ":memory:")
+os.environ.setdefault("CODEJAM_SNAPSHOT_DB", ":memory:")
+
+from codejam import serialization  # noqa: E402
+from codejam.serialization import dumps, loads  # noqa: E402
+from codejam.server.connection_manager import ConnectionManager  # noqa: E402
+from codejam.server.controllers.chat_controller import ChatController  # noqa: E402
+from codejam.server.interfaces.message import Message  # noqa: E402
+from codejam.server.models.game import Game, Turn  # noqa: E402
+from codejam.server.models.phrase_generator import (  # noqa: E402
+    PhraseDifficulty,
+    PhraseGenerator,
+)
+from codejam.server.models.stroke import Stroke  # noqa: E402
+from codejam.server.models.user import User  # noqa: E402
+
+MIN_BATCH_TIME = 0.05
+
+
+class NullWebSocket:
+    """Connection discarding everything sent to it."""
+
+    async def send_text(self, text: str) -> None:
+        """Drop the message."""
+
+
+def draw_data(points: int = 100) -> Dict:
+    """Line drawn with a single stroke."""
+    return {
+        "topic": {"type": "DRAW", "operation": "LINE"},
+        "username": "drawer",
+        "game_id": "game",
+        "value": {
+            "draw_id": "8b6f0c1e-2d7a-4f0e-9a51-7c1b3c2d4e5f",
+            "data": {
+                "line": [round(random.uniform(0, 1000), 2) for _ in range(points * 2)],
+                "colour": [0.2, 0.4, 0.6, 1],
+                "width": 3,
+            },
+        },
+    }
+
+
+SAMPLES: Dict[str, Dict] = {
+    "DRAW": draw_data(),
+    "CHAT": {
+        "topic": {"type": "CHAT", "operation": "SAY"},
+        "username": "player1",
+        "game_id": "game",
+        "value": {"sender": "player1", "message": "is it a big red house"},
+    },
+    "GAME": {
+        "topic": {"type": "GAME", "operation": "TURN"},
+        "username": "creator",
+        "game_id": "game",
+        "value": {
+            "success": True,
+            "game_id": "game",
+            "game_length": 10,
+            "turn": {
+                "turn_no": 3,
+                "level": "MEDIUM",
+                "drawer": "drawer",
+                "duration": 60,
+                "phrase": "**********",
+                "score": {f"player{x}": x * 10 for x in range(8)},
+            },
+        },
+    },
+    "ERROR": {
+        "topic": {"type": "ERROR", "operation": "BROADCAST"},
+        "username": "player1",
+        "game_id": "game",
+        "value": {"exception": "GameNotExist", "value": "Game does not exist!"},
+    },
+    "TRICK": {
+        "topic": {"type": "TRICK", "operation": "EARTHQUAKE"},
+        "username": "goblin",
+        "game_id": "game",
+        "value": {"game_id": "game", "description": "The ground is shaking!"},
+    },
+    "HEARTBEAT": {
+        "topic": {"type": "HEARTBEAT", "operation": "PING"},
+        "username": "player1",
+        "game_id": None,
+        "value": {"sent_at": 12345.678},
+    },
+}
+
+
+def measure(func: Callable[[int], float], repeat: int) -> Dict[str, Any]:
+    """Time func(number) in batches large enough to be measurable."""
+    number = 1
+    while func(number) < MIN_BATCH_TIME:
+        number *= 2
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        times = [func(number) / number * 1e6 for _ in range(repeat)]
+    finally:
+        if enabled:
+            gc.enable()
+    return {
+        "number": number,
+        "repeat": repeat,
+        "best_us": round(min(times), 3),
+        "median_us": round(statistics.median(times), 3),
+    }
+
+
+def sync_case(call: Callable[[], Any]) -> Callable[[int], float]:
+    """Returns batch timer of a plain call."""
+
+    def batch(number: int) -> float:
+        started = time.perf_counter()
+        for _ in range(number):
+            call()
+        return time.perf_counter() - started
+
+    return batch
+
+
+def async_case(
+    loop: asyncio.AbstractEventLoop, call: Callable[[], Coroutine]
+) -> Callable[[int], float]:
+    """Returns batch timer of a coroutine, the loop start is not measured."""
+
+    async def run(number: int) -> float:
+        started = time.perf_counter()
+        for _ in range(number):
+            await call()
+        return time.perf_counter() - started
+
+    return lambda number: loop.run_until_complete(run(number))
+
+
+def make_game(members: int) -> Game:
+    """Game with connected players discarding what they receive."""
+    players = [User(username=f"player{x}", websocket=NullWebSocket()) for x in range(members)]
+    game = Game(creator=players[0], game_id="game")
+    for player in players:
+        game.join(player)
+    game.turns_history.append(
+        Turn(turn_no=1, drawer=players[0], duration=60, phrase="big red house")
+    )
+    return game
+
+
+def cases(loop: asyncio.AbstractEventLoop) -> Dict[str, Callable[[int], float]]:
+    """All benchmarked cases by name."""
+    result: Dict[str, Callable[[int], float]] = {}
+    for topic, data in SAMPLES.items():
+        message = Message(**data)
+        text = dumps(data)
+        result[f"validate[{topic}]"] = sync_case(lambda data=data: Message(**data))
+        result[f"dict[{topic}]"] = sync_case(message.dict)
+        result[f"json[{topic}]"] = sync_case(message.json)
+        result[f"decode[{topic}]"] = sync_case(lambda text=text: Message(**loads(text)))
+
+    draw = Message(**SAMPLES["DRAW"])
+    for members in (2, 8, 32):
+        game = make_game(members=members)
+
+        async def broadcast(game: Game = game) -> None:
+            await game.broadcast(message=draw)
+            game.history.clear()
+            game.history_bytes = 0
+            game.replay.clear()
+
+        result[f"broadcast[{members}]"] = async_case(loop, broadcast)
+
+    for size in (100, 1000, 10000):
+        game = make_game(members=2)
+        game.history = [Stroke.pack(draw.copy(update={"seq": x})) for x in range(size)]
+        newcomer = User(username="newcomer", websocket=NullWebSocket())
+        result[f"fill_history[{size}]"] = async_case(
+            loop, lambda game=game: game.fill_history(new_member=newcomer)
+        )
+
+    game = make_game(members=3)
+    manager = ConnectionManager()
+    manager.active_connections.extend(game.members)
+    manager.active_games[game.secret] = game
+    controller = ChatController(manager=manager)
+    guess = Message(**{**SAMPLES["CHAT"], "username": "player1"})
+    drawer_chat = Message(**{**SAMPLES["CHAT"], "username": "player0"})
+    result["check_if_winning_phrase"] = sync_case(
+        lambda: controller.check_if_winning_phrase(current_turn=game.current_turn, message=guess)
+    )
+    result["censor_drawer"] = sync_case(
+        lambda: controller.censor_drawer(message=drawer_chat.copy(deep=True))
+    )
+    for difficulty in PhraseDifficulty:
+        result[f"generate_phrase[{difficulty.value}]"] = sync_case(
+            lambda difficulty=difficulty: PhraseGenerator.generate_phrase(difficulty=difficulty)
+        )
+    return result
+
+
+def run(names: Optional[List[str]] = None, repeat: int = 7) -> Dict[str, Any]:
+    """Run selected or all cases."""
+    random.seed(0)
+    loop = asyncio.new_event_loop()
+    try:
+        results = {
+            name: measure(case, repeat=repeat)
+            for name, case in cases(loop).items()
+            if not names or any(x in name for x in names)
+        }
+    finally:
+        loop.close()
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "json_backend": serialization.backend.name,
+        "results": results,
+    }
+
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> List[str]:
+    """Returns names of cases slower than baseline by more than threshold, prints ratios."""
+    slower = []
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        ratio = result["best_us"] / before["best_us"]
+        flag = ""
+        if ratio > 1 + threshold:
+            slower.append(name)
+            flag = "  SLOWER"
+        print(
+            f"{name:<28} {before['best_us']:>12.3f} {result['best_us']:>12.3f} "
+            f"{ratio:>6.2f}x{flag}"
+        )
+    return slower
+
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    """Command line options."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("names", nargs="*", help="run only cases containing any of the names")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--output", help="write the results to this file")
+    parser.add_argument("--compare", help="compare with results stored in this file")
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed slowdown")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    options = parse_args()
+    report = run(names=options.names, repeat=options.repeat)
+    if options.output:
+        with open(options.output, "w") as f:
+            f.write(dumps(report))
+    if options.compare:
+        with open(options.compare) as f:
+            sys.exit(1 if compare(loads(f.read()), report, threshold=options.threshold) else 0)
+    for case_name, case_result in report["results"].items():
+        print(f"{case_name:<28} {case_result['best_us']:>12.3f} us")
@@ -0,0 +1,214 @@
+"""
+Replay of captured traffic against a fresh game server.
+
+Capture inbound frames of a server with CODEJAM_CAPTURE_FILE=capture.jsonl, then feed them
+to a fresh local worker at the recorded pace, N times faster or as fast as possible:
+
+    python -m benchmarks.replay capture.jsonl --speed 1 --output streams.json
+    python -m benchmarks.replay capture.jsonl --speed max --expect streams.json
+
+Games created during the replay get new ids, they are mapped in the replayed frames.
+Heartbeats are answered live instead of replaying the recorded ones. The outbound
+stream of every player is summarised by topic and compared with a previous run.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+
+import websockets
+
+from benchmarks.loadgen import ServerProcess
+from codejam.serialization import dumps, loads
+from codejam.server.capture import CONNECT, DISCONNECT, read_capture
+from codejam.server.interfaces.topics import GameOperations, HeartbeatOperations, TopicEnum
+
+IGNORED_TOPICS = {TopicEnum.HEARTBEAT.value, TopicEnum.TRICK.value}
+
+
+class Player:
+    """Connection of a recorded user, collecting what the server sends to it."""
+
+    def __init__(self, username: str):
+        self.username = username
+        self.websocket = None
+        self.reader: Optional[asyncio.Task] = None
+        self.stream: Dict[str, int] = {}
+        self.created: Optional[asyncio.Future] = None
+
+    async def connect(self, url: str) -> None:
+        """Open the connection and start reading."""
+        self.websocket = await websockets.connect(f"{url}/ws/{self.username}")
+        self.reader = asyncio.create_task(self.read())
+
+    async def close(self) -> None:
+        """Close the connection."""
+        if self.websocket is not None:
+            await self.websocket.close()
+            await asyncio.gather(self.reader, return_exceptions=True)
+            self.websocket = None
+
+    async def read(self) -> None:
+        """Count received messages, answer heartbeats and report created games."""
+        async for raw in self.websocket:
+            message = loads(raw)
+            topic, operation = message["topic"]["type"], message["topic"]["operation"]
+            value = message["value"] or {}
+            if topic == TopicEnum.HEARTBEAT.value:
+                message["topic"]["operation"] = HeartbeatOperations.PONG.value
+                await self.websocket.send(dumps(message))
+                continue
+            if operation == GameOperations.CREATE.value and self.created and value.get("success"):
+                if not self.created.done():
+                    self.created.set_result(value["game_id"])
+            if topic in IGNORED_TOPICS:
+                continue
+            key = f"{topic}/{operation}"
+            if topic == TopicEnum.ERROR.value:
+                key += f"/{value.get('exception')}"
+            self.stream[key] = self.stream.get(key, 0) + 1
+
+
+class Replay:
+    """Feeds captured records to a server in order."""
+
+    def __init__(self, url: str, speed: float, timeout: float = 10):
+        self.url = url
+        self.speed = speed
+        self.timeout = timeout
+        self.players: Dict[str, Player] = {}
+        self.games: Dict[str, asyncio.Future] = {}
+        self.sent = 0
+
+    async def map_game_id(self, game_id: Optional[str]) -> Optional[str]:
+        """Returns id of the replayed game created as the recorded one."""
+        if game_id not in self.games:
+            return game_id
+        return await asyncio.wait_for(asyncio.shield(self.games[game_id]), self.timeout)
+
+    async def send(self, player: Player, game_id: Optional[str], text: str) -> None:
+        """Send recorded frame with game ids of the replayed games."""
+        try:
+            data = loads(text)
+            topic, operation = data["topic"]["type"], data["topic"]["operation"]
+        except (ValueError, KeyError, TypeError):
+            await player.websocket.send(text)
+            self.sent += 1
+            return
+        if topic == TopicEnum.HEARTBEAT.value:
+            return
+        if operation == GameOperations.CREATE.value and game_id and game_id not in self.games:
+            self.games[game_id] = player.created = asyncio.get_running_loop().create_future()
+        data["game_id"] = await self.map_game_id(data.get("game_id"))
+        value = data.get("value")
+        if isinstance(value, dict) and value.get("game_id"):
+            value["game_id"] = await self.map_game_id(value["game_id"])
+        await player.websocket.send(dumps(data))
+        self.sent += 1
+
+    async def run(self, records: List[List]) -> None:
+        """Replay the records keeping their pace scaled by the speed."""
+        started = time.monotonic()
+        for at, event, username, game_id, text in records:
+            if self.speed:
+                delay = started + at / self.speed - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            player = self.players.setdefault(username, Player(username=username))
+            if event == CONNECT:
+                await player.close()
+                await player.connect(url=self.url)
+            elif event == DISCONNECT:
+                await player.close()
+            else:
+                if player.websocket is None:
+                    await player.connect(url=self.url)
+                await self.send(player=player, game_id=game_id, text=text)
+
+    async def close(self) -> None:
+        """Close all connections."""
+        await asyncio.gather(*(x.close() for x in self.players.values()))
+
+    def streams(self) -> Dict[str, Dict[str, int]]:
+        """Returns summary of messages received by every player."""
+        return {x.username: dict(sorted(x.stream.items())) for x in self.players.values()}
+
+
+def differences(expected: Dict, actual: Dict) -> List[str]:
+    """Describe differences of two stream summaries."""
+    result = []
+    for username in sorted(set(expected) | set(actual)):
+        before, after = expected.get(username, {}), actual.get(username, {})
+        for key in sorted(set(before) | set(after)):
+            if before.get(key, 0) != after.get(key, 0):
+                result.append(f"{username} {key}: {before.get(key, 0)} -> {after.get(key, 0)}")
+    return result
+
+
+async def run(args: argparse.Namespace) -> Dict:
+    """Replay the capture and return the report."""
+    records = sorted(read_capture(args.capture), key=lambda x: x[0])
+    os.environ.pop("CODEJAM_CAPTURE_FILE", None)
+    server = None if args.url else ServerProcess(port=args.port)
+    if server:
+        await server.start()
+    replay = Replay(url=args.url or server.url, speed=args.speed)
+    monitor = asyncio.create_task(server.monitor()) if server else None
+    started = time.monotonic()
+    try:
+        await replay.run(records=records)
+        elapsed = time.monotonic() - started
+        await asyncio.sleep(args.settle)
+        await replay.close()
+    finally:
+        if monitor:
+            monitor.cancel()
+        if server:
+            server.stop()
+    return {
+        "records": len(records),
+        "recorded_duration": records[-1][0] if records else 0,
+        "speed": args.speed or "max",
+        "duration": round(elapsed, 3),
+        "sent_per_second": round(replay.sent / elapsed, 1) if elapsed else None,
+        "server": {
+            "cpu_percent_max": max(server.cpu_samples) if server and server.cpu_samples else None,
+            "rss_bytes_max": max(server.rss_samples) if server and server.rss_samples else None,
+        },
+        "streams": replay.streams(),
+    }
+
+
+def speed(value: str) -> float:
+    """Parse replay speed, max replays without waiting."""
+    return 0.0 if value == "max" else float(value)
+
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    """Command line options."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("capture", help="log written with CODEJAM_CAPTURE_FILE")
+    parser.add_argument("--speed", type=speed, default=1.0, help="pace multiplier or max")
+    parser.add_argument("--settle", type=float, default=1.0, help="seconds to wait at the end")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--url", help="use running server, e.g. ws://127.0.0.1:8000")
+    parser.add_argument("--output", help="write the report to this file")
+    parser.add_argument("--expect", help="compare streams with a report of a previous run")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    options = parse_args()
+    report = asyncio.run(run(options))
+    if options.output:
+        with open(options.output, "w") as f:
+            f.write(dumps(report))
+    print(dumps({key: value for key, value in report.items() if key != "streams"}))
+    if options.expect:
+        with open(options.expect) as f:
+            changes = differences(loads(f.read())["streams"], report["streams"])
+        for change in changes:
+            print(change)
+        sys.exit(1 if changes else 0)
@@ -0,0 +1,80 @@
+"""
+Compare json backends on typical game messages.
+
+Run with `python -m benchmarks.serialization`, every installed backend is measured.
+"""
+import random
+import timeit
+from typing import Callable, Dict, List, Tuple
+
+from codejam.serialization import BACKENDS
+from codejam.server.interfaces.game_message import GameMessage, TurnMessage
+from codejam.server.interfaces.message import Message
+from codejam.server.interfaces.picture_message import LineData, PictureMessage
+from codejam.server.interfaces.topics import DrawOperations, GameOperations, Topic, TopicEnum
+from codejam.server.models.phrase_generator import PhraseDifficulty
+
+
+def draw_message(points: int = 200) -> Message:
+    """Line drawn with a single stroke."""
+    return Message(
+        topic=Topic(type=TopicEnum.DRAW, operation=DrawOperations.LINE),
+        username="drawer",
+        game_id="game",
+        value=PictureMessage(
+            data=LineData(
+                line=[random.uniform(0, 1000) for _ in range(points * 2)],
+                colour=[0.2, 0.4, 0.6, 1],
+                width=3,
+            )
+        ),
+        seq=1,
+    )
+
+
+def turn_message(players: int = 8) -> Message:
+    """Start of a turn with the score of all players."""
+    return Message(
+        topic=Topic(type=TopicEnum.GAME, operation=GameOperations.TURN),
+        username="creator",
+        game_id="game",
+        value=GameMessage(
+            success=True,
+            game_id="game",
+            game_length=10,
+            turn=TurnMessage(
+                turn_no=3,
+                level=PhraseDifficulty.MEDIUM,
+                drawer="drawer",
+                duration=60,
+                phrase="**********",
+                score={f"player{x}": x * 10 for x in range(players)},
+            ),
+        ),
+        seq=1,
+    )
+
+
+def measure(func: Callable[[], object], number: int) -> float:
+    """Returns best time of a single call in microseconds."""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def run(number: int = 2000) -> List[Tuple[str, str, float, float]]:
+    """Measure encoding and decoding of every message with every backend."""
+    messages: Dict[str, Message] = {"draw": draw_message(), "turn": turn_message()}
+    results = []
+    for message_name, message in messages.items():
+        data = message.dict()
+        for backend_name, backend in BACKENDS.items():
+            text = backend.dumps(data)
+            dumps = measure(lambda: backend.dumps(data), number=number)
+            loads = measure(lambda: backend.loads(text), number=number)
+            results.append((message_name, backend_name, dumps, loads))
+    return results
+
+
+if __name__ == "__main__":
+    print(f"{'message':<8} {'backend':<8} {'dumps us':>10} {'loads us':>10}")
+    for message_name, backend_name, dumps, loads in run():
+        print(f"{message_name:<8} {backend_name:<8} {dumps:>10.2f} {loads:>10.2f}")
@@ -5,10 +5,11 @@ from random import choices
 
 from kivy.app import async_runTouchApp
 from kivy.lang import Builder
-from kivy.properties import BooleanProperty, ObjectProperty, StringProperty
+from kivy.properties import BooleanProperty, NumericProperty, ObjectProperty, StringProperty
 from kivy.uix.screenmanager import ScreenManager
 
 from codejam.client.widgets import *  # noqa: F401 F403
+from codejam.log import configure
 
 
 class RootWidget(ScreenManager):
@@ -21,6 +22,8 @@ class RootWidget(ScreenManager):
     username = StringProperty("".join(choices(string.ascii_letters + string.digits, k=8)))
     game_id = StringProperty("".join(choices(string.ascii_letters + string.digits, k=8)))
     ws = ObjectProperty(None, allownone=True)
+    resume_token = StringProperty("")
+    last_seq = NumericProperty(0)
 
 
 root_path = pathlib.Path(__file__).parent.resolve()
@@ -36,4 +39,5 @@ if __name__ == "__main__":  # pragma: no cover
         if root.ws:
             root.ws.cancel()
 
+    configure()
     asyncio.run(run_app(root_widget))
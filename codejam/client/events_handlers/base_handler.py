@@ -1,10 +1,10 @@
-import json
 from typing import Dict, cast
 
 from kivy.properties import BooleanProperty, NumericProperty, ObjectProperty, StringProperty
 from kivy.uix.screenmanager import Screen
 from kivy.uix.widget import Widget
 
+from codejam.serialization import loads
 from codejam.server.interfaces.message import Message
 
 
@@ -26,6 +26,8 @@ class BaseEventHandler(Screen):
     def on_received(self, instance: Widget, value: str) -> None:
         """Called when received message"""
         self.received_raw = value
-        parsed = Message(**json.loads(value))
+        parsed = Message(**loads(value))
+        if parsed.seq is not None and parsed.seq > self.manager.last_seq:
+            self.manager.last_seq = parsed.seq
         callback = self.callbacks[cast(str, parsed.topic.type)][parsed.topic.operation]
         callback(parsed)
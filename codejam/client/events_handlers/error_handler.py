@@ -3,7 +3,7 @@ from typing import Callable, Dict
 from codejam.client.events_handlers.base_handler import BaseEventHandler
 from codejam.client.events_handlers.utils import display_popup
 from codejam.server.interfaces.message import Message
-from codejam.server.interfaces.topics import ErrorOperations, TopicEnum
+from codejam.server.interfaces.topics import ErrorOperations, GameOperations, TopicEnum
 
 
 class ErrorEventHandler(BaseEventHandler):
@@ -18,7 +18,15 @@ class ErrorEventHandler(BaseEventHandler):
         self.callbacks[TopicEnum.ERROR.value] = self.error_callbacks
 
     def display_error(self, message: Message) -> None:
-        """Display error modal."""
+        """Display error modal, a session that cannot be resumed joins the game again."""
+        if message.value.exception == "ResumeFailed":
+            self.manager.resume_token = ""
+            self.cvs.canvas.clear()
+            self.ids.chat_window.ids.chat_box.clear_widgets()
+            self.message = self._prepare_message(operation=GameOperations.JOIN).json(
+                models_as_dict=True
+            )
+            return
         self.manager.current = "menu_screen"
         self.ids.counter.cancel_animation()
         self.ids.counter.text = "WAITING FOR START"
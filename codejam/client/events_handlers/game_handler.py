@@ -21,6 +21,7 @@ class GameEventHandler(BaseEventHandler):
             GameOperations.WIN.value: self.update_score,
             GameOperations.END.value: self.game_end,
             GameOperations.LEAVE.value: self.leave_game,
+            GameOperations.RESUME.value: self.game_resume,
         }
         self.callbacks[TopicEnum.GAME.value] = self.game_callbacks
 
@@ -41,15 +42,31 @@ class GameEventHandler(BaseEventHandler):
     def game_create(self, message: Message) -> None:
         """Create game message from other clients"""
         self.manager.game_id = message.value.game_id
+        self.manager.resume_token = message.value.resume_token or ""
         self.ids.score_board.add_joining_player(player=message.username)
         self.ids.score_board.turns_no = message.value.game_length
 
     def game_join(self, message: Message) -> None:
         """Join game message from other clients"""
+        if message.value.resume_token:
+            self.manager.resume_token = message.value.resume_token
         self.ids.score_board.turns_no = message.value.game_length
         for member in message.value.members:
             self.ids.score_board.add_joining_player(player=member)
 
+    def game_resume(self, message: Message) -> None:
+        """Session resumed after reconnect, missed messages follow."""
+        self.manager.resume_token = message.value.resume_token
+        if message.value.last_seq is None:
+            self.cvs.canvas.clear()
+            self.ids.chat_window.ids.chat_box.clear_widgets()
+        score_board = self.ids.score_board
+        score_board.turns_no = message.value.game_length
+        score_board.rebuild_score(players=message.value.members)
+        for member in message.value.members:
+            if member not in score_board.ids:
+                score_board.add_joining_player(player=member)
+
     def game_start(self, message: Message) -> None:
         """Start game message from other clients"""
         self.manager.game_active = True
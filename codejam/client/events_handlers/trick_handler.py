@@ -1,17 +1,17 @@
-import uuid
-from random import choice, randint
-from typing import Callable, Dict, List, Union, cast
+from random import Random, choice
+from typing import Callable, Dict, List, Optional, Union, cast
 
 from kivy.animation import Animation
 from kivy.clock import Clock
+from kivy.graphics import Color, Line
 from kivy.properties import NumericProperty
 from kivy.uix.widget import Widget
 
 from codejam.client.events_handlers.base_handler import BaseEventHandler
 from codejam.client.events_handlers.utils import display_popup
 from codejam.server.interfaces.message import Message
-from codejam.server.interfaces.picture_message import LineData, PictureMessage
-from codejam.server.interfaces.topics import DrawOperations, Topic, TopicEnum, TrickOperations
+from codejam.server.interfaces.topics import TopicEnum, TrickOperations
+from codejam.server.interfaces.trick_message import PacmanData
 
 
 class TrickEventHandler(BaseEventHandler):
@@ -25,8 +25,10 @@ class TrickEventHandler(BaseEventHandler):
         self.line_x = 0
         self.line_y = 0
         self.line_width = 0
-        self.last_direction = None
         self.direction = None
+        self.pacman: Optional[PacmanData] = None
+        self.pacman_random = Random()
+        self.pacman_line: Optional[Line] = None
         self.trick_callbacks: Dict[str, Callable[[Message], None]] = {
             TrickOperations.SNAIL.value: self.snail,
             TrickOperations.EARTHQUAKE.value: self.earthquake,
@@ -88,62 +90,52 @@ class TrickEventHandler(BaseEventHandler):
         self.current_trick.start(self.cvs)
 
     def packman(self, message: Message) -> None:
-        """Handle packman trick"""
+        """Handle packman trick, sweeps are animated locally from the trick parameters."""
         self.cancel_previous_tricks()
-        self.display_message(message=message)
+        if self.manager.can_draw:
+            self.display_message(message=message)
+        self.pacman = message.value.pacman
+        self.pacman_random = Random(self.pacman.seed)
+        self.line_x, self.line_y = self.pacman.origin
+        self.direction = self.pacman.direction
         self.line_width = 15
         self.run_packman()
-        self.current_trick = Clock.schedule_interval(self.run_packman, timeout=3)
+        self.current_trick = Clock.schedule_interval(self.run_packman, self.pacman.interval)
 
     def run_packman(self, value=None):
-        """Main running pacman function"""
+        """Main running pacman function, every next sweep turns and starts elsewhere."""
+        if value is not None:
+            self.line_x = self.pacman_random.random()
+            self.line_y = self.pacman_random.random()
+            self.direction = ["vertical", "horizontal"][int(self.direction == "vertical")]
+        self.pacman_line = None
         self.a = 0
-        self.line_x = randint(self.cvs.pos[0] + 20, self.cvs.pos[0] + self.cvs.width - 20)
-        self.line_y = randint(self.cvs.pos[1] + 20, self.cvs.pos[1] + self.cvs.height - 20)
-
-        self.direction = (
-            choice(["vertical", "horizontal"])
-            if not self.last_direction
-            else ["vertical", "horizontal"][int(self.last_direction == "vertical")]
-        )
-        self.last_direction = self.direction
-        self.pacman_animation = Animation(a=100, duration=0.5)
+        with self.cvs.canvas:
+            Color(hsv=[0.2, 0.9, 0.5])
+            self.pacman_line = Line(points=self.prepare_pacman_line(0), width=self.line_width)
+        self.pacman_animation = Animation(a=100, duration=self.pacman.duration)
         self.pacman_animation.start(self)
 
     def on_a(self, instance: Widget, value: int):
         """Animate on change"""
         self.draw_pacman(value)
 
-    # TODO: Write a test for both paths
-    def prepare_pacman_line(self, value: int) -> List[Union[float, int]]:  # pragma: no cover
-        """Calculate pacman line coordinates"""
+    def prepare_pacman_line(self, value: int) -> List[Union[float, int]]:
+        """Calculate pacman line coordinates, origin is relative to the canvas size"""
+        left = self.cvs.pos[0] + 20
+        bottom = self.cvs.pos[1] + 20
+        width = self.cvs.width - 40
+        height = self.cvs.height - 40
         if self.direction == "horizontal":
-            x1 = self.cvs.pos[0] + 20
-            y1 = self.line_y
-            x2 = self.cvs.pos[0] + ((self.cvs.width - 40) * (value / 100)) + 20
-            y2 = self.line_y
-        else:
-            x1 = self.line_x
-            y1 = self.cvs.pos[1] + 20
-            x2 = self.line_x
-            y2 = self.cvs.pos[1] + ((self.cvs.height - 40) * (value / 100)) + 20
-        return [x1, y1, x2, y2]
+            y = bottom + height * self.line_y
+            return [left, y, left + width * (value / 100), y]
+        x = left + width * self.line_x
+        return [x, bottom, x, bottom + height * (value / 100)]
 
     def draw_pacman(self, value: int):
-        """Send message to others with pacman draw"""
-        self.manager.current_screen.second_message = Message(
-            topic=Topic(type=TopicEnum.DRAW, operation=DrawOperations.LINE),
-            username=self.manager.username,
-            game_id=self.manager.game_id,
-            value=PictureMessage(
-                draw_id=str(uuid.uuid4()),
-                data=LineData(
-                    colour=[0.2, 0.9, 0.5],
-                    line=self.prepare_pacman_line(value),
-                    width=self.line_width,
-                ),
-            ),
-        ).json(models_as_dict=True)
+        """Extend the line eaten by pacman"""
+        if self.pacman_line:
+            self.pacman_line.points = self.prepare_pacman_line(value)
 
     def nothing(self, message: Message) -> None:
         """Handle nothing trick - just popup"""
@@ -1,3 +1,6 @@
+import random
+from typing import Optional
+
 from kivy.clock import Clock
 
 from codejam.client.widgets.whiteboard_tools import InfoPopup
@@ -20,3 +23,19 @@ def display_popup(
     popup.open()
     if auto_dismiss:
         Clock.schedule_once(popup.dismiss, 3)
+
+
+def reconnect_delay(attempt: int, base: float = 0.5, cap: float = 30.0) -> float:
+    """Exponential backoff with full jitter, spreads reconnects of many clients."""
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+def retry_hint(error: Exception) -> Optional[float]:
+    """Seconds a draining server asked to wait before reconnecting, None without a hint."""
+    close = getattr(error, "rcvd", None)
+    if close is None or close.code not in (1012, 1013) or not close.reason.startswith("retry"):
+        return None
+    try:
+        return float(close.reason.rsplit(" ", 1)[-1])
+    except ValueError:
+        return None
@@ -3,7 +3,7 @@ import logging
 import pathlib
 import string
 from random import choices
-from typing import List, Union
+from typing import List, Optional, Union
 
 import websockets
 from kivy.animation import Animation
@@ -13,13 +13,14 @@ from kivy.properties import BooleanProperty, ObjectProperty, StringProperty
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.modalview import ModalView
 from kivy.uix.widget import Widget
-from websockets.exceptions import ConnectionClosedError
+from websockets.exceptions import ConnectionClosed, ConnectionClosedError, InvalidHandshake
 
 from codejam.client.events_handlers import EventHandler
-from codejam.client.events_handlers.utils import display_popup
+from codejam.client.events_handlers.utils import display_popup, reconnect_delay, retry_hint
+from codejam.serialization import loads
 from codejam.server.interfaces.game_message import GameMessage
 from codejam.server.interfaces.message import Message
-from codejam.server.interfaces.topics import GameOperations, Topic, TopicEnum
+from codejam.server.interfaces.topics import GameOperations, HeartbeatOperations, Topic, TopicEnum
 
 logger = logging.getLogger(__name__)
 
@@ -27,9 +28,13 @@ logger = logging.getLogger(__name__)
 class WhiteBoardScreen(EventHandler):
     """WhiteBoardScreen"""
 
+    max_reconnect_attempts = 10
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.url = "ws://127.0.0.1:8000/ws/{0}"
+        self.reconnect_attempt = 0
+        self.pending_intent = ""
 
     lobby_widget = ObjectProperty(None)
     layout = ObjectProperty(None)
@@ -90,15 +95,15 @@ class WhiteBoardScreen(EventHandler):
             lobby = self.manager.ids.lobby
             lobby.pos_hint = {"center_x": 0.5, "center_y": 0.5}
             """Create new room"""
-            self.message = self._prepare_message(
+            self.pending_intent = self.message = self._prepare_message(
                 operation=GameOperations.CREATE, include_difficulty=True
             ).json(models_as_dict=True)
         else:
             """Join existing room"""
             self.remove_lobby()
-            self.message = self._prepare_message(operation=GameOperations.JOIN).json(
-                models_as_dict=True
-            )
+            self.pending_intent = self.message = self._prepare_message(
+                operation=GameOperations.JOIN
+            ).json(models_as_dict=True)
 
     def on_enter(self) -> None:
         """Called when the screen is shown."""
@@ -108,6 +113,9 @@ class WhiteBoardScreen(EventHandler):
         """Called when the screen is about to be hidden."""
         Window.unbind(mouse_pos=self.mouse_pos)
         self.manager.game_id = "".join(choices(string.ascii_letters + string.digits, k=8))
+        self.manager.resume_token = ""
+        self.manager.last_seq = 0
+        self.pending_intent = ""
         self.cancel_trick()
         self.ids.score_board.rebuild_score([])
         self.ids.chat_window.ids.chat_box.clear_widgets()
@@ -164,25 +172,86 @@ class WhiteBoardScreen(EventHandler):
         lobby.pos_hint = {"center_x": 2, "center_y": 2}
 
     async def run_websocket(self) -> None:
-        """Runs the websocket client and send messages."""
+        """Runs the websocket client, reconnects and resumes the game when connection drops."""
+        resume = False
+        while True:
+            try:
+                await self.serve_websocket(resume=resume)
+                return
+            except (ConnectionClosed, InvalidHandshake, OSError) as e:
+                hint = retry_hint(error=e)
+                if (
+                    not self.manager.resume_token and hint is None
+                ) or self.reconnect_attempt >= self.max_reconnect_attempts:
+                    raise
+                delay = reconnect_delay(attempt=self.reconnect_attempt) if hint is None else hint
+                logger.warning("Connection lost: %r, reconnecting in %.2fs", e, delay)
+                self.reconnect_attempt += 1
+                resume = bool(self.manager.resume_token)
+                if not resume and self.pending_intent:
+                    # CREATE or JOIN went out on a refused socket and was never answered
+                    self.message = self.pending_intent
+                await asyncio.sleep(delay)
+
+    async def serve_websocket(self, resume: bool = False) -> None:
+        """Runs single websocket connection and send messages."""
         url = self.url.format(self.manager.username)
+        if resume:
+            url = f"{url}?resume_token={self.manager.resume_token}"
         logger.debug(url)
         async with websockets.connect(url) as websocket:
+            self.reconnect_attempt = 0
+            if resume:
+                await websocket.send(self._prepare_resume_message().json(models_as_dict=True))
             while True:
                 if m := self.message:
                     self.message = ""
-                    logger.debug("sending " + m)
+                    logger.debug("Sending %s", m)
                     await websocket.send(m)
                 if m := self.second_message:
                     self.second_message = ""
-                    logger.debug("sending " + m)
+                    logger.debug("Sending %s", m)
                     await websocket.send(m)
                 try:
-                    self.received = await asyncio.wait_for(websocket.recv(), timeout=1 / 60)
+                    received = await asyncio.wait_for(websocket.recv(), timeout=1 / 60)
                 except asyncio.exceptions.TimeoutError:
                     continue
+                if pong := self.answer_ping(received=received):
+                    await websocket.send(pong)
+                    continue
+                self.received = received
                 await asyncio.sleep(1 / 60)  # pragma: no cover
 
+    @staticmethod
+    def answer_ping(received: Union[str, bytes]) -> Optional[str]:
+        """Returns pong for server ping, answered without waiting for the UI."""
+        if not isinstance(received, str) or TopicEnum.HEARTBEAT.value not in received:
+            return None
+        message = Message(**loads(received))
+        if message.topic.operation != HeartbeatOperations.PING.value:
+            return None
+        pong = Message(
+            topic=Topic(type=TopicEnum.HEARTBEAT, operation=HeartbeatOperations.PONG),
+            username=message.username,
+            game_id=message.game_id,
+            value=message.value,
+        )
+        return pong.json(models_as_dict=True)
+
+    def _prepare_resume_message(self) -> Message:
+        """Helper to ask for the messages missed while disconnected."""
+        return Message(
+            topic=Topic(type=TopicEnum.GAME, operation=GameOperations.RESUME),
+            username=self.manager.username,
+            game_id=self.manager.game_id,
+            value=GameMessage(
+                success=False,
+                game_id=self.manager.game_id,
+                resume_token=self.manager.resume_token,
+                last_seq=self.manager.last_seq,
+            ),
+        )
+
     def _prepare_message(
         self,
         operation: GameOperations,
@@ -0,0 +1,96 @@
+import json
+import logging
+import sys
+from typing import Any, Callable, Dict, Optional
+
+from pydantic import BaseSettings
+
+TEXT_FORMAT = "%(asctime)s:%(name)s:%(lineno)d %(levelname)s %(message)s"
+STANDARD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message"}
+
+
+class LogSettings(BaseSettings):
+    """Logging configuration, can be overwritten with CODEJAM_LOG_* environment variables."""
+
+    class Config:
+        env_prefix = "CODEJAM_LOG_"
+
+    level: str = "INFO"
+    format: str = "text"
+    sample: Dict[str, int] = {"DRAW": 1000}
+
+
+class lazy:
+    """Defers building of an expensive log argument until the record is formatted."""
+
+    __slots__ = ("func", "args")
+
+    def __init__(self, func: Callable[..., Any], *args: Any):
+        self.func = func
+        self.args = args
+
+    def __str__(self) -> str:
+        return str(self.func(*self.args))
+
+
+def topic_of(data: Any) -> Optional[str]:
+    """Returns topic type of raw message data, used to sample records."""
+    try:
+        return data["topic"]["type"]
+    except (KeyError, TypeError):
+        return None
+
+
+class TopicSampler(logging.Filter):
+    """Passes only every n-th record of a sampled topic, records without topic always pass."""
+
+    def __init__(self, rates: Dict[str, int]):
+        super().__init__()
+        self.rates = rates
+        self.counters: Dict[str, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Count records per topic, True for the ones to be logged."""
+        topic = getattr(record, "topic", None)
+        rate = self.rates.get(topic)
+        if not rate or rate <= 1:
+            return True
+        count = self.counters.get(topic, 0)
+        self.counters[topic] = count + 1
+        return count % rate == 0
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as single line json, extra attributes become fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Returns the record as json object in a single line."""
+        data = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in STANDARD_ATTRIBUTES:
+                data[key] = value
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
+
+
+def configure(settings: Optional[LogSettings] = None) -> logging.Handler:
+    """Set up the codejam logger from environment, replacing handlers set up before."""
+    settings = settings or LogSettings()
+    handler = logging.StreamHandler(stream=sys.stdout)
+    if settings.format == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(fmt=TEXT_FORMAT, datefmt="%Y-%m-%d %H:%M:%S"))
+    handler.addFilter(TopicSampler(rates=settings.sample))
+    logger = logging.getLogger("codejam")
+    for old_handler in list(logger.handlers):
+        logger.removeHandler(old_handler)
+    logger.addHandler(handler)
+    logger.setLevel(settings.level.upper())
+    return handler
@@ -0,0 +1,72 @@
+import json
+import os
+from typing import Any, Callable, Dict, Optional, Type, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class JsonBackend:
+    """Standard library json, always available."""
+
+    name = "json"
+
+    @staticmethod
+    def dumps(data: Any, default: Optional[Callable[[Any], Any]] = None) -> str:
+        """Encode data as compact json text."""
+        return json.dumps(data, default=default, separators=(",", ":"))
+
+    @staticmethod
+    def loads(data: Union[str, bytes]) -> Any:
+        """Decode json text."""
+        return json.loads(data)
+
+
+class OrjsonBackend(JsonBackend):
+    """Accelerated encoder written in Rust, used when orjson is installed."""
+
+    name = "orjson"
+
+    @staticmethod
+    def dumps(data: Any, default: Optional[Callable[[Any], Any]] = None) -> str:
+        """Encode data as compact json text."""
+        return orjson.dumps(data, default=default).decode()
+
+    @staticmethod
+    def loads(data: Union[str, bytes]) -> Any:
+        """Decode json text."""
+        return orjson.loads(data)
+
+
+BACKENDS: Dict[str, Type[JsonBackend]] = {JsonBackend.name: JsonBackend}
+if orjson is not None:  # pragma: no branch
+    BACKENDS[OrjsonBackend.name] = OrjsonBackend
+
+
+def select_backend(name: str = None) -> Type[JsonBackend]:
+    """
+    Returns json backend by name, the fastest installed one by default.
+
+    The choice can be forced with CODEJAM_JSON environment variable.
+    """
+    name = name or os.environ.get("CODEJAM_JSON", "auto")
+    if name == "auto":
+        return BACKENDS.get(OrjsonBackend.name, JsonBackend)
+    if name not in BACKENDS:
+        raise ValueError(f"Json backend {name} is not available, use one of {list(BACKENDS)}")
+    return BACKENDS[name]
+
+
+backend = select_backend()
+
+
+def dumps(data: Any, *, default: Optional[Callable[[Any], Any]] = None) -> str:
+    """Encode data with the selected backend."""
+    return backend.dumps(data, default=default)
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Decode data with the selected backend."""
+    return backend.loads(data)
@@ -1,58 +1,227 @@
+import asyncio
 import logging
-from typing import cast
+import secrets
+import time
+from typing import List, Optional
 
-import pydantic
-from fastapi import FastAPI, WebSocket
+from fastapi import Depends, FastAPI, Header, HTTPException, WebSocket
+from starlette.responses import JSONResponse, PlainTextResponse
 from starlette.websockets import WebSocketDisconnect
 
-from codejam.server.connection_manager import ConnectionManager
-from codejam.server.controllers.chat_controller import ChatController
-from codejam.server.controllers.draw_controller import DrawController
-from codejam.server.controllers.error_controller import ErrorController
+from codejam.log import configure
+from codejam.server.capture import Recorder
+from codejam.server.connection_manager import TRY_AGAIN_LATER, ConnectionManager
 from codejam.server.controllers.game_controller import GameController
-from codejam.server.exceptions import WhiteBoardException
-from codejam.server.interfaces.error_message import ErrorMessage
-from codejam.server.interfaces.message import Message
-from codejam.server.interfaces.topics import ErrorOperations, Topic, TopicEnum
+from codejam.server.exceptions import GameNotExist
+from codejam.server.heartbeat import Heartbeat
+from codejam.server.interfaces.leaderboard_message import LeaderboardEntry
+from codejam.server.metrics import metrics
+from codejam.server.models.game import GAME_SIZES
 from codejam.server.models.user import User
+from codejam.server.profiler import Profiler
+from codejam.server.reaper import Reaper
+from codejam.server.router import Router
+from codejam.server.settings import settings
 
 app = FastAPI(title="WebSocket Example")
 logger = logging.getLogger(__name__)
 manager = ConnectionManager()
+router = Router(manager=manager)
+manager.on_forwarded = router.route
+manager.on_adopted = GameController(manager=manager).resume_turn
+reaper = Reaper(manager=manager)
+recorder = Recorder()
+profiler = Profiler()
+
+
+@app.on_event("startup")
+async def configure_logging():
+    """Set up logging from CODEJAM_LOG_* environment variables."""
+    configure()
+
+
+@app.on_event("startup")
+async def connect_workers():
+    """Connect to the bus shared with other workers."""
+    await manager.start()
+
+
+@app.on_event("shutdown")
+async def disconnect_workers():
+    """Disconnect from the bus shared with other workers."""
+    await manager.close()
+
+
+@app.on_event("startup")
+async def load_leaderboard():
+    """Load persisted leaderboard totals."""
+    await manager.leaderboard.start()
+
+
+@app.on_event("startup")
+async def recover_games():
+    """Rehydrate games from the last snapshot and keep taking snapshots."""
+    for game in await manager.snapshots.load(leaderboard=manager.leaderboard):
+        manager.active_games[game.secret] = game
+        GameController(manager=manager).resume_turn(game=game)
+    manager.snapshots.start(games=manager.active_games)
+
+
+@app.on_event("shutdown")
+async def close_leaderboard():
+    """Write pending leaderboard records before exit."""
+    await manager.leaderboard.close()
+
+
+@app.on_event("shutdown")
+async def close_snapshots():
+    """Store the final state of running games."""
+    await manager.snapshots.close(games=manager.active_games)
+
+
+@app.on_event("startup")
+async def start_reaper():
+    """Start collecting abandoned games and idle connections."""
+    reaper.start()
+
+
+@app.on_event("shutdown")
+async def stop_reaper():
+    """Stop collecting abandoned games and idle connections."""
+    await reaper.close()
+
+
+@app.on_event("shutdown")
+async def close_traces():
+    """Close the file traces are exported to."""
+    router.tracer.close()
+
+
+@app.on_event("shutdown")
+async def close_capture():
+    """Close the log inbound traffic is captured to."""
+    recorder.close()
+
+
+@app.get("/stats")
+async def stats():
+    """Resource usage of the worker, used to alert on leaks."""
+    return {**reaper.stats(), **router.limiter.stats()}
+
+
+@app.get("/ready")
+async def ready():
+    """Readiness of the worker, a draining worker asks balancers to send players elsewhere."""
+    if manager.draining:
+        return JSONResponse(
+            {"ready": False},
+            status_code=503,
+            headers={"Retry-After": str(round(settings.drain_retry_after))},
+        )
+    return {"ready": True}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Internals of the worker in the Prometheus text format."""
+    return metrics.render(manager=manager)
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Allow only requests with the CODEJAM_ADMIN_TOKEN, admin endpoints are off without it."""
+    if not settings.admin_token:
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, settings.admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@app.get("/debug/slowest", dependencies=[Depends(require_admin)])
+async def slowest_messages(limit: int = 10):
+    """Stage timings of the slowest recently traced messages."""
+    return router.tracer.slowest(limit=limit)
+
+
+@app.get("/admin/profile", dependencies=[Depends(require_admin)])
+async def profile(seconds: float = 5.0, interval: float = 0.005):
+    """Sample stacks of the event loop and its lag, stacks are collapsed for flame graphs."""
+    if profiler.running:
+        raise HTTPException(status_code=409, detail="Profiler is already running")
+    if not 0 < seconds <= settings.max_profile_seconds or interval < 0.001:
+        raise HTTPException(status_code=422, detail="Invalid profile duration or interval")
+    return await profiler.profile(seconds=seconds, interval=interval)
+
+
+@app.get("/admin/games", dependencies=[Depends(require_admin)])
+async def game_sizes(sort: str = "history_bytes", limit: int = 10):
+    """Size of the games held by the worker, the heaviest first."""
+    if sort not in GAME_SIZES:
+        raise HTTPException(status_code=422, detail=f"Games can not be sorted by {sort}")
+    games = [
+        {**x.stats(), "worker_id": manager.worker_id, "owner": manager.owner(game_id=x.secret)}
+        for x in manager.active_games.values()
+    ]
+    return sorted(games, key=lambda x: x[sort], reverse=True)[:limit]
+
+
+@app.get("/leaderboard", response_model=List[LeaderboardEntry])
+async def leaderboard(limit: int = 10):
+    """Best players across all games."""
+    return manager.leaderboard.top(limit=limit)
+
+
+@app.get("/leaderboard/{username}", response_model=LeaderboardEntry)
+async def leaderboard_entry(username: str):
+    """Rank and totals of a single player."""
+    entry = manager.leaderboard.get_entry(username=username)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Player {username} has no score yet!")
+    return entry
+
+
+@app.get("/games/{game_id}/rtt")
+async def game_rtt(game_id: str):
+    """Round trip times of players connected to the game."""
+    try:
+        game = manager.get_game(game_id=game_id)
+    except GameNotExist as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return game.rtt_stats()
 
 
 @app.websocket("/ws/{username}")
-async def websocket_endpoint(websocket: WebSocket, username: str):
-    """Websocket Endpoint"""
+async def websocket_endpoint(websocket: WebSocket, username: str, resume_token: str = None):
+    """Websocket Endpoint, resume token lets a reconnecting player replace its stale connection."""
+    if manager.draining:
+        await websocket.accept()
+        await websocket.close(code=TRY_AGAIN_LATER, reason=manager.retry_hint())
+        return
     logger.info("Accepting client connection...")
     user = User(username=username, websocket=websocket)
     game_id = None
-    await manager.connect(user=user)
-    controllers = {
-        TopicEnum.DRAW.value: DrawController,
-        TopicEnum.GAME.value: GameController,
-        TopicEnum.CHAT.value: ChatController,
-    }
+    await manager.connect(user=user, resume_token=resume_token)
+    recorder.connect(username=username)
+    heartbeat = asyncio.create_task(Heartbeat(user=user).run())
     try:
         while True:
-            try:
-                data = await websocket.receive_json()
-                logger.debug("received: " + str(data))
-                message = Message(**data)
-                game_id = message.game_id
-                controller = controllers[cast(str, message.topic.type)]
-                await controller(manager=manager).dispatch(message=message)  # type: ignore
-            except (pydantic.ValidationError, WhiteBoardException) as e:
-                message = Message(
-                    topic=Topic(type=TopicEnum.ERROR, operation=ErrorOperations.BROADCAST),
-                    username=user.username,
-                    game_id=game_id,
-                    value=ErrorMessage(exception=e.__class__.__name__, value=str(e)),
-                )
-                await ErrorController(manager=manager).dispatch(message=message)
+            text = await websocket.receive_text()
+            received, owned = time.monotonic(), len(user.owned_games)
+            game_id = await router.receive(user=user, text=text, game_id=game_id)
+            created = user.owned_games[owned:]
+            recorder.frame(
+                username=username,
+                game_id=created[0].secret if created else game_id,
+                text=text,
+                received=received,
+            )
     except WebSocketDisconnect:
         pass
     finally:
+        recorder.disconnect(username=username, game_id=game_id)
+        heartbeat.cancel()
+        if user.flush_task:
+            user.flush_task.cancel()
         if game_id and game_id in manager.active_games:
-            manager.leave(game_id=game_id, member=user)
+            manager.detach(game_id=game_id, member=user)
+        elif manager.is_remote(game_id=game_id):
+            await manager.forward(user=user, game_id=game_id, detach=manager.draining)
         manager.disconnect(user=user)
@@ -0,0 +1,123 @@
+import asyncio
+import bisect
+import hashlib
+import time
+from typing import Any, Callable, Coroutine, Dict, List, Optional
+
+from codejam.server.bus.base_bus import BaseBus
+from codejam.server.settings import settings
+
+
+class HashRing:
+    """Consistent hashing of game ids onto worker ids."""
+
+    def __init__(self, replicas: int = 64):
+        self.replicas = replicas
+        self.nodes: Dict[int, str] = {}
+        self._keys: List[int] = []
+
+    @staticmethod
+    def hash(key: str) -> int:
+        """Stable hash of a key, independent of PYTHONHASHSEED."""
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+    def add(self, node: str) -> None:
+        """Add node with its virtual replicas."""
+        for replica in range(self.replicas):
+            key = self.hash(f"{node}:{replica}")
+            if key not in self.nodes:
+                bisect.insort(self._keys, key)
+                self.nodes[key] = node
+
+    def remove(self, node: str) -> None:
+        """Remove node with its virtual replicas."""
+        for replica in range(self.replicas):
+            key = self.hash(f"{node}:{replica}")
+            if self.nodes.get(key) == node:
+                self.nodes.pop(key)
+                self._keys.remove(key)
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns the node owning the key."""
+        if not self._keys:
+            return None
+        index = bisect.bisect(self._keys, self.hash(key)) % len(self._keys)
+        return self.nodes[self._keys[index]]
+
+
+class WorkerMembership:
+    """
+    Tracks workers alive on the bus and assigns each game to one of them.
+
+    Workers announce themselves periodically, a worker not heard of for three
+    intervals is considered gone. Every change of members triggers on_change.
+    """
+
+    def __init__(
+        self,
+        worker_id: str,
+        bus: BaseBus,
+        on_change: Callable[[], Coroutine[Any, Any, Any]],
+        interval: float = None,
+    ):
+        self.worker_id = worker_id
+        self.bus = bus
+        self.on_change = on_change
+        self.interval = interval if interval is not None else settings.worker_announce_interval
+        self.ring = HashRing()
+        self.ring.add(worker_id)
+        self.last_seen: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.bus.subscribe("workers", self._receive)
+
+    def owner(self, game_id: str) -> str:
+        """Returns worker owning the game."""
+        return self.ring.get(game_id)
+
+    async def start(self) -> None:
+        """Announce this worker and keep announcing it."""
+        await self._announce(up=True)
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Tell other workers that this one is gone."""
+        if self._task:
+            self._task.cancel()
+        await self._announce(up=False)
+
+    async def _announce(self, up: bool) -> None:
+        """Publish this worker state."""
+        await self.bus.publish("workers", {"worker_id": self.worker_id, "up": up})
+
+    async def _run(self) -> None:  # pragma: no cover
+        """Announce periodically and drop workers that stopped announcing."""
+        while True:
+            await asyncio.sleep(self.interval)
+            await self._announce(up=True)
+            deadline = time.monotonic() - 3 * self.interval
+            stale = [x for x, seen in self.last_seen.items() if seen < deadline]
+            for worker_id in stale:
+                self._remove(worker_id)
+            if stale:
+                await self.on_change()
+
+    async def _receive(self, topic: str, payload: Dict) -> None:
+        """Handle announcement of another worker."""
+        worker_id = payload["worker_id"]
+        if worker_id == self.worker_id:
+            return
+        if payload["up"]:
+            known = worker_id in self.last_seen
+            self.last_seen[worker_id] = time.monotonic()
+            if not known:
+                self.ring.add(worker_id)
+                await self._announce(up=True)
+                await self.on_change()
+        elif worker_id in self.last_seen:
+            self._remove(worker_id)
+            await self.on_change()
+
+    def _remove(self, worker_id: str) -> None:
+        """Forget the worker."""
+        self.last_seen.pop(worker_id)
+        self.ring.remove(worker_id)
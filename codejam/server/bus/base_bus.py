@@ -0,0 +1,32 @@
+import abc
+from typing import Any, Callable, Coroutine, Dict, List
+
+Handler = Callable[[str, Dict], Coroutine[Any, Any, Any]]
+
+
+class BaseBus(abc.ABC):  # pragma: no cover
+    """Base publish/subscribe channel between server workers."""
+
+    distributed = False
+
+    def __init__(self):
+        self.handlers: Dict[str, List[Handler]] = {}
+
+    def subscribe(self, topic: str, handler: Handler) -> None:
+        """Register handler called with every payload published on a topic."""
+        self.handlers.setdefault(topic, []).append(handler)
+
+    async def start(self) -> None:
+        """Connect to the bus."""
+
+    async def close(self) -> None:
+        """Disconnect from the bus."""
+
+    @abc.abstractmethod
+    async def publish(self, topic: str, payload: Dict) -> None:
+        """Send payload to all subscribers of a topic."""
+
+    async def deliver(self, topic: str, payload: Dict) -> None:
+        """Pass received payload to local handlers."""
+        for handler in self.handlers.get(topic, []):
+            await handler(topic, payload)
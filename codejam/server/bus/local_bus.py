@@ -0,0 +1,11 @@
+from typing import Dict
+
+from codejam.server.bus.base_bus import BaseBus
+
+
+class LocalBus(BaseBus):
+    """In-process bus, used when the server runs as a single worker."""
+
+    async def publish(self, topic: str, payload: Dict) -> None:
+        """Deliver payload directly to local handlers."""
+        await self.deliver(topic, payload)
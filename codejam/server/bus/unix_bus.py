@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import struct
+from collections import deque
+from typing import Deque, Dict, NamedTuple, Optional, Set, Tuple
+
+from codejam.serialization import dumps, loads
+from codejam.server.bus.base_bus import BaseBus
+from codejam.server.settings import settings
+
+logger = logging.getLogger(__name__)
+HEADER = struct.Struct("!HI")
+
+
+class Frame(NamedTuple):
+    """Bus frame with routing fields decoded and the payload left as raw json."""
+
+    op: str
+    topic: str
+    payload: bytes
+    raw: bytes
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Frame:
+    """Read single frame, the payload is not decoded so it can be forwarded as is."""
+    header = await reader.readexactly(HEADER.size)
+    routing_size, payload_size = HEADER.unpack(header)
+    routing = await reader.readexactly(routing_size)
+    payload = await reader.readexactly(payload_size)
+    op, topic = routing.decode().split(" ", 1)
+    return Frame(op=op, topic=topic, payload=payload, raw=header + routing + payload)
+
+
+def encode_frame(op: str, topic: str, payload: Dict = None) -> bytes:
+    """Encode frame as routing header "op topic" followed by json payload."""
+    routing = f"{op} {topic}".encode()
+    data = dumps(payload).encode() if payload is not None else b""
+    return HEADER.pack(len(routing), len(data)) + routing + data
+
+
+class BusBroker:
+    """
+    Local broker routing frames between workers over a Unix socket.
+
+    Workers send "sub" frames to subscribe a topic and "pub" frames to publish, the
+    broker routes by the header and forwards published frames without decoding them.
+
+    A worker that stops reading is disconnected once its unsent frames exceed the
+    buffer limit, so it cannot make the broker hold an unbounded backlog.
+    """
+
+    def __init__(self, path: str = None, max_buffer: int = None):
+        self.path = path or settings.bus_socket
+        self.max_buffer = max_buffer if max_buffer is not None else settings.bus_max_buffer
+        self.subscribers: Dict[str, Set[asyncio.StreamWriter]] = {}
+        self.connections: Set[asyncio.StreamWriter] = set()
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        """Start listening for workers."""
+        self.server = await asyncio.start_unix_server(self.handle, path=self.path)
+
+    async def close(self) -> None:
+        """Stop the broker and drop worker connections."""
+        self.server.close()
+        for writer in list(self.connections):
+            writer.close()
+        await self.server.wait_closed()
+
+    def send(self, subscriber: asyncio.StreamWriter, data: bytes) -> None:
+        """Queue frame to the subscriber, drop the subscriber when it falls behind."""
+        if subscriber.transport.get_write_buffer_size() + len(data) > self.max_buffer:
+            logger.warning("Disconnecting bus subscriber falling behind")
+            self.drop(subscriber)
+            return
+        subscriber.write(data)
+
+    def drop(self, writer: asyncio.StreamWriter) -> None:
+        """Forget the worker connection and close it."""
+        for subscribers in self.subscribers.values():
+            subscribers.discard(writer)
+        self.connections.discard(writer)
+        writer.close()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Route frames of a single worker connection."""
+        self.connections.add(writer)
+        try:
+            while True:
+                frame = await read_frame(reader)
+                if frame.op == "sub":
+                    self.subscribers.setdefault(frame.topic, set()).add(writer)
+                else:
+                    for subscriber in list(self.subscribers.get(frame.topic, ())):
+                        self.send(subscriber=subscriber, data=frame.raw)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.drop(writer)
+
+
+class UnixSocketBus(BaseBus):
+    """Bus connecting several worker processes on one box through a BusBroker."""
+
+    distributed = True
+
+    def __init__(self, path: str = None):
+        super().__init__()
+        self.path = path or settings.bus_socket
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._queues: Dict[Tuple, Deque[Tuple[str, Dict]]] = {}
+        self._delivery_tasks: Dict[Tuple, asyncio.Task] = {}
+
+    def subscribe(self, topic: str, handler) -> None:
+        """Register handler and subscribe the topic on the broker when connected."""
+        if topic not in self.handlers and self.writer:
+            self.writer.write(encode_frame(op="sub", topic=topic))
+        super().subscribe(topic, handler)
+
+    async def start(self) -> None:
+        """Connect to the broker and subscribe registered topics."""
+        reader, self.writer = await asyncio.open_unix_connection(path=self.path)
+        for topic in self.handlers:
+            self.writer.write(encode_frame(op="sub", topic=topic))
+        await self.writer.drain()
+        self._reader_task = asyncio.create_task(self._read(reader))
+
+    async def close(self) -> None:
+        """Disconnect from the broker."""
+        if self._reader_task:
+            self._reader_task.cancel()
+        for task in list(self._delivery_tasks.values()):
+            task.cancel()
+        if self.writer:
+            self.writer.close()
+            await self.writer.wait_closed()
+            self.writer = None
+
+    async def publish(self, topic: str, payload: Dict) -> None:
+        """Send payload to the broker."""
+        self.writer.write(encode_frame(op="pub", topic=topic, payload=payload))
+        await self.writer.drain()
+
+    async def _read(self, reader: asyncio.StreamReader) -> None:
+        """Deliver frames received from the broker."""
+        while True:
+            try:
+                frame = await read_frame(reader)
+            except (asyncio.IncompleteReadError, ConnectionError):  # pragma: no cover
+                logger.error("Connection to the bus broker lost!")
+                return
+            self._dispatch(topic=frame.topic, payload=loads(frame.payload))
+
+    def _dispatch(self, topic: str, payload: Dict) -> None:
+        """
+        Queue the payload for delivery without blocking the reader.
+
+        Payloads of one player in one game are delivered in order, a slow handler, like
+        the pause after a winning guess, does not hold up payloads of other players.
+        """
+        key = (topic, payload.get("game_id"), payload.get("username"))
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = deque()
+            self._delivery_tasks[key] = asyncio.create_task(self._deliver_queued(key, queue))
+        queue.append((topic, payload))
+
+    async def _deliver_queued(self, key: Tuple, queue: Deque[Tuple[str, Dict]]) -> None:
+        """Deliver queued payloads in order, the queue is dropped once it is empty."""
+        try:
+            while queue:
+                topic, payload = queue.popleft()
+                try:
+                    await self.deliver(topic, payload)
+                except Exception as e:  # pragma: no cover
+                    logger.exception(e)
+        finally:
+            self._queues.pop(key, None)
+            self._delivery_tasks.pop(key, None)
+
+
+if __name__ == "__main__":  # pragma: no cover
+
+    async def serve():
+        """Run the broker until stopped."""
+        broker = BusBroker()
+        await broker.start()
+        await broker.server.serve_forever()
+
+    asyncio.run(serve())
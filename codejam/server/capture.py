@@ -0,0 +1,79 @@
+import time
+from typing import IO, Iterator, List, Optional
+
+from codejam.serialization import dumps, loads
+from codejam.server.settings import settings
+
+CONNECT = "c"
+FRAME = "f"
+DISCONNECT = "d"
+VERSION = 1
+
+
+class Recorder:
+    """
+    Appends inbound traffic of the websocket endpoint to a capture log.
+
+    The log starts with a json header, every following line is a json array of
+    [seconds since start, event, username, game_id, frame]. The game_id of a frame is the
+    game it created, otherwise the one the user plays in, so a replay can map game ids.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = settings.capture_file if path is None else path
+        self.started = time.monotonic()
+        self._file: Optional[IO] = None
+
+    def _write(
+        self, event: str, username: str, game_id: Optional[str], text: Optional[str], at: float
+    ) -> None:
+        if self._file is None:
+            self._file = open(self.path, "a")
+            self.started = at
+            self._file.write(dumps({"version": VERSION, "started_at": time.time()}) + "\n")
+        self._file.write(dumps([round(at - self.started, 6), event, username, game_id, text]))
+        self._file.write("\n")
+
+    def connect(self, username: str) -> None:
+        """Record opened connection."""
+        if self.path:
+            self._write(CONNECT, username, None, None, at=time.monotonic())
+
+    def frame(self, username: str, game_id: Optional[str], text: str, received: float) -> None:
+        """Record frame received at the monotonic time received."""
+        if self.path:
+            self._write(FRAME, username, game_id, text, at=received)
+
+    def disconnect(self, username: str, game_id: Optional[str]) -> None:
+        """Record closed connection and flush the log."""
+        if self.path:
+            self._write(DISCONNECT, username, game_id, None, at=time.monotonic())
+            self._file.flush()
+
+    def close(self) -> None:
+        """Flush and close the log."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_capture(path: str) -> Iterator[List]:
+    """
+    Yields records of a capture log.
+
+    A restarted server appends a new header, times of its records continue after the
+    last record of the previous run.
+    """
+    offset = last = 0.0
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = loads(line)
+            if isinstance(record, dict):
+                if record.get("version") != VERSION:
+                    raise ValueError(f"Unsupported capture version {record.get('version')}")
+                offset = last
+                continue
+            record[0] = last = record[0] + offset
+            yield record
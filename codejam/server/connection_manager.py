@@ -1,45 +1,160 @@
-from typing import Dict, List
+import asyncio
+import logging
+import random
+import time
+import uuid
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Tuple
 
+from codejam.log import topic_of
+from codejam.serialization import dumps
+from codejam.server.bus.affinity import WorkerMembership
+from codejam.server.bus.base_bus import BaseBus
+from codejam.server.bus.local_bus import LocalBus
+from codejam.server.bus.unix_bus import UnixSocketBus
 from codejam.server.exceptions import GameNotExist, UserAlreadyExists, UserNotExist
+from codejam.server.interfaces.error_message import ErrorMessage
 from codejam.server.interfaces.message import Message
+from codejam.server.interfaces.topics import ErrorOperations, TopicEnum
 from codejam.server.models.game import Game
-from codejam.server.models.user import User
+from codejam.server.models.leaderboard import Leaderboard
+from codejam.server.models.snapshots import SnapshotStore, encode_snapshot
+from codejam.server.models.user import RemoteUser, User
+from codejam.server.settings import settings
+
+logger = logging.getLogger(__name__)
+
+BUSES = {"local": LocalBus, "unix": UnixSocketBus}
+SERVICE_RESTART = 1012
+TRY_AGAIN_LATER = 1013
 
 
 class ConnectionManager:
     """Manages users and games connections."""
 
-    def __init__(self):
+    def __init__(
+        self,
+        leaderboard: Leaderboard = None,
+        snapshots: SnapshotStore = None,
+        bus: BaseBus = None,
+        affinity: bool = None,
+    ):
         self.active_connections: List[User] = []
         self.active_games: Dict[str, Game] = {}
-        self.ids = []
+        self.ids: List[str] = []
+        self.worker_id = uuid.uuid4().hex[:8]
+        self.leaderboard = leaderboard or Leaderboard()
+        self.snapshots = snapshots or SnapshotStore(worker_id=self.worker_id)
+        self.remote_users: Dict[str, RemoteUser] = {}
+        self.unanswered: Dict[Tuple[str, str], asyncio.Task] = {}
+        self.on_forwarded: Optional[Callable[[User, Dict], Coroutine[Any, Any, Any]]] = None
+        self.on_adopted: Optional[Callable[[Game], None]] = None
+        self.draining = False
+        self.bus = bus or BUSES[settings.bus]()
+        self.bus.subscribe(f"worker.{self.worker_id}", self._deliver)
+        self.bus.subscribe(f"inbox.{self.worker_id}", self._receive_forwarded)
+        self.bus.subscribe("games", self._receive_forwarded)
+        affinity = affinity if affinity is not None else settings.affinity
+        self.membership: Optional[WorkerMembership] = None
+        if affinity and self.bus.distributed:
+            self.membership = WorkerMembership(
+                worker_id=self.worker_id, bus=self.bus, on_change=self.rebalance
+            )
 
-    async def connect(self, user: User):
-        """Accepts the connections and stores it in a list"""
+    async def start(self):
+        """Connect to other workers."""
+        await self.bus.start()
+        if self.membership:
+            await self.membership.start()
+
+    async def close(self):
+        """Disconnect from other workers, handing held games over first."""
+        await self.hand_over()
+        await self.bus.close()
+
+    async def hand_over(self):
+        """Leave the ring of workers and hand held games over to the remaining ones."""
+        if self.membership and self.worker_id in self.membership.ring.nodes.values():
+            await self.membership.close()
+            self.membership.ring.remove(self.worker_id)
+            await self.rebalance()
+
+    async def drain(self, timeout: float = 5.0):
+        """
+        Refuse new players, ask connected ones to resume later and hand games over.
+
+        Players are closed with a retry hint spread over drain_retry_after seconds, their
+        seats are kept for resume. Games are snapshotted for a restarted worker and handed
+        over to the remaining workers, if there are any.
+        """
+        self.draining = True
+        for user in list(self.active_connections):
+            try:
+                await user.websocket.close(code=SERVICE_RESTART, reason=self.retry_hint())
+            except Exception as e:
+                logger.debug("Closing connection of %s failed: %r", user.username, e)
+        deadline = time.monotonic() + timeout
+        while self.active_connections and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        await self.snapshots.save(games=self.active_games)
+        await self.hand_over()
+
+    @staticmethod
+    def retry_hint() -> str:
+        """Close reason telling the client when to reconnect, jittered to avoid a storm."""
+        return f"retry after {random.uniform(1, settings.drain_retry_after):.1f}"
+
+    async def connect(self, user: User, resume_token: str = None):
+        """Accepts the connections and stores it in a list, resuming player replaces its old one"""
         try:
-            user = self.get_user(user.username)
-            if user:
+            existing = self.get_user(user.username)
+            if (
+                not resume_token
+                or existing not in self.active_connections
+                or existing.resume_token != resume_token
+            ):
                 raise UserAlreadyExists(f"User {user.username} already exists!")
+            await self.replace(stale=existing)
         except UserNotExist:
-            await user.websocket.accept()
-            self.active_connections.append(user)
+            pass
+        await user.websocket.accept()
+        self.active_connections.append(user)
+
+    async def replace(self, stale: User):
+        """Free the seat of a connection the server has not noticed to be dead yet."""
+        logger.info("Replacing stale connection of %s", stale.username)
+        websocket = stale.websocket
+        game = next((x for x in self.active_games.values() if stale in x.members), None)
+        if game:
+            self.detach(game_id=game.secret, member=stale)
+        self.disconnect(user=stale)
+        try:
+            await websocket.close(code=1001)
+        except Exception as e:  # pragma: no cover
+            logger.debug("Closing connection of %s failed: %r", stale.username, e)
 
     def disconnect(self, user: User):
-        """Remove the connections from active connections"""
-        for game in user.owned_games:
-            self.active_games.pop(game.secret)
-        self.active_connections.remove(user)
+        """Remove the connections from active connections, detached owners keep their games"""
+        if user.detached_at is None:
+            for game in user.owned_games:
+                game.cancel_tasks()
+                self.active_games.pop(game.secret, None)
+        if user in self.active_connections:
+            self.active_connections.remove(user)
 
     def get_user(self, username: str) -> User:
         """Get user from active connections by username."""
         user = next((x for x in self.active_connections if x.username == username), None)
+        if not user:
+            user = self.remote_users.get(username)
         if not user:
             raise UserNotExist(f"User with username: {username} does not exist!")
         return user
 
     def register_game(self, creator: User, game_id: str = None, difficulty: str = None) -> Game:
         """Get game from active games."""
-        game = Game(creator=creator, game_id=game_id, difficulty=difficulty)
+        game = Game(
+            creator=creator, game_id=game_id, difficulty=difficulty, leaderboard=self.leaderboard
+        )
         self.active_games[game.secret] = game
         creator.owned_games.append(game)
         return game
@@ -68,6 +183,174 @@ class ConnectionManager:
         """Remove the connections from active connections"""
         self.get_game(game_id=game_id).leave(member)
 
-    async def broadcast(self, game_id: str, message: Message, exclude: List[User] = None):
+    def detach(self, game_id: str, member: User):
+        """Keep the seat of a player dropped from a running or draining game, otherwise leave."""
+        game = self.get_game(game_id=game_id)
+        if game.active or self.draining:
+            game.detach(member)
+        else:
+            game.leave(member)
+
+    def remove_game(self, game: Game):
+        """Drop the game, cancel its timers and free its history."""
+        game.release()
+        self.active_games.pop(game.secret, None)
+        if game in game.creator.owned_games:
+            game.creator.owned_games.remove(game)
+
+    async def broadcast(
+        self, game_id: str, message: Message, exclude: List[User] = None
+    ) -> Message:
         """Broadcast the message to all active clients except excluded ones."""
-        await self.get_game(game_id=game_id).broadcast(message=message, exclude=exclude)
+        return await self.get_game(game_id=game_id).broadcast(message=message, exclude=exclude)
+
+    def owner(self, game_id: str) -> str:
+        """Returns id of the worker the game belongs to."""
+        return self.membership.owner(game_id) if self.membership else self.worker_id
+
+    def is_remote(self, game_id: Optional[str]) -> bool:
+        """Checks if the game is held by another worker."""
+        if not game_id or not self.bus.distributed or game_id in self.active_games:
+            return False
+        return not self.membership or self.membership.owner(game_id) != self.worker_id
+
+    async def forward(self, user: User, game_id: str, data: Dict = None, detach: bool = False):
+        """Pass the message to the worker holding the game, without data the user leaves."""
+        if self.membership:
+            topic = f"inbox.{self.membership.owner(game_id)}"
+        else:
+            topic = "games"
+            if data is not None and topic_of(data) == TopicEnum.GAME.value:
+                self._await_holder(user=user, game_id=game_id)
+        await self.bus.publish(
+            topic,
+            {
+                "worker_id": self.worker_id,
+                "username": user.username,
+                "game_id": game_id,
+                "message": data,
+                "detach": detach,
+            },
+        )
+
+    async def place(self, game_id: Optional[str]):
+        """Hand the game over if it is held here but owned by another worker."""
+        if self.membership and game_id in self.active_games:
+            owner = self.membership.owner(game_id)
+            if owner and owner != self.worker_id:
+                await self.hand_off(game=self.active_games[game_id], owner=owner)
+
+    async def rebalance(self):
+        """Hand games over to their owners after workers joined or left."""
+        for game_id in list(self.active_games):
+            await self.place(game_id=game_id)
+
+    async def hand_off(self, game: Game, owner: str):
+        """Move the game with its connected members and timers to another worker."""
+        game.cancel_tasks()
+        self.active_games.pop(game.secret)
+        members = {
+            x.username: getattr(x, "worker_id", self.worker_id)
+            for x in game.members
+            if x.detached_at is None
+        }
+        for x in game.members:
+            self.remote_users.pop(x.username, None)
+        await self.bus.publish(
+            f"inbox.{owner}",
+            {
+                "game_id": game.secret,
+                "snapshot": encode_snapshot(game.snapshot()),
+                "members": members,
+            },
+        )
+
+    def _adopt(self, payload: Dict):
+        """Take over a game handed over by another worker."""
+        game = Game.from_snapshot(payload["snapshot"], leaderboard=self.leaderboard)
+        for username, worker_id in payload["members"].items():
+            if worker_id == self.worker_id:
+                member = next((x for x in self.active_connections if x.username == username), None)
+            else:
+                member = self._get_remote_user(username=username, worker_id=worker_id)
+            if member:
+                game.join(new_member=member)
+        self.active_games[game.secret] = game
+        if self.on_adopted:
+            self.on_adopted(game)
+
+    def _get_remote_user(self, username: str, worker_id: str) -> RemoteUser:
+        """Get or register player connected to another worker."""
+        user = self.remote_users.get(username)
+        if not user:
+            user = RemoteUser(username=username, worker_id=worker_id, bus=self.bus)
+            self.remote_users[username] = user
+        return user
+
+    def _await_holder(self, user: User, game_id: str):
+        """Report a missing game to the user unless a worker holding it answers in time."""
+        key = (user.username, game_id)
+        if key not in self.unanswered:
+            self.unanswered[key] = asyncio.create_task(
+                self._report_missing(user=user, game_id=game_id)
+            )
+
+    async def _report_missing(self, user: User, game_id: str):
+        """Send GameNotExist to the user after no worker claimed the game."""
+        await asyncio.sleep(settings.forward_timeout)
+        self.unanswered.pop((user.username, game_id), None)
+        message = Message.trusted(
+            type=TopicEnum.ERROR,
+            operation=ErrorOperations.BROADCAST,
+            username=user.username,
+            game_id=game_id,
+            value=ErrorMessage.construct(
+                exception=GameNotExist.__name__,
+                value=f"Game with id: {game_id} does not exist!",
+            ),
+        )
+        try:
+            await user.send_message(message=message)
+        except Exception as e:
+            logger.debug("Reporting missing game to %s failed: %r", user.username, e)
+
+    async def _receive_forwarded(self, topic: str, payload: Dict):
+        """Handle message of a player connected to another worker."""
+        game_id = payload["game_id"]
+        if "snapshot" in payload:
+            self._adopt(payload=payload)
+            return
+        if "held_by" in payload:
+            waiting = self.unanswered.pop((payload["username"], game_id), None)
+            if waiting:
+                waiting.cancel()
+            return
+        if topic == "games":
+            if game_id not in self.active_games:
+                return
+            if topic_of(payload["message"]) == TopicEnum.GAME.value:
+                await self.bus.publish(
+                    f"inbox.{payload['worker_id']}",
+                    {
+                        "game_id": game_id,
+                        "username": payload["username"],
+                        "held_by": self.worker_id,
+                    },
+                )
+        user = self._get_remote_user(username=payload["username"], worker_id=payload["worker_id"])
+        if payload["message"] is None:
+            if game_id in self.active_games and payload.get("detach"):
+                self.get_game(game_id=game_id).detach(user)
+            elif game_id in self.active_games:
+                self.leave(game_id=game_id, member=user)
+            self.remote_users.pop(user.username)
+        else:
+            await self.on_forwarded(user, payload["message"])
+
+    async def _deliver(self, topic: str, payload: Dict):
+        """Send message published by another worker to local players."""
+        usernames = set(payload["usernames"])
+        text = dumps(payload["message"])
+        for user in self.active_connections:
+            if user.username in usernames:
+                await user.try_send_text(text=text)
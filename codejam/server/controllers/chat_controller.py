@@ -7,7 +7,7 @@ from codejam.server.controllers.base_controller import BaseController
 from codejam.server.controllers.game_controller import GameController
 from codejam.server.interfaces.game_message import GameMessage, TurnMessage
 from codejam.server.interfaces.message import Message
-from codejam.server.interfaces.topics import ChatOperations, GameOperations, Topic, TopicEnum
+from codejam.server.interfaces.topics import ChatOperations, GameOperations, TopicEnum
 from codejam.server.models.game import Turn
 
 
@@ -43,14 +43,15 @@ class ChatController(BaseController):
             and current_turn.drawer.username != message.value.sender
         ):
             game.win(user)
-            won_message = Message(
-                topic=Topic(type=TopicEnum.GAME.value, operation=GameOperations.WIN.value),
+            won_message = Message.trusted(
+                type=TopicEnum.GAME,
+                operation=GameOperations.WIN,
                 username=game.creator.username,
                 game_id=game.secret,
-                value=GameMessage(
+                value=GameMessage.construct(
                     success=True,
                     game_id=game.secret,
-                    turn=TurnMessage(
+                    turn=TurnMessage.trusted(
                         turn_no=current_turn.turn_no,
                         level=current_turn.level,
                         drawer=current_turn.drawer.username,
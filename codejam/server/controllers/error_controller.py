@@ -3,10 +3,30 @@ from typing import Any, Callable, Coroutine, Dict
 
 from codejam.server.connection_manager import ConnectionManager
 from codejam.server.controllers.base_controller import BaseController
-from codejam.server.exceptions import GameNotExist
+from codejam.server.exceptions import (
+    FrameTooLarge,
+    GameNotExist,
+    HistoryFull,
+    InvalidFrame,
+    RateLimitExceeded,
+    ResumeFailed,
+    StrokeTooLong,
+)
 from codejam.server.interfaces.message import Message
 from codejam.server.interfaces.topics import ErrorOperations
 
+PRIVATE_ERRORS = {
+    x.__name__
+    for x in (
+        ResumeFailed,
+        InvalidFrame,
+        FrameTooLarge,
+        StrokeTooLong,
+        RateLimitExceeded,
+        HistoryFull,
+    )
+}
+
 
 class ErrorController(BaseController):
     """Handles messages for DrawOperations."""
@@ -25,7 +45,7 @@ class ErrorController(BaseController):
 
     async def broadcast_error(self, message: Message):
         """Broadcast error to user or all game users."""
-        if not message.game_id:
+        if not message.game_id or message.value.exception in PRIVATE_ERRORS:
             user = self.manager.get_user(message.username)
             await user.send_message(message=message)
         else:
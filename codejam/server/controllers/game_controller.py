@@ -1,6 +1,7 @@
 import asyncio
+import time
 from functools import cached_property
-from typing import TYPE_CHECKING, Any, Callable, Coroutine, Dict
+from typing import TYPE_CHECKING, Any, Callable, Coroutine, Dict, cast
 
 from codejam.server.connection_manager import ConnectionManager
 from codejam.server.controllers.base_controller import BaseController
@@ -13,13 +14,15 @@ from codejam.server.exceptions import (
 from codejam.server.interfaces.error_message import ErrorMessage
 from codejam.server.interfaces.game_message import GameMessage, TurnMessage
 from codejam.server.interfaces.message import Message
-from codejam.server.interfaces.topics import ErrorOperations, GameOperations, Topic, TopicEnum
+from codejam.server.interfaces.topics import ErrorOperations, GameOperations, TopicEnum
 from codejam.server.models.tricks_generator import TrickGenerator
 
 if TYPE_CHECKING:  # pragma: no cover
     from codejam.server.models.game import Game
     from codejam.server.models.user import User
 
+MASK = "*" * 10
+
 
 async def delay_wrapper(delay: int, coro: Coroutine):  # pragma: no cover
     """Executes next turn after delay if turn not won."""
@@ -44,6 +47,7 @@ class GameController(BaseController):
             GameOperations.END.value: self.end_game,
             GameOperations.START.value: self.start_game,
             GameOperations.LEAVE.value: self.leave_game,
+            GameOperations.RESUME.value: self.resume_game,
         }
 
     async def start_game(self, message: Message):
@@ -74,24 +78,27 @@ class GameController(BaseController):
             game.active_trick = asyncio.create_task(TrickGenerator(game=game).release_the_kraken())
         except NotEnoughPlayers as e:
             game.active = False
-            message = Message(
-                topic=Topic(type=TopicEnum.ERROR, operation=ErrorOperations.BROADCAST),
+            message = Message.trusted(
+                type=TopicEnum.ERROR,
+                operation=ErrorOperations.BROADCAST,
                 username=game.creator.username,
                 game_id=game.secret,
-                value=ErrorMessage(exception=e.__class__.__name__, value=str(e)),
+                value=ErrorMessage.construct(exception=e.__class__.__name__, value=str(e)),
             )
             await self.manager.broadcast(game_id=game.secret, message=message)
         except GameEnded:
-            game.active = False
-            message = Message(
-                topic=Topic(type=TopicEnum.GAME, operation=GameOperations.END),
+            game.finish()
+            self.manager.leaderboard.record_game_end(game_id=game.secret, score=game.score)
+            message = Message.trusted(
+                type=TopicEnum.GAME,
+                operation=GameOperations.END,
                 username=game.creator.username,
                 game_id=game.secret,
-                value=GameMessage(
+                value=GameMessage.construct(
                     success=True,
                     game_id=game.secret,
                     game_length=game.game_length,
-                    turn=TurnMessage(
+                    turn=TurnMessage.trusted(
                         turn_no=game.current_turn.turn_no,
                         level=game.difficulty_level,
                         duration=0,
@@ -102,38 +109,73 @@ class GameController(BaseController):
             )
             await self.manager.broadcast(game_id=game.secret, message=message)
 
+    def resume_turn(self, game: "Game"):
+        """Schedules advancing of a turn interrupted by a server restart."""
+        current_turn = game.current_turn
+        if game.active and current_turn:
+            game.active_turn = asyncio.create_task(
+                delay_wrapper(
+                    delay=max(0, round(current_turn.deadline - time.time())),
+                    coro=self.execute_turn(game=game, user=game.creator),
+                )
+            )
+
+    @staticmethod
+    def prepare_turn_message(game: "Game", phrase: str, duration: int) -> Message:
+        """Formats the message with current turn."""
+        current_turn = game.current_turn
+        return Message.trusted(
+            type=TopicEnum.GAME,
+            operation=GameOperations.TURN,
+            username=game.creator.username,
+            game_id=game.secret,
+            value=GameMessage.construct(
+                success=True,
+                game_id=game.secret,
+                game_length=game.game_length,
+                turn=TurnMessage.trusted(
+                    turn_no=current_turn.turn_no,
+                    level=current_turn.level,
+                    drawer=current_turn.drawer.username,
+                    duration=duration,
+                    phrase=phrase,
+                    score=game.score,
+                ),
+            ),
+        )
+
+    async def send_current_turn(self, game: "Game", user: "User"):
+        """Let the player joining in the middle of a turn catch up."""
+        current_turn = game.current_turn
+        phrase = current_turn.phrase if current_turn.drawer.username == user.username else MASK
+        duration = max(0, round(current_turn.deadline - time.time()))
+        await user.send_message(
+            message=self.prepare_turn_message(game=game, phrase=phrase, duration=duration)
+        )
+
     async def play_turn(self, game: "Game"):
         """Advances the turn and send messages."""
         if game.active:
             game.turn()
             current_turn = game.current_turn
-            secret_message = Message(
-                topic=Topic(type=TopicEnum.GAME.value, operation=GameOperations.TURN.value),
-                username=game.creator.username,
-                game_id=game.secret,
-                value=GameMessage(
-                    success=True,
-                    game_id=game.secret,
-                    game_length=game.game_length,
-                    turn=TurnMessage(
-                        turn_no=current_turn.turn_no,
-                        level=current_turn.level,
-                        drawer=current_turn.drawer.username,
-                        duration=current_turn.duration,
-                        phrase=current_turn.phrase,
-                        score=game.score,
-                    ),
-                ),
+            secret_message = self.prepare_turn_message(
+                game=game, phrase=current_turn.phrase, duration=current_turn.duration
             )
-            await current_turn.drawer.send_message(message=secret_message)
-            hashed_message = secret_message.copy(deep=True)
-            hashed_message.value.turn.phrase = "*" * 10
+            if current_turn.drawer.detached_at is None:
+                await current_turn.drawer.send_message(message=secret_message)
+            hashed_message = self.mask_turn_message(message=secret_message)
             await self.manager.broadcast(
                 game_id=hashed_message.game_id,
                 message=hashed_message,
                 exclude=[current_turn.drawer],
             )
 
+    @staticmethod
+    def mask_turn_message(message: Message) -> Message:
+        """Returns copy of the turn message with hidden phrase, sharing all other parts."""
+        turn = message.value.turn.copy(update={"phrase": MASK})
+        return message.copy(update={"value": message.value.copy(update={"turn": turn})})
+
     async def create_game(self, message: Message):
         """Create a new game for a user."""
         user = self.manager.get_user(message.username)
@@ -142,49 +184,99 @@ class GameController(BaseController):
             creator=user, game_id=message.game_id, difficulty=difficulty
         )
         self.manager.join_game(game_id=game.secret, new_member=user)
-        message = Message(
-            topic=Topic(type=TopicEnum.GAME.value, operation=GameOperations.CREATE.value),
+        message = Message.trusted(
+            type=TopicEnum.GAME,
+            operation=GameOperations.CREATE,
             username=user.username,
             game_id=game.secret,
-            value=GameMessage(
+            value=GameMessage.construct(
                 success=True,
                 game_id=game.secret,
                 difficulty=difficulty,
                 game_length=game.game_length,
+                resume_token=user.resume_token,
             ),
         )
         await user.send_message(message=message)
+        await self.manager.place(game_id=game.secret)
 
     async def join_game(self, message: Message):
         """Join existing game for a user."""
         user = self.manager.get_user(message.username)
         game = self.manager.join_game(game_id=message.game_id, new_member=user)
-        message = Message(
-            topic=Topic(type=TopicEnum.GAME, operation=GameOperations.JOIN),
+        message = Message.trusted(
+            type=TopicEnum.GAME,
+            operation=GameOperations.JOIN,
             username=user.username,
             game_id=message.game_id,
-            value=GameMessage(
+            value=GameMessage.construct(
                 success=True,
                 game_id=message.game_id,
                 game_length=game.game_length,
                 members=self.manager.get_members(message.game_id),
             ),
         )
-        await self.manager.broadcast(game_id=message.game_id, message=message)
+        message = await self.manager.broadcast(
+            game_id=message.game_id, message=message, exclude=[user]
+        )
+        await user.send_message(message=self.with_resume_token(message=message, user=user))
         await self.manager.fill_history(game_id=message.game_id, new_member=user)
+        if game.active and game.current_turn:
+            await self.send_current_turn(game=game, user=user)
         return message.game_id
 
+    @staticmethod
+    def with_resume_token(message: Message, user: "User") -> Message:
+        """Returns copy of the message carrying the player's private resume token."""
+        value = message.value.copy(update={"resume_token": user.resume_token})
+        return message.copy(update={"value": value})
+
+    async def resume_game(self, message: Message):
+        """Give the seat back to a reconnected player and send only what it missed."""
+        user = self.manager.get_user(message.username)
+        game = self.manager.get_game(game_id=message.game_id)
+        value = cast(GameMessage, message.value)
+        missed = game.resume(
+            new_member=user, resume_token=value.resume_token, last_seq=value.last_seq
+        )
+        await user.send_message(
+            message=Message.trusted(
+                type=TopicEnum.GAME,
+                operation=GameOperations.RESUME,
+                username=user.username,
+                game_id=game.secret,
+                value=GameMessage.construct(
+                    success=True,
+                    game_id=game.secret,
+                    difficulty=game.difficulty,
+                    game_length=game.game_length,
+                    members=self.manager.get_members(game.secret),
+                    resume_token=user.resume_token,
+                    last_seq=None if missed is None else value.last_seq,
+                ),
+            )
+        )
+        if missed is None:
+            await game.fill_history(new_member=user)
+        else:
+            for missed_message in missed:
+                await user.send_message(message=missed_message)
+        if game.active and game.current_turn:
+            await self.send_current_turn(game=game, user=user)
+        return game.secret
+
     async def leave_game(self, message: Message):
         """Handles player leaving a game."""
         user = self.manager.get_user(message.username)
         game = self.manager.get_game(game_id=message.game_id)
         if user != game.creator:
             self.manager.leave(game_id=game.secret, member=user)
-            message = Message(
-                topic=Topic(type=TopicEnum.GAME, operation=GameOperations.LEAVE),
+            message = Message.trusted(
+                type=TopicEnum.GAME,
+                operation=GameOperations.LEAVE,
                 username=user.username,
                 game_id=message.game_id,
-                value=GameMessage(
+                value=GameMessage.construct(
                     success=True,
                     game_id=message.game_id,
                     members=self.manager.get_members(game_id=message.game_id),
@@ -203,5 +295,5 @@ class GameController(BaseController):
     async def end_game(self, message: Message):
         """End existing game by creator."""
         game = self.manager.get_game(game_id=message.game_id)
-        game.active = False
+        game.finish()
         raise GameEnded("Game was ended by the creator!")
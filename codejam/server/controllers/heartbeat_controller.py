@@ -0,0 +1,44 @@
+import time
+from functools import cached_property
+from typing import Any, Callable, Coroutine, Dict, cast
+
+from codejam.server.connection_manager import ConnectionManager
+from codejam.server.controllers.base_controller import BaseController
+from codejam.server.interfaces.heartbeat_message import HeartbeatMessage
+from codejam.server.interfaces.message import Message
+from codejam.server.interfaces.topics import HeartbeatOperations, TopicEnum
+
+
+class HeartbeatController(BaseController):
+    """Handles messages for HeartbeatOperations."""
+
+    def __init__(self, manager: ConnectionManager):
+        super().__init__(manager=manager)
+
+    @cached_property
+    def dispatch_schema(
+        self,
+    ) -> Dict[str, Callable[[Message], Coroutine[Any, Any, Any]]]:
+        """Available routes for different operations."""
+        return {
+            HeartbeatOperations.PING.value: self.ping,
+            HeartbeatOperations.PONG.value: self.pong,
+        }
+
+    async def ping(self, message: Message):
+        """Answer ping of the client so it can measure the round trip on its side."""
+        user = self.manager.get_user(message.username)
+        pong = Message.trusted(
+            type=TopicEnum.HEARTBEAT,
+            operation=HeartbeatOperations.PONG,
+            username=message.username,
+            game_id=message.game_id,
+            value=message.value,
+        )
+        await user.send_message(message=pong)
+
+    async def pong(self, message: Message):
+        """Record round trip of the ping sent by the server."""
+        user = self.manager.get_user(message.username)
+        sent_at = cast(HeartbeatMessage, message.value).sent_at
+        user.rtt.add(max(time.monotonic() - sent_at, 0.0))
@@ -34,5 +34,29 @@ class NotEnoughPlayers(WhiteBoardException):
     """Raised when user want to start a game with < 3 players."""
 
 
+class ResumeFailed(WhiteBoardException):
+    """Raised when there is no detached session matching the resume request."""
+
+
+class InvalidFrame(WhiteBoardException):
+    """Raised when received message is not a valid json."""
+
+
+class FrameTooLarge(WhiteBoardException):
+    """Raised when received message exceeds allowed size."""
+
+
+class StrokeTooLong(WhiteBoardException):
+    """Raised when drawn line has more points than allowed."""
+
+
+class RateLimitExceeded(WhiteBoardException):
+    """Raised when user sends more messages of a topic per second than allowed."""
+
+
+class HistoryFull(WhiteBoardException):
+    """Raised when canvas history of a game exceeds allowed size."""
+
+
 class CannotStartNotOwnGame(WhiteBoardException):
     """Raised when user want to start a game with < 3 players."""
@@ -0,0 +1,60 @@
+import asyncio
+import time
+
+from codejam import logger
+from codejam.server.interfaces.heartbeat_message import HeartbeatMessage
+from codejam.server.interfaces.message import Message
+from codejam.server.interfaces.topics import HeartbeatOperations, TopicEnum
+from codejam.server.models.user import User
+from codejam.server.settings import settings
+
+
+class Heartbeat:
+    """
+    Pings a single connection and evicts it when nothing comes back.
+
+    TCP keeps half-open sockets around for a long time, so liveness is checked on
+    the application level. Any frame received from the player counts as a sign of life.
+    """
+
+    def __init__(
+        self,
+        user: User,
+        interval: float = None,
+        timeout: float = None,
+    ):
+        self.user = user
+        self.interval = interval if interval is not None else settings.heartbeat_interval
+        self.timeout = timeout if timeout is not None else settings.heartbeat_timeout
+
+    async def run(self) -> None:
+        """Ping every interval until the connection stops answering."""
+        while True:
+            await asyncio.sleep(self.interval)
+            if time.monotonic() - self.user.last_heard > self.timeout:
+                await self.evict()
+                return
+            await self.ping()
+
+    async def ping(self) -> None:
+        """Send ping stamped with the server clock."""
+        message = Message.trusted(
+            type=TopicEnum.HEARTBEAT,
+            operation=HeartbeatOperations.PING,
+            username=self.user.username,
+            game_id=None,
+            value=HeartbeatMessage.construct(sent_at=time.monotonic()),
+        )
+        try:
+            await self.user.send_message(message=message)
+        except Exception as e:
+            self.user.send_failures += 1
+            logger.debug("Ping of %s failed: %r", self.user.username, e)
+
+    async def evict(self) -> None:
+        """Close unresponsive connection, the endpoint then detaches the player."""
+        logger.info("Evicting unresponsive connection of %s", self.user.username)
+        try:
+            await self.user.websocket.close(code=1001)
+        except Exception as e:  # pragma: no cover
+            logger.debug("Closing connection of %s failed: %r", self.user.username, e)
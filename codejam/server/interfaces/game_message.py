@@ -20,6 +20,11 @@ class TurnMessage(BaseModel):
     winner: Optional[str]
     score: Dict[str, int]
 
+    @classmethod
+    def trusted(cls, level: PhraseDifficulty, **fields) -> "TurnMessage":
+        """Build turn produced by the server itself, skipping validation."""
+        return cls.construct(level=PhraseDifficulty(level).value, **fields)
+
 
 class GameMessage(BaseModel):
     """Game related messages."""
@@ -30,3 +35,5 @@ class GameMessage(BaseModel):
     game_length: Optional[int]
     turn: Optional[TurnMessage]
     members: Optional[List[str]]
+    resume_token: Optional[str]
+    last_seq: Optional[int]
@@ -0,0 +1,7 @@
+from pydantic import BaseModel
+
+
+class HeartbeatMessage(BaseModel):
+    """Liveness probe, echoed back by the receiver."""
+
+    sent_at: float
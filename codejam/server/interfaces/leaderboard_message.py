@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+
+
+class LeaderboardEntry(BaseModel):
+    """Player's standing across all games."""
+
+    username: str
+    rank: int
+    points: int
+    games_played: int
+    games_won: int
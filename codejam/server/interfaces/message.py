@@ -1,10 +1,13 @@
+from enum import Enum
 from typing import Optional, Union
 
 from pydantic import BaseModel, validator
 
+from codejam import serialization
 from codejam.server.interfaces.chat_message import ChatMessage
 from codejam.server.interfaces.error_message import ErrorMessage
 from codejam.server.interfaces.game_message import GameMessage
+from codejam.server.interfaces.heartbeat_message import HeartbeatMessage
 from codejam.server.interfaces.picture_message import PictureMessage
 from codejam.server.interfaces.topics import Topic, TopicEnum
 from codejam.server.interfaces.trick_message import TrickMessage
@@ -16,7 +19,21 @@ class Message(BaseModel):
     topic: Topic
     username: str
     game_id: Optional[str]
-    value: Optional[Union[PictureMessage, GameMessage, ChatMessage, ErrorMessage, TrickMessage]]
+    value: Optional[
+        Union[
+            PictureMessage,
+            GameMessage,
+            ChatMessage,
+            ErrorMessage,
+            TrickMessage,
+            HeartbeatMessage,
+        ]
+    ]
+    seq: Optional[int]
+
+    class Config:
+        json_dumps = serialization.dumps
+        json_loads = serialization.loads
 
     @validator("value")
     def operation_match_type(cls, v, values, **kwargs):
@@ -27,6 +44,7 @@ class Message(BaseModel):
             TopicEnum.CHAT.value: ChatMessage,
             TopicEnum.ERROR.value: ErrorMessage,
             TopicEnum.TRICK.value: TrickMessage,
+            TopicEnum.HEARTBEAT.value: HeartbeatMessage,
         }
         topic = values.get("topic")
         if topic is None:
@@ -35,3 +53,26 @@ class Message(BaseModel):
         if not expected_message or (v is not None and not isinstance(v, expected_message)):
             raise ValueError(f"Not allowed message value for {topic.type}")
         return v
+
+    @classmethod
+    def trusted(
+        cls,
+        type: TopicEnum,
+        operation: Enum,
+        username: str,
+        game_id: Optional[str],
+        value: Optional[BaseModel] = None,
+    ) -> "Message":
+        """
+        Build message produced by the server itself, skipping validation.
+
+        Only for values constructed from server state, messages coming from clients
+        must always go through the validating constructor.
+        """
+        return cls.construct(
+            topic=Topic.construct(type=type.value, operation=operation.value),
+            username=username,
+            game_id=game_id,
+            value=value,
+            seq=None,
+        )
@@ -12,6 +12,7 @@ class TopicEnum(Enum):
     CHAT = "CHAT"
     ERROR = "ERROR"
     TRICK = "TRICK"
+    HEARTBEAT = "HEARTBEAT"
 
 
 class GameOperations(Enum):
@@ -25,6 +26,7 @@ class GameOperations(Enum):
     TURN = "TURN"
     WIN = "WIN"
     MEMBERS = "MEMBERS"
+    RESUME = "RESUME"
 
 
 class DrawOperations(Enum):
@@ -57,12 +59,24 @@ class TrickOperations(Enum):
     LANDSLIDE = "LANDSLIDE"
 
 
+class HeartbeatOperations(Enum):
+    """Available heartbeat operations."""
+
+    PING = "PING"
+    PONG = "PONG"
+
+
 class Topic(BaseModel):
     """Message's Topic consisting of type and operation."""
 
     type: TopicEnum
     operation: Union[
-        GameOperations, DrawOperations, ChatOperations, ErrorOperations, TrickOperations
+        GameOperations,
+        DrawOperations,
+        ChatOperations,
+        ErrorOperations,
+        TrickOperations,
+        HeartbeatOperations,
     ]
 
     class Config:
@@ -77,6 +91,7 @@ class Topic(BaseModel):
             TopicEnum.CHAT.value: ChatOperations,
             TopicEnum.ERROR.value: ErrorOperations,
             TopicEnum.TRICK.value: TrickOperations,
+            TopicEnum.HEARTBEAT.value: HeartbeatOperations,
         }
         expected_operations = allowed_operations.get(values.get("type"))
         if not expected_operations or v not in set(x.value for x in expected_operations):
@@ -1,8 +1,21 @@
+from typing import List, Optional
+
 from pydantic import BaseModel
 
 
+class PacmanData(BaseModel):
+    """Parameters of pacman sweeps, every client animates them locally."""
+
+    origin: List[float]
+    direction: str
+    duration: float
+    interval: float
+    seed: int
+
+
 class TrickMessage(BaseModel):
     """Trick related messages."""
 
     game_id: str
     description: str
+    pacman: Optional[PacmanData]
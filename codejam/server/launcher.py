@@ -0,0 +1,170 @@
+import argparse
+import asyncio
+import importlib.util
+import logging
+import platform
+import signal
+import time
+from types import FrameType
+from typing import List, Optional, Tuple
+
+import pydantic
+import uvicorn
+from pydantic import BaseSettings
+from uvicorn.supervisors import Multiprocess
+
+from codejam import serialization
+from codejam.server.settings import settings
+
+logger = logging.getLogger(__name__)
+
+APP = "codejam.server:app"
+
+
+class ServerSettings(BaseSettings):
+    """Launcher configuration, can be overwritten with CODEJAM_SERVER_* environment variables."""
+
+    class Config:
+        env_prefix = "CODEJAM_SERVER_"
+
+    host: str = "127.0.0.1"
+    port: int = 8000
+    workers: int = 1
+    loop: str = "auto"
+    http: str = "auto"
+    ws: str = "websockets"
+    ws_max_size: int = 1024 * 1024
+    ws_ping_interval: float = 20.0
+    ws_ping_timeout: float = 20.0
+    ws_per_message_deflate: bool = True
+    backlog: int = 2048
+    timeout_keep_alive: int = 5
+    drain_timeout: float = 30.0
+    log_level: str = "info"
+
+
+def available(module: str) -> bool:
+    """Check if the module can be imported."""
+    return importlib.util.find_spec(module) is not None
+
+
+def resolve(choice: str, fast: str, fallback: str) -> str:
+    """Returns implementation uvicorn picks for the choice."""
+    if choice == "auto":
+        return fast if available(fast) else fallback
+    return choice
+
+
+def self_check(options: ServerSettings) -> List[str]:
+    """Describe the chosen fast paths, slower fallbacks are flagged."""
+    checks = [
+        ("event loop", resolve(options.loop, "uvloop", "asyncio"), "uvloop"),
+        ("http parser", resolve(options.http, "httptools", "h11"), "httptools"),
+        ("websockets", resolve(options.ws, "websockets", "wsproto"), "websockets"),
+        ("json", serialization.backend.name, "orjson"),
+        ("pydantic", "compiled" if pydantic.compiled else "pure python", "compiled"),
+    ]
+    lines = [f"python          {platform.python_implementation()} {platform.python_version()}"]
+    for name, chosen, fast in checks:
+        lines.append(f"{name:<15} {chosen:<12} {'ok' if chosen == fast else 'SLOW'}")
+    lines.append(
+        f"websocket       max {options.ws_max_size} B, ping {options.ws_ping_interval}s, "
+        f"timeout {options.ws_ping_timeout}s, deflate {options.ws_per_message_deflate}"
+    )
+    lines.append(
+        f"workers         {options.workers}, backlog {options.backlog}, "
+        f"keep-alive {options.timeout_keep_alive}s, drain {options.drain_timeout}s"
+    )
+    if options.ws_max_size < settings.max_frame_size:
+        lines.append("WARNING ws_max_size is below CODEJAM_MAX_FRAME_SIZE")
+    if options.workers > 1 and settings.bus == "local":
+        lines.append("WARNING workers do not share games without CODEJAM_BUS")
+    return lines
+
+
+async def drain(timeout: float) -> None:
+    """Refuse new players, let running turns end for at most timeout seconds, hand games over."""
+    from codejam.server.application import manager
+
+    manager.draining = True
+    now = time.time()
+    remaining = [
+        x.current_turn.deadline - now
+        for x in manager.active_games.values()
+        if x.active and x.current_turn and x.finished_at is None
+    ]
+    wait = min(timeout, max(remaining, default=0))
+    if wait > 0:
+        logger.info("Draining, waiting %.1fs for running turns to end", wait)
+        await asyncio.sleep(wait)
+    await manager.drain()
+
+
+class DrainingServer(uvicorn.Server):
+    """Uvicorn server which drains the worker on SIGTERM before shutting down."""
+
+    def __init__(self, config: uvicorn.Config, drain_timeout: float):
+        super().__init__(config=config)
+        self.drain_timeout = drain_timeout
+        self.draining: Optional[asyncio.Task] = None
+
+    def handle_exit(self, sig: int, frame: Optional[FrameType]) -> None:
+        """Drain on the first SIGTERM, any other signal stops the server right away."""
+        if sig != signal.SIGTERM or self.draining or self.drain_timeout <= 0:
+            return super().handle_exit(sig, frame)
+        self.draining = asyncio.get_event_loop().create_task(drain(timeout=self.drain_timeout))
+        self.draining.add_done_callback(lambda _: self.exit())
+
+    def exit(self) -> None:
+        """Start the shutdown of uvicorn."""
+        self.should_exit = True
+
+
+def parse_args(argv: List[str] = None) -> Tuple[ServerSettings, bool]:
+    """Command line options and if only the self-check was asked, defaults come from env."""
+    defaults = ServerSettings()
+    parser = argparse.ArgumentParser(description="Run the game server.")
+    for name, field in ServerSettings.__fields__.items():
+        flag = f"--{name.replace('_', '-')}"
+        if field.type_ is bool:
+            parser.add_argument(flag, action=argparse.BooleanOptionalAction)
+        else:
+            parser.add_argument(flag, type=field.type_)
+    parser.add_argument("--check", action="store_true", help="print the self-check and exit")
+    args = vars(parser.parse_args(argv))
+    check = args.pop("check")
+    return defaults.copy(update={k: v for k, v in args.items() if v is not None}), check
+
+
+def main(argv: List[str] = None) -> None:
+    """Entry point of codejam-server."""
+    options, check = parse_args(argv)
+    for line in self_check(options):
+        print(line)
+    if check:
+        return
+    config = uvicorn.Config(
+        APP,
+        host=options.host,
+        port=options.port,
+        workers=options.workers,
+        loop=options.loop,
+        http=options.http,
+        ws=options.ws,
+        ws_max_size=options.ws_max_size,
+        ws_ping_interval=options.ws_ping_interval,
+        ws_ping_timeout=options.ws_ping_timeout,
+        ws_per_message_deflate=options.ws_per_message_deflate,
+        backlog=options.backlog,
+        timeout_keep_alive=options.timeout_keep_alive,
+        log_level=options.log_level,
+    )
+    server = DrainingServer(config=config, drain_timeout=options.drain_timeout)
+    if config.workers > 1:
+        Multiprocess(config, target=server.run, sockets=[config.bind_socket()]).run()
+    else:
+        server.run()
+
+
+if __name__ == "__main__":
+    main()
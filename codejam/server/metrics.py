@@ -0,0 +1,159 @@
+import bisect
+from typing import TYPE_CHECKING, Dict, Iterable, List, Sequence, Tuple
+
+if TYPE_CHECKING:  # pragma: no cover
+    from codejam.server.connection_manager import ConnectionManager
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+SIZE_BUCKETS = tuple(2**x for x in range(10, 24, 2))
+
+
+def escape(value: object) -> str:
+    """Escape label value for the Prometheus text format."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names: Sequence[str], values: Sequence[object]) -> str:
+    """Returns {name="value",...} or empty string without labels."""
+    if not names:
+        return ""
+    return "{" + ",".join(f'{x}="{escape(y)}"' for x, y in zip(names, values)) + "}"
+
+
+class Counter:
+    """
+    Monotonic counter with labels.
+
+    The server runs on a single event loop, so there are no locks, label values are
+    the strings already held by the message.
+    """
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels: object, amount: float = 1) -> None:
+        """Increase the counter of given label values."""
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> Iterable[str]:
+        """Lines of the Prometheus text format."""
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in self.values.items():
+            yield f"{self.name}{format_labels(self.labels, labels)} {value}"
+
+
+class Histogram:
+    """Distribution of observed values in fixed buckets."""
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """Record single value."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self) -> Iterable[str]:
+        """Lines of the Prometheus text format, buckets are cumulative."""
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{self.name}_bucket{{le="{bound}"}} {cumulative}'
+        yield f'{self.name}_bucket{{le="+Inf"}} {self.count}'
+        yield f"{self.name}_sum {self.sum}"
+        yield f"{self.name}_count {self.count}"
+
+
+def gauge(
+    name: str, help: str, samples: Iterable[Tuple[Tuple, float]], labels: Sequence[str] = ()
+) -> List[str]:
+    """Lines of a gauge computed at scrape time."""
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+    lines.extend(f"{name}{format_labels(labels, x)} {value}" for x, value in samples)
+    return lines
+
+
+def distribution(
+    name: str, help: str, values: Iterable[float], buckets: Sequence[float]
+) -> List[str]:
+    """Lines of a histogram computed at scrape time, bounded however many values there are."""
+    histogram = Histogram(name, help, buckets=buckets)
+    for value in values:
+        histogram.observe(value)
+    return list(histogram.render())
+
+
+class Metrics:
+    """Counters updated on the hot path, gauges are read from the manager when scraped."""
+
+    def __init__(self):
+        self.messages_in = Counter(
+            "codejam_messages_in_total", "Messages received from players.", ("topic", "operation")
+        )
+        self.messages_out = Counter(
+            "codejam_messages_out_total", "Messages sent to players.", ("topic", "operation")
+        )
+        self.failures = Counter(
+            "codejam_rejected_messages_total",
+            "Messages rejected by validation or limits.",
+            ("exception",),
+        )
+        self.broadcast_seconds = Histogram(
+            "codejam_broadcast_seconds", "Time to send a message to all game members."
+        )
+
+    def render(self, manager: "ConnectionManager") -> str:
+        """Returns all metrics in the Prometheus text format."""
+        games = list(manager.active_games.values())
+        timers = {
+            kind: sum(1 for x in games if getattr(x, attr) and not getattr(x, attr).done())
+            for kind, attr in (("turn", "active_turn"), ("trick", "active_trick"))
+        }
+        lines = [
+            *gauge(
+                "codejam_active_connections",
+                "Players connected to this worker.",
+                [((), len(manager.active_connections))],
+            ),
+            *gauge("codejam_active_games", "Games held by this worker.", [((), len(games))]),
+            *distribution(
+                "codejam_game_history_bytes",
+                "Encoded size of the canvas history of games.",
+                [x.history_bytes for x in games],
+                buckets=SIZE_BUCKETS,
+            ),
+            *gauge(
+                "codejam_pending_timers",
+                "Scheduled turn and trick timers.",
+                [((kind,), count) for kind, count in timers.items()],
+                labels=("kind",),
+            ),
+            *gauge(
+                "codejam_pending_draws",
+                "Drawings waiting for the rate limit.",
+                [((), sum(len(x.pending_draws) for x in manager.active_connections))],
+            ),
+            *gauge(
+                "codejam_throttled_players",
+                "Players with drawings waiting for the rate limit.",
+                [((), sum(1 for x in manager.active_connections if x.pending_draws))],
+            ),
+        ]
+        for metric in (self.messages_in, self.messages_out, self.failures, self.broadcast_seconds):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
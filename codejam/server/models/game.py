@@ -1,19 +1,45 @@
 import random
 import string
+import time
 from asyncio import Task
+from collections import deque
 from random import choices
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Deque, Dict, FrozenSet, List, Optional, Union
 
-from codejam.server.exceptions import GameEnded, NotEnoughPlayers
+from codejam import logger
+from codejam.log import lazy
+from codejam.serialization import dumps
+from codejam.server.exceptions import GameEnded, HistoryFull, NotEnoughPlayers, ResumeFailed
 from codejam.server.interfaces.message import Message
 from codejam.server.interfaces.topics import TopicEnum
+from codejam.server.metrics import metrics
 from codejam.server.models.phrase_generator import PhraseDifficulty, PhraseGenerator
-from codejam.server.models.user import User
+from codejam.server.models.stroke import Stroke, unpack
+from codejam.server.models.user import RemoteUser, User
+from codejam.server.settings import settings
+from codejam.server.tracing import NO_SPAN, active_trace, span
+
+if TYPE_CHECKING:  # pragma: no cover
+    from codejam.server.models.leaderboard import Leaderboard
+
+GAME_SIZES = (
+    "members",
+    "connected_members",
+    "history_messages",
+    "history_bytes",
+    "history_dropped",
+    "strokes",
+    "points",
+    "turns_played",
+    "pending_tasks",
+)
 
 
 class Turn:
     """Represent game's turn with a new phrase, level and duration."""
 
+    __slots__ = ("turn_no", "level", "drawer", "duration", "phrase", "winner", "started_at")
+
     def __init__(
         self,
         turn_no: int,
@@ -28,32 +54,114 @@ class Turn:
         self.duration = duration
         self.phrase = phrase
         self.winner: Optional[User] = None
+        self.started_at = time.time()
+
+    @property
+    def deadline(self) -> float:
+        """Timestamp at which the turn runs out of time."""
+        return self.started_at + self.duration
+
+    def snapshot(self) -> Dict:
+        """Returns turn state that can be stored and restored."""
+        return {
+            "turn_no": self.turn_no,
+            "level": PhraseDifficulty(self.level).value,
+            "drawer": self.drawer.username,
+            "duration": self.duration,
+            "phrase": self.phrase,
+            "winner": self.winner.username if self.winner else None,
+            "started_at": self.started_at,
+        }
 
 
 class Game:
     """Represents a game instance between players."""
 
-    def __init__(self, creator: User, game_id: str = None, difficulty: str = None) -> None:
-        self.winner_scores = {
-            PhraseDifficulty.EASY: 50,
-            PhraseDifficulty.MEDIUM: 100,
-            PhraseDifficulty.HARD: 50,
-        }
-        self.allowed_durations = [30, 60]
+    __slots__ = (
+        "creator",
+        "members",
+        "secret",
+        "current_turn_no",
+        "history",
+        "history_bytes",
+        "history_strokes",
+        "history_points",
+        "history_dropped",
+        "turns_history",
+        "version",
+        "seq",
+        "replay",
+        "_replay_excluded",
+        "empty_since",
+        "finished_at",
+        "_active",
+        "active_turn",
+        "active_trick",
+        "difficulty",
+        "leaderboard",
+        "game_length",
+        "_last_phrase",
+        "_last_drawer",
+        "_scores",
+        "_departed_scores",
+        "_score_payload",
+        "_ranks",
+    )
+
+    winner_scores = {
+        PhraseDifficulty.EASY: 50,
+        PhraseDifficulty.MEDIUM: 100,
+        PhraseDifficulty.HARD: 50,
+    }
+    allowed_durations = (30, 60)
+
+    def __init__(
+        self,
+        creator: User,
+        game_id: str = None,
+        difficulty: str = None,
+        leaderboard: "Leaderboard" = None,
+    ) -> None:
         self.creator = creator
         self.members: List[User] = []
         self.secret = game_id or "".join(choices(string.ascii_letters + string.digits, k=8))
         self.current_turn_no = 0
-        self.history: List[Message] = []
+        self.history: List[Union[Stroke, Message]] = []
+        self.history_bytes = 0
+        self.history_strokes = 0
+        self.history_points = 0
+        self.history_dropped = 0
         self.turns_history: List[Turn] = []
-        self.active = False
+        self.version = 0
+        self.seq = 0
+        self.replay: Deque[Union[Stroke, Message]] = deque(maxlen=settings.replay_buffer_size)
+        self._replay_excluded: Dict[int, FrozenSet[str]] = {}
+        self.empty_since: Optional[float] = time.monotonic()
+        self.finished_at: Optional[float] = None
+        self._active = False
         self.active_turn: Optional[Task] = None
         self.active_trick: Optional[Task] = None
         self.difficulty = difficulty
+        self.leaderboard = leaderboard
         self.game_length = self.get_number_of_turns()
 
         self._last_phrase: str = ""
         self._last_drawer: Optional[User] = None
+        self._scores: Dict[str, int] = {}
+        self._departed_scores: Dict[str, int] = {}
+        self._score_payload: Optional[Dict[str, int]] = None
+        self._ranks: Optional[Dict[str, int]] = None
+
+    @property
+    def active(self) -> bool:
+        """Returns if the game is running."""
+        return self._active
+
+    @active.setter
+    def active(self, value: bool) -> None:
+        """Starts or stops the game."""
+        self._active = value
+        self._touch()
 
     @property
     def current_turn(self) -> Optional[Turn]:
@@ -63,18 +171,41 @@ class Game:
         return None
 
     @property
-    def score(self) -> Dict:
-        """Returns score per player."""
-        score: Dict[str, int] = {}
-        for player in self.members:
-            score[player.username] = 0
-
-        for turn in self.turns_history:
-            if turn.winner is not None and turn.winner.username in score:
-                score[turn.winner.username] = score[turn.winner.username] + self.winner_scores.get(
-                    turn.level
-                )
-        return score
+    def score(self) -> Dict[str, int]:
+        """Returns score per player, cached until the score changes. Do not mutate."""
+        if self._score_payload is None:
+            self._score_payload = {x.username: self._scores[x.username] for x in self.members}
+        return self._score_payload
+
+    def rank(self, username: str) -> int:
+        """Returns 1-based rank of a player, tied players share the rank."""
+        if self._ranks is None:
+            self._ranks = {}
+            last_points, last_rank = None, 0
+            ordered = sorted(self.score.items(), key=lambda x: x[1], reverse=True)
+            for position, (player, points) in enumerate(ordered, start=1):
+                if points != last_points:
+                    last_points, last_rank = points, position
+                self._ranks[player] = last_rank
+        return self._ranks[username]
+
+    def _add_points(self, username: str, points: int) -> None:
+        """Updates running total of a player and invalidates cached payloads."""
+        if username in self._scores:
+            self._scores[username] += points
+            self._invalidate_score()
+            if self.leaderboard:
+                self.leaderboard.record_win(username=username, game_id=self.secret, points=points)
+
+    def _invalidate_score(self) -> None:
+        """Drops cached score payload and ranks."""
+        self._score_payload = None
+        self._ranks = None
+        self._touch()
+
+    def _touch(self) -> None:
+        """Marks the game as changed since the last snapshot."""
+        self.version += 1
 
     @property
     def difficulty_level(self) -> PhraseDifficulty:
@@ -83,15 +214,47 @@ class Game:
 
     def win(self, winner: User) -> None:
         """Set current turn as won by winner. Cancel scheduled turn change."""
+        points = self.winner_scores.get(self.current_turn.level)
+        if self.current_turn.winner is not None:
+            self._add_points(self.current_turn.winner.username, -points)
         self.current_turn.winner = winner
+        self._add_points(winner.username, points)
         if self.active_turn:
             self.active_turn.cancel()
         if self.active_trick:
             self.active_trick.cancel()
 
+    def finish(self) -> None:
+        """Mark the game as ended."""
+        self.active = False
+        self.finished_at = time.monotonic()
+
+    def cancel_tasks(self) -> None:
+        """Cancel scheduled turn change and trick."""
+        for task in (self.active_turn, self.active_trick):
+            if task:
+                task.cancel()
+        self.active_turn = None
+        self.active_trick = None
+
+    def release(self) -> None:
+        """Stop the game and free its history."""
+        self.cancel_tasks()
+        self.history = []
+        self.history_bytes = 0
+        self.history_strokes = 0
+        self.history_points = 0
+        self.turns_history = []
+        self.members = []
+
+    @property
+    def connected_members(self) -> List[User]:
+        """Players who are not waiting to resume a dropped connection."""
+        return [x for x in self.members if x.detached_at is None]
+
     def check_if_game_has_enough_players(self) -> None:
-        """Check if minimum number of players is filled."""
-        if len(self.members) < 3:
+        """Check if minimum number of players is filled, detached seats do not count."""
+        if len(self.connected_members) < 3:
             raise NotEnoughPlayers("The game needs at least 3 players!")
 
     @staticmethod
@@ -113,12 +276,14 @@ class Game:
             level=self.difficulty_level,
         )
         self.turns_history.append(new_turn)
+        self._touch()
 
     def get_next_drawer(self) -> User:
-        """Chooses next drawer, must differ than the last one"""
-        drawer = random.choice(self.members)
+        """Chooses next drawer among connected players, must differ than the last one"""
+        members = self.connected_members
+        drawer = random.choice(members)
         while drawer == self._last_drawer:  # pragma: no cover
-            drawer = random.choice(self.members)
+            drawer = random.choice(members)
         self._last_drawer = drawer
         return drawer
 
@@ -130,25 +295,263 @@ class Game:
         self._last_phrase = new_phrase
         return new_phrase
 
-    async def broadcast(self, message: Message, exclude: List[User] = None):
-        """Broadcast the message to all active members"""
+    async def broadcast(self, message: Message, exclude: List[User] = None) -> Message:
+        """Broadcast the message to all active members, returns it with sequence number."""
+        stored = message.topic.type in [TopicEnum.DRAW.value, TopicEnum.CHAT.value]
+        started = time.perf_counter()
+        data = message.dict()
+        data["seq"] = self.seq + 1
+        text = None
+        if stored:
+            with span("history"):
+                text = dumps(data)
+                stored = self._store(message=message, data=data, size=len(text))
+        self.seq += 1
+        message = message.copy(update={"seq": self.seq})
+        entry = Stroke.pack(message)
+        if stored:
+            self.history.append(entry)
+        self._remember_replay(entry=entry, exclude=exclude)
         recipients = self.members if not exclude else [x for x in self.members if x not in exclude]
+        remote_users = []
+        logger.debug(
+            "Broadcasting message %s to game %s",
+            lazy(message.json),
+            self.secret,
+            extra={"topic": message.topic.type},
+        )
+        sent = 0
+        trace = active_trace()
         for user in recipients:
-            if message.topic.type in [TopicEnum.DRAW.value, TopicEnum.CHAT.value]:
-                self.history.append(message)
-            await user.send_message(message=message)
+            if isinstance(user, RemoteUser):
+                remote_users.append(user)
+            elif user.detached_at is None:
+                text = text or dumps(data)
+                with trace.span("send", username=user.username) if trace else NO_SPAN:
+                    await user.try_send_text(text=text)
+                sent += 1
+        if remote_users:
+            await RemoteUser.send_batch(users=remote_users, data=data)
+        metrics.messages_out.inc(message.topic.type, message.topic.operation, amount=sent)
+        metrics.broadcast_seconds.observe(time.perf_counter() - started)
+        return message
+
+    def _remember_replay(self, entry: Union[Stroke, Message], exclude: List[User] = None) -> None:
+        """Keep the message for resuming players, noting who must not receive it."""
+        self.replay.append(entry)
+        if exclude:
+            self._replay_excluded[entry.seq] = frozenset(x.username for x in exclude)
+        while self._replay_excluded and next(iter(self._replay_excluded)) < self.replay[0].seq:
+            del self._replay_excluded[next(iter(self._replay_excluded))]
+
+    def _store(self, message: Message, data: Dict, size: int) -> bool:
+        """
+        Account message of the given encoded size to history, False if it is not kept.
+
+        Drawings over the history budget are rejected, chat messages are still delivered
+        but newcomers will not see them.
+        """
+        if self.history_bytes + size > settings.max_history_bytes:
+            if message.topic.type == TopicEnum.DRAW.value:
+                raise HistoryFull(f"Canvas of the game {self.secret} is full!")
+            self.history_dropped += 1
+            return False
+        self._account(data=data, size=size)
+        self._touch()
+        return True
+
+    def _account(self, data: Dict, size: int) -> None:
+        """Add stored message to the history counters."""
+        self.history_bytes += size
+        if data["topic"]["type"] == TopicEnum.DRAW.value:
+            self.history_strokes += 1
+            self.history_points += len(data["value"]["data"].get("line") or ()) // 2
+
+    def stats(self) -> Dict:
+        """Returns size of the game, counters are kept as messages are stored."""
+        return {
+            "game_id": self.secret,
+            "members": len(self.members),
+            "connected_members": len(self.connected_members),
+            "history_messages": len(self.history),
+            "history_bytes": self.history_bytes,
+            "history_dropped": self.history_dropped,
+            "strokes": self.history_strokes,
+            "points": self.history_points,
+            "turns_played": len(self.turns_history),
+            "pending_tasks": sum(
+                1 for x in (self.active_turn, self.active_trick) if x and not x.done()
+            ),
+        }
+
+    def replay_since(
+        self, last_seq: Optional[int], username: str = None
+    ) -> Optional[List[Message]]:
+        """Returns messages broadcast after last_seq, None if they left the replay buffer."""
+        if last_seq is None or last_seq > self.seq:
+            return None
+        if last_seq == self.seq:
+            return []
+        if not self.replay or self.replay[0].seq > last_seq + 1:
+            return None
+        return [
+            unpack(x)
+            for x in self.replay
+            if x.seq > last_seq and username not in self._replay_excluded.get(x.seq, ())
+        ]
+
+    def rtt_stats(self) -> Dict:
+        """Round trip times of connected players."""
+        players = {x.username: x.rtt.dict() for x in self.members if x.rtt.samples}
+        smoothed = sorted(x["smoothed"] for x in players.values())
+        return {
+            "game_id": self.secret,
+            "players": players,
+            "min": smoothed[0] if smoothed else None,
+            "max": smoothed[-1] if smoothed else None,
+            "median": smoothed[len(smoothed) // 2] if smoothed else None,
+        }
 
     def join(self, new_member: User):
         """Accept the new player and store it in a list"""
+        detached = self._get_detached(username=new_member.username)
+        if detached:
+            self.members.remove(detached)
         self.members.append(new_member)
+        self.empty_since = None
+        self._rebind(new_member=new_member)
+        self._scores[new_member.username] = self._departed_scores.pop(
+            new_member.username, self._scores.get(new_member.username, 0)
+        )
+        self._invalidate_score()
+
+    def detach(self, member: User) -> None:
+        """Keep the seat of a disconnected player so the session can be resumed."""
+        if member in self.members:
+            member.websocket = None
+            member.detached_at = time.monotonic()
+
+    def resume(
+        self, new_member: User, resume_token: Optional[str], last_seq: Optional[int]
+    ) -> Optional[List[Message]]:
+        """Give the seat back to a reconnected player, returns messages it missed."""
+        detached = self._get_detached(username=new_member.username)
+        if not detached or not resume_token or detached.resume_token != resume_token:
+            raise ResumeFailed(f"No session of {new_member.username} to resume!")
+        self.members[self.members.index(detached)] = new_member
+        self._rebind(new_member=new_member)
+        return self.replay_since(last_seq=last_seq, username=new_member.username)
+
+    def _get_detached(self, username: str) -> Optional[User]:
+        """Returns detached player with given username."""
+        return next(
+            (x for x in self.members if x.username == username and x.detached_at is not None),
+            None,
+        )
+
+    def _rebind(self, new_member: User) -> None:
+        """Replace placeholders of a recovered game with the returning player."""
+        if self.creator.username == new_member.username and self.creator is not new_member:
+            if self.creator.websocket is None:
+                self.creator = new_member
+                new_member.owned_games.append(self)
+        current_turn = self.current_turn
+        if current_turn and current_turn.drawer.username == new_member.username:
+            current_turn.drawer = new_member
+
+    def snapshot(self, history_from: int = 0) -> Dict:
+        """
+        Returns game state that can be stored and restored.
+
+        Collections are copied shallowly, stored messages are not modified after they
+        are added to history, so the result can be serialized outside the event loop.
+        Only the history appended from the given position is included.
+        """
+        return {
+            "game_id": self.secret,
+            "version": self.version,
+            "creator": self.creator.username,
+            "members": [x.username for x in self.members],
+            "resume_tokens": {x.username: x.resume_token for x in self.members},
+            "difficulty": self.difficulty,
+            "game_length": self.game_length,
+            "current_turn_no": self.current_turn_no,
+            "seq": self.seq,
+            "active": self.active,
+            "scores": {**self._departed_scores, **self._scores},
+            "turns_history": [x.snapshot() for x in self.turns_history],
+            "history": self.history[history_from:],
+            "replay": list(self.replay),
+            "replay_excluded": {str(k): sorted(v) for k, v in self._replay_excluded.items()},
+        }
+
+    @classmethod
+    def from_snapshot(cls, data: Dict, leaderboard: "Leaderboard" = None) -> "Game":
+        """Rehydrate the game, players resume or join again to take their places back."""
+        players: Dict[str, User] = {}
+
+        def get_player(username: str) -> User:
+            if username not in players:
+                players[username] = User(username=username)
+            return players[username]
+
+        game = cls(
+            creator=get_player(data["creator"]),
+            game_id=data["game_id"],
+            difficulty=data["difficulty"],
+            leaderboard=leaderboard,
+        )
+        game.game_length = data["game_length"]
+        game.current_turn_no = data["current_turn_no"]
+        game._active = data["active"]
+        game._departed_scores = dict(data["scores"])
+        for item in data["history"]:
+            game.history.append(Stroke.pack(Message(**item)))
+            game._account(data=item, size=len(dumps(item)))
+        for item in data.get("replay", []):
+            game.replay.append(Stroke.pack(Message(**item)))
+        for seq, usernames in data.get("replay_excluded", {}).items():
+            game._replay_excluded[int(seq)] = frozenset(usernames)
+        for turn_data in data["turns_history"]:
+            turn = Turn(
+                turn_no=turn_data["turn_no"],
+                drawer=get_player(turn_data["drawer"]),
+                duration=turn_data["duration"],
+                phrase=turn_data["phrase"],
+                level=PhraseDifficulty(turn_data["level"]),
+            )
+            turn.winner = get_player(turn_data["winner"]) if turn_data["winner"] else None
+            turn.started_at = turn_data["started_at"]
+            game.turns_history.append(turn)
+        if game.current_turn:
+            game._last_phrase = game.current_turn.phrase
+        game.version = data["version"]
+        game.seq = data.get("seq", 0)
+        detached_at = time.monotonic()
+        for username, resume_token in data.get("resume_tokens", {}).items():
+            member = get_player(username)
+            member.resume_token = resume_token
+            member.detached_at = detached_at
+            game.members.append(member)
+            game._scores[username] = game._departed_scores.pop(username, 0)
+        if game.members:
+            game.empty_since = None
+        return game
 
     async def fill_history(self, new_member: User):
         """Post all historic messages to new player."""
-        for message in self.history:
-            await new_member.send_message(message=message)
+        for entry in self.history:
+            if isinstance(entry, Stroke):
+                metrics.messages_out.inc(TopicEnum.DRAW.value, entry.operation)
+                await new_member.send_data(data=entry.dict())
+            else:
+                await new_member.send_message(message=entry)
 
     def leave(self, member: User):
-        """Accept the new player and store it in a list"""
-        self.score.pop(member.username, None)
+        """Remove the player from a game, keeping the score in case of return"""
         if member in self.members:
             self.members.remove(member)
+            self._departed_scores[member.username] = self._scores.pop(member.username, 0)
+            self._invalidate_score()
+            if not self.members:
+                self.empty_since = time.monotonic()
@@ -0,0 +1,230 @@
+import asyncio
+import sqlite3
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from codejam.server.interfaces.leaderboard_message import LeaderboardEntry
+from codejam.server.settings import settings
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS wins "
+    "(username TEXT NOT NULL, game_id TEXT NOT NULL, points INTEGER NOT NULL, "
+    "created_at REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS results "
+    "(username TEXT NOT NULL, game_id TEXT NOT NULL, points INTEGER NOT NULL, "
+    "won INTEGER NOT NULL, created_at REAL NOT NULL)",
+)
+
+
+class Standing:
+    """Running totals of a single player."""
+
+    def __init__(self, username: str):
+        self.username = username
+        self.points = 0
+        self.games_played = 0
+        self.games_won = 0
+
+
+class Leaderboard:
+    """
+    Cross-game scores kept in memory and written through to SQLite.
+
+    Records are queued on the event loop and inserted in batches in a worker thread,
+    so recording a score never blocks the websocket loop. Totals are reloaded from the
+    store periodically, so workers sharing it see the scores recorded by the others.
+    """
+
+    def __init__(
+        self,
+        path: str = None,
+        flush_interval: float = None,
+        batch_size: int = None,
+        top_k: int = None,
+        refresh_interval: float = None,
+    ):
+        self.path = path or settings.leaderboard_db
+        self.flush_interval = (
+            flush_interval if flush_interval is not None else settings.leaderboard_flush_interval
+        )
+        self.batch_size = batch_size or settings.leaderboard_batch_size
+        self.top_k = top_k or settings.leaderboard_top_k
+        self.refresh_interval = (
+            refresh_interval
+            if refresh_interval is not None
+            else settings.leaderboard_refresh_interval
+        )
+        self.standings: Dict[str, Standing] = {}
+        self._pending_wins: List[Tuple[str, str, int, float]] = []
+        self._pending_results: List[Tuple[str, str, int, int, float]] = []
+        self._top: Optional[List[LeaderboardEntry]] = None
+        self._connection: Optional[sqlite3.Connection] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def pending(self) -> int:
+        """Number of records waiting to be written."""
+        return len(self._pending_wins) + len(self._pending_results)
+
+    def record_win(self, username: str, game_id: str, points: int) -> None:
+        """Add points won (or taken back) by a player in a game."""
+        self._get_standing(username).points += points
+        self._pending_wins.append((username, game_id, points, time.time()))
+        self._changed()
+
+    def record_game_end(self, game_id: str, score: Dict[str, int]) -> None:
+        """Store final results of a finished game."""
+        max_score = max(score.values(), default=None)
+        now = time.time()
+        for username, points in score.items():
+            won = int(points == max_score)
+            standing = self._get_standing(username)
+            standing.games_played += 1
+            standing.games_won += won
+            self._pending_results.append((username, game_id, points, won, now))
+        self._changed()
+
+    def top(self, limit: int = None) -> List[LeaderboardEntry]:
+        """Returns best players, served from cache until scores change."""
+        if self._top is None:
+            ordered = sorted(self.standings.values(), key=lambda x: x.points, reverse=True)
+            self._top = self._ranked(ordered[: self.top_k])
+        return self._top[:limit] if limit else self._top
+
+    def get_entry(self, username: str) -> Optional[LeaderboardEntry]:
+        """Returns standing of a single player or None if the player never scored."""
+        standing = self.standings.get(username)
+        if standing is None:
+            return None
+        cached = next((x for x in self.top() if x.username == username), None)
+        if cached:
+            return cached
+        rank = 1 + sum(1 for x in self.standings.values() if x.points > standing.points)
+        return self._entry(standing=standing, rank=rank)
+
+    async def start(self) -> None:
+        """Load persisted totals without blocking the loop and keep them fresh."""
+        await self.refresh()
+        if self.refresh_interval:
+            self._refresh_task = asyncio.create_task(self._refresh_periodically())
+
+    async def refresh(self) -> None:
+        """Replace totals with the persisted ones, records not written yet are kept."""
+        async with self._lock:
+            rows = await asyncio.to_thread(self._load)
+        self.standings = {}
+        for username, points, games_played, games_won in rows:
+            standing = self._get_standing(username)
+            standing.points += points
+            standing.games_played += games_played
+            standing.games_won += games_won
+        for username, _, points, _ in self._pending_wins:
+            self._get_standing(username).points += points
+        for username, _, _, won, _ in self._pending_results:
+            standing = self._get_standing(username)
+            standing.games_played += 1
+            standing.games_won += won
+        self._top = None
+
+    async def flush(self) -> None:
+        """Write all pending records in one batch in a worker thread."""
+        async with self._lock:
+            wins, self._pending_wins = self._pending_wins, []
+            results, self._pending_results = self._pending_results, []
+            if wins or results:
+                await asyncio.to_thread(self._write, wins, results)
+
+    async def close(self) -> None:
+        """Flush pending records and close the store."""
+        if self._refresh_task:
+            self._refresh_task.cancel()
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+        await self.flush()
+        if self._connection:
+            self._connection.close()
+            self._connection = None
+
+    def _changed(self) -> None:
+        """Invalidate cache and make sure pending records will be written."""
+        self._top = None
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if (
+            self._flush_task is None
+            or self._flush_task.done()
+            or self._flush_task.get_loop().is_closed()
+        ):
+            self._flush_task = loop.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        """Wait for more records to batch them together, unless the batch is full."""
+        while self.pending:
+            if self.pending < self.batch_size:
+                await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def _refresh_periodically(self) -> None:
+        """Reload totals every refresh interval."""
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            await self.refresh()
+
+    def _get_standing(self, username: str) -> Standing:
+        """Get or create player's standing."""
+        if username not in self.standings:
+            self.standings[username] = Standing(username=username)
+        return self.standings[username]
+
+    def _ranked(self, ordered: List[Standing]) -> List[LeaderboardEntry]:
+        """Assign ranks to ordered standings, tied players share the rank."""
+        entries = []
+        last_points, last_rank = None, 0
+        for position, standing in enumerate(ordered, start=1):
+            if standing.points != last_points:
+                last_points, last_rank = standing.points, position
+            entries.append(self._entry(standing=standing, rank=last_rank))
+        return entries
+
+    @staticmethod
+    def _entry(standing: Standing, rank: int) -> LeaderboardEntry:
+        """Convert standing into api entry."""
+        return LeaderboardEntry(
+            username=standing.username,
+            rank=rank,
+            points=standing.points,
+            games_played=standing.games_played,
+            games_won=standing.games_won,
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the store on first use, runs in a worker thread."""
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            for statement in SCHEMA:
+                self._connection.execute(statement)
+        return self._connection
+
+    def _write(self, wins: Sequence[Tuple], results: Sequence[Tuple]) -> None:
+        """Insert records in a single transaction, runs in a worker thread."""
+        with self._connect() as connection:
+            connection.executemany("INSERT INTO wins VALUES (?, ?, ?, ?)", wins)
+            connection.executemany("INSERT INTO results VALUES (?, ?, ?, ?, ?)", results)
+
+    def _load(self) -> List[Tuple[str, int, int, int]]:
+        """Read totals per player, runs in a worker thread."""
+        connection = self._connect()
+        totals: Dict[str, List[int]] = {}
+        for username, points in connection.execute(
+            "SELECT username, SUM(points) FROM wins GROUP BY username"
+        ):
+            totals[username] = [points, 0, 0]
+        for username, games_played, games_won in connection.execute(
+            "SELECT username, COUNT(*), SUM(won) FROM results GROUP BY username"
+        ):
+            totals.setdefault(username, [0, 0, 0])[1:] = [games_played, games_won]
+        return [(username, x, y, z) for username, (x, y, z) in totals.items()]
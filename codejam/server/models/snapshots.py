@@ -0,0 +1,275 @@
+import asyncio
+import sqlite3
+import time
+import uuid
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
+
+from codejam.serialization import dumps, loads
+from codejam.server.interfaces.message import Message
+from codejam.server.interfaces.picture_message import LineData, PictureMessage
+from codejam.server.interfaces.topics import DrawOperations, TopicEnum
+from codejam.server.models.game import Game
+from codejam.server.models.stroke import unpack
+from codejam.server.settings import settings
+
+if TYPE_CHECKING:  # pragma: no cover
+    from codejam.server.models.leaderboard import Leaderboard
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS games "
+    "(game_id TEXT PRIMARY KEY, version INTEGER NOT NULL, data TEXT NOT NULL, "
+    "updated_at REAL NOT NULL, worker_id TEXT)"
+)
+HISTORY_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS history "
+    "(game_id TEXT NOT NULL, position INTEGER NOT NULL, data TEXT NOT NULL, "
+    "PRIMARY KEY (game_id, position))"
+)
+
+
+class HistoryCompactor:
+    """
+    Drops messages that do not change the final canvas as the history grows.
+
+    Lines are sent as cumulative points while the drawer moves, so a line whose points
+    are the beginning of the next line of the same player, colour and width is redundant.
+    Messages repeated with the same draw_id are stored only once.
+    """
+
+    def __init__(self):
+        self.last_lines: Dict[str, Tuple[int, LineData]] = {}
+        self.seen: Set[str] = set()
+
+    def add(
+        self, history: List[Message], start: int = 0
+    ) -> Tuple[List[Tuple[int, Message]], List[int]]:
+        """Returns messages to keep with their positions and positions made redundant."""
+        kept: List[Tuple[int, Message]] = []
+        dropped: List[int] = []
+        for position, message in enumerate(history, start):
+            draw_id = getattr(message.value, "draw_id", None)
+            if draw_id is not None:
+                if draw_id in self.seen:
+                    continue
+                self.seen.add(draw_id)
+            if (
+                message.topic.type == TopicEnum.DRAW.value
+                and message.topic.operation == DrawOperations.LINE.value
+                and isinstance(message.value, PictureMessage)
+                and isinstance(message.value.data, LineData)
+            ):
+                data = message.value.data
+                previous_line = self.last_lines.get(message.username)
+                if previous_line is not None:
+                    previous_position, previous = previous_line
+                    if (
+                        previous.colour == data.colour
+                        and previous.width == data.width
+                        and data.line[: len(previous.line)] == previous.line
+                    ):
+                        dropped.append(previous_position)
+                self.last_lines[message.username] = (position, data)
+            kept.append((position, message))
+        return kept, dropped
+
+
+def compact_history(history: List[Message]) -> List[Message]:
+    """Drop messages that do not change the final canvas, keeping the drawing order."""
+    kept, dropped = HistoryCompactor().add(history=history)
+    redundant = set(dropped)
+    return [message for position, message in kept if position not in redundant]
+
+
+def encode_snapshot(data: Dict) -> Dict:
+    """Convert game snapshot into json serializable data with compacted canvas."""
+    history = [unpack(x) for x in data["history"]]
+    return {
+        **data,
+        "history": [x.dict() for x in compact_history(history)],
+        "replay": [x.dict() for x in data.get("replay", [])],
+    }
+
+
+class SnapshotStore:
+    """
+    Periodically stores changed games in SQLite so they survive a restart.
+
+    Snapshots are taken on the loop as cheap shallow copies, the encoding and writing
+    happens in a worker thread so the game loop is never stopped.
+
+    Workers sharing the database own the rows of the games they hold. A worker loads
+    only games released by stopped workers or left behind by crashed ones, whose rows
+    were not refreshed for three intervals.
+
+    The canvas is kept in its own table, only the history appended since the last
+    snapshot is compacted and written, lines it makes redundant are deleted.
+    """
+
+    def __init__(self, path: str = None, interval: float = None, worker_id: str = None):
+        self.path = path or settings.snapshot_db
+        self.interval = interval if interval is not None else settings.snapshot_interval
+        self.worker_id = worker_id or uuid.uuid4().hex[:8]
+        self._versions: Dict[str, int] = {}
+        self._written: Dict[str, int] = {}
+        self._offsets: Dict[str, int] = {}
+        self._compactors: Dict[str, HistoryCompactor] = {}
+        self._connection: Optional[sqlite3.Connection] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, games: Dict[str, Game]) -> None:
+        """Start periodic snapshots of given games."""
+        self._task = asyncio.create_task(self.run(games=games))
+
+    async def run(self, games: Dict[str, Game]) -> None:
+        """Store changed games every interval."""
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.save(games=games)
+            await asyncio.to_thread(self._touch)
+
+    async def save(self, games: Dict[str, Game]) -> int:
+        """Write games changed since the last snapshot and forget removed ones."""
+        changed = []
+        for game in list(games.values()):
+            if self._versions.get(game.secret) == game.version:
+                continue
+            written = self._written.get(game.secret)
+            if written is None or written > len(game.history):
+                changed.append((game.snapshot(), 0, True))
+            else:
+                changed.append((game.snapshot(history_from=written), written, False))
+        removed = [x for x in self._versions if x not in games]
+        if changed or removed:
+            try:
+                await asyncio.to_thread(self._write, changed, removed)
+            except Exception:
+                for data, _, _ in changed:
+                    self._written.pop(data["game_id"], None)
+                raise
+            for data, start, _ in changed:
+                self._versions[data["game_id"]] = data["version"]
+                self._written[data["game_id"]] = start + len(data["history"])
+            for game_id in removed:
+                self._versions.pop(game_id)
+                self._written.pop(game_id, None)
+                self._offsets.pop(game_id, None)
+                self._compactors.pop(game_id, None)
+        return len(changed)
+
+    async def load(self, leaderboard: "Leaderboard" = None) -> List[Game]:
+        """Rehydrate games from the last snapshot which no running worker holds."""
+        rows = await asyncio.to_thread(self._claim)
+        games = []
+        for data, history, next_position in rows:
+            snapshot = loads(data)
+            if history:
+                snapshot["history"] = [loads(x) for x in history]
+            game = Game.from_snapshot(snapshot, leaderboard=leaderboard)
+            self._versions[game.secret] = game.version
+            if history:
+                self._written[game.secret] = len(game.history)
+                self._offsets[game.secret] = next_position - len(game.history)
+            games.append(game)
+        return games
+
+    async def close(self, games: Dict[str, Game] = None) -> None:
+        """Stop periodic snapshots, store the final state if games are provided."""
+        if self._task:
+            self._task.cancel()
+        if games is not None:
+            await self.save(games=games)
+        if self._connection:
+            await asyncio.to_thread(self._release)
+            self._connection.close()
+            self._connection = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the store on first use, runs in a worker thread."""
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute(SCHEMA)
+            self._connection.execute(HISTORY_SCHEMA)
+            columns = [x[1] for x in self._connection.execute("PRAGMA table_info(games)")]
+            if "worker_id" not in columns:
+                self._connection.execute("ALTER TABLE games ADD COLUMN worker_id TEXT")
+        return self._connection
+
+    def _write(self, changed: List[Tuple[Dict, int, bool]], removed: List[str]) -> None:
+        """Upsert changed games and delete removed ones, runs in a worker thread."""
+        now = time.time()
+        rows: List[Tuple] = []
+        history_rows: List[Tuple[str, int, str]] = []
+        redundant: List[Tuple[str, int]] = []
+        resets: List[Tuple[str]] = []
+        for data, start, reset in changed:
+            game_id = data["game_id"]
+            if reset:
+                resets.append((game_id,))
+                self._compactors[game_id] = HistoryCompactor()
+                self._offsets[game_id] = 0
+            compactor = self._compactors.setdefault(game_id, HistoryCompactor())
+            offset = self._offsets.get(game_id, 0)
+            kept, dropped = compactor.add(
+                history=[unpack(x) for x in data["history"]], start=start
+            )
+            history_rows.extend((game_id, offset + x, dumps(y.dict())) for x, y in kept)
+            redundant.extend((game_id, offset + x) for x in dropped)
+            state = dumps(encode_snapshot({**data, "history": []}))
+            rows.append((game_id, data["version"], state, now, self.worker_id))
+        with self._connect() as connection:
+            connection.executemany("DELETE FROM history WHERE game_id = ?", resets)
+            connection.executemany("INSERT OR REPLACE INTO games VALUES (?, ?, ?, ?, ?)", rows)
+            connection.executemany("INSERT OR REPLACE INTO history VALUES (?, ?, ?)", history_rows)
+            connection.executemany(
+                "DELETE FROM history WHERE game_id = ? AND position = ?", redundant
+            )
+            connection.executemany(
+                "DELETE FROM games WHERE game_id = ? AND worker_id = ?",
+                [(x, self.worker_id) for x in removed],
+            )
+            connection.executemany(
+                "DELETE FROM history WHERE game_id = ? "
+                "AND game_id NOT IN (SELECT game_id FROM games)",
+                [(x,) for x in removed],
+            )
+
+    def _touch(self) -> None:
+        """Mark rows of held games as alive, runs in a worker thread."""
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE games SET updated_at = ? WHERE worker_id = ?",
+                (time.time(), self.worker_id),
+            )
+
+    def _claim(self) -> List[Tuple[str, List[str], int]]:
+        """
+        Take over released and abandoned games and read them, runs in a worker thread.
+
+        Returns state of each game with its canvas and the next free history position.
+        """
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE games SET worker_id = ?, updated_at = ? "
+                "WHERE worker_id IS NULL OR worker_id = ? OR updated_at < ?",
+                (self.worker_id, now, self.worker_id, now - 3 * self.interval),
+            )
+            rows = connection.execute(
+                "SELECT game_id, data FROM games WHERE worker_id = ?", (self.worker_id,)
+            ).fetchall()
+            claimed = []
+            for game_id, data in rows:
+                history = connection.execute(
+                    "SELECT position, data FROM history WHERE game_id = ? ORDER BY position",
+                    (game_id,),
+                ).fetchall()
+                next_position = history[-1][0] + 1 if history else 0
+                claimed.append((data, [x for _, x in history], next_position))
+        return claimed
+
+    def _release(self) -> None:
+        """Let other workers load the held games, runs in a worker thread."""
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE games SET worker_id = NULL WHERE worker_id = ?", (self.worker_id,)
+            )
@@ -0,0 +1,120 @@
+from array import array
+from typing import Dict, Tuple, Union, cast
+
+from codejam.server.interfaces.message import Message
+from codejam.server.interfaces.picture_message import LineData, PictureMessage
+from codejam.server.interfaces.topics import Topic, TopicEnum
+
+MAX_INTERNED_COLOURS = 4096
+
+_colours: Dict[Tuple, Tuple] = {}
+
+
+def intern_colour(colour) -> Tuple:
+    """Returns a shared tuple equal to the colour, strokes mostly use a few colours."""
+    key = tuple(colour)
+    shared = _colours.get(key)
+    if shared is None:
+        if len(_colours) >= MAX_INTERNED_COLOURS:
+            return key
+        shared = _colours[key] = key
+    return shared
+
+
+class Stroke:
+    """
+    Line of the canvas kept in game history.
+
+    Points are packed in a double array instead of a list of float objects inside a tree
+    of pydantic models, the message is built again only when the stroke is sent.
+    """
+
+    __slots__ = (
+        "seq",
+        "operation",
+        "username",
+        "game_id",
+        "draw_id",
+        "points",
+        "colour",
+        "width",
+    )
+
+    def __init__(
+        self,
+        seq: int,
+        operation: str,
+        username: str,
+        game_id: str,
+        draw_id: str,
+        points: array,
+        colour: Tuple,
+        width: int,
+    ):
+        self.seq = seq
+        self.operation = operation
+        self.username = username
+        self.game_id = game_id
+        self.draw_id = draw_id
+        self.points = points
+        self.colour = colour
+        self.width = width
+
+    @classmethod
+    def pack(cls, message: Message) -> Union["Stroke", Message]:
+        """Returns stroke of a drawn line, other messages are returned unchanged."""
+        value = message.value
+        if (
+            message.topic.type != TopicEnum.DRAW.value
+            or not isinstance(value, PictureMessage)
+            or not isinstance(value.data, LineData)
+        ):
+            return message
+        data = value.data
+        return cls(
+            seq=message.seq,
+            operation=cast(str, message.topic.operation),
+            username=message.username,
+            game_id=message.game_id,
+            draw_id=value.draw_id,
+            points=array("d", data.line),
+            colour=intern_colour(data.colour),
+            width=data.width,
+        )
+
+    def message(self) -> Message:
+        """Returns the stroke as message sent to players."""
+        return Message.construct(
+            topic=Topic.construct(type=TopicEnum.DRAW.value, operation=self.operation),
+            username=self.username,
+            game_id=self.game_id,
+            seq=self.seq,
+            value=PictureMessage.construct(
+                draw_id=self.draw_id,
+                data=LineData.construct(
+                    line=self.points.tolist(), colour=list(self.colour), width=self.width
+                ),
+            ),
+        )
+
+    def dict(self) -> Dict:
+        """Returns the stroke as message data, much cheaper than building the message."""
+        return {
+            "topic": {"type": TopicEnum.DRAW.value, "operation": self.operation},
+            "username": self.username,
+            "game_id": self.game_id,
+            "value": {
+                "draw_id": self.draw_id,
+                "data": {
+                    "line": self.points.tolist(),
+                    "colour": list(self.colour),
+                    "width": self.width,
+                },
+            },
+            "seq": self.seq,
+        }
+
+
+def unpack(entry: Union[Stroke, Message]) -> Message:
+    """Returns message of a history entry."""
+    return entry.message() if isinstance(entry, Stroke) else entry
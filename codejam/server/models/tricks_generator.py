@@ -3,8 +3,8 @@ import random
 from typing import Dict
 
 from codejam.server.interfaces.message import Message
-from codejam.server.interfaces.topics import Topic, TopicEnum, TrickOperations
-from codejam.server.interfaces.trick_message import TrickMessage
+from codejam.server.interfaces.topics import TopicEnum, TrickOperations
+from codejam.server.interfaces.trick_message import PacmanData, TrickMessage
 from codejam.server.models.game import Game
 
 
@@ -48,20 +48,37 @@ class TrickGenerator:
         """Selects a delay for a trick from 3s to 1/2 of turn duration."""
         return random.randint(3, int(self.game.current_turn.duration / 3))
 
+    @staticmethod
+    def prepare_pacman() -> PacmanData:
+        """Selects the first sweep of pacman, next ones are derived from the seed."""
+        return PacmanData.construct(
+            origin=[random.random(), random.random()],
+            direction=random.choice(["vertical", "horizontal"]),
+            duration=0.5,
+            interval=3,
+            seed=random.getrandbits(32),
+        )
+
     def prepare_trick_message(self) -> Message:
         """Formats the trick message."""
         operation = self.generate_trick()
-        return Message(
-            topic=Topic(type=TopicEnum.TRICK, operation=operation),
+        return Message.trusted(
+            type=TopicEnum.TRICK,
+            operation=operation,
             username=self.prankster,
             game_id=self.game.secret,
-            value=TrickMessage(
+            value=TrickMessage.construct(
                 game_id=self.game.secret,
                 description=self.choose_description(operation=operation),
+                pacman=self.prepare_pacman() if operation == TrickOperations.PACMAN else None,
             ),
         )
 
     async def release_the_kraken(self):
-        """Release the trick on the drawing user."""
+        """Release the trick on the drawing user, pacman is seen by all players."""
         await asyncio.sleep(self.choose_delay())
-        await self.game.current_turn.drawer.send_message(self.prepare_trick_message())
+        message = self.prepare_trick_message()
+        if message.topic.operation == TrickOperations.PACMAN.value:
+            await self.game.broadcast(message=message)
+        elif self.game.current_turn.drawer.detached_at is None:
+            await self.game.current_turn.drawer.send_message(message)
@@ -1,24 +1,141 @@
-from typing import TYPE_CHECKING, List
+import secrets
+import time
+from asyncio import Task
+from collections import deque
+from typing import TYPE_CHECKING, Deque, Dict, List, Optional
 
 from starlette.websockets import WebSocket
 
 from codejam import logger
+from codejam.log import lazy
+from codejam.serialization import dumps
+from codejam.server.metrics import metrics
 
 if TYPE_CHECKING:  # pragma: no cover
+    from codejam.server.bus.base_bus import BaseBus
     from codejam.server.interfaces.message import Message
     from codejam.server.models.game import Game
+    from codejam.server.rate_limit import TokenBucket
+
+
+class RttStats:
+    """Round trip times of a single connection, smoothed like TCP SRTT."""
+
+    __slots__ = ("last", "smoothed", "min", "max", "samples")
+
+    alpha = 0.125
+
+    def __init__(self):
+        self.last: Optional[float] = None
+        self.smoothed: Optional[float] = None
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.samples: int = 0
+
+    def add(self, rtt: float) -> None:
+        """Record single measurement."""
+        self.last = rtt
+        self.smoothed = (
+            rtt if self.smoothed is None else self.smoothed + self.alpha * (rtt - self.smoothed)
+        )
+        self.min = rtt if self.min is None else min(self.min, rtt)
+        self.max = rtt if self.max is None else max(self.max, rtt)
+        self.samples += 1
+
+    def dict(self) -> Dict:
+        """Returns measurements in seconds."""
+        return {
+            "last": self.last,
+            "smoothed": self.smoothed,
+            "min": self.min,
+            "max": self.max,
+            "samples": self.samples,
+        }
 
 
 class User:
     """Represents a player."""
 
+    __slots__ = (
+        "username",
+        "score",
+        "websocket",
+        "owned_games",
+        "last_seen",
+        "last_heard",
+        "resume_token",
+        "detached_at",
+        "rtt",
+        "send_failures",
+        "buckets",
+        "pending_draws",
+        "flush_task",
+    )
+
     def __init__(self, username: str, websocket: WebSocket = None):
         self.username = username
         self.score: int = 0
         self.websocket = websocket
         self.owned_games: List["Game"] = []
+        self.last_seen = time.monotonic()
+        self.last_heard = self.last_seen
+        self.resume_token = secrets.token_urlsafe(16)
+        self.detached_at: Optional[float] = None
+        self.rtt = RttStats()
+        self.send_failures: int = 0
+        self.buckets: Dict[str, "TokenBucket"] = {}
+        self.pending_draws: Deque[Dict] = deque()
+        self.flush_task: Optional[Task] = None
 
     async def send_message(self, message: "Message"):
         """Broadcast the message to user."""
-        logger.debug(f"Sending message {message.json()} to user {self.username}")
-        await self.websocket.send_json(message.dict())
+        logger.debug(
+            "Sending message %s to user %s",
+            lazy(message.json),
+            self.username,
+            extra={"topic": message.topic.type},
+        )
+        metrics.messages_out.inc(message.topic.type, message.topic.operation)
+        await self.send_data(data=message.dict())
+
+    async def send_data(self, data: Dict):
+        """Send message already converted to dict to user."""
+        await self.send_text(text=dumps(data))
+
+    async def send_text(self, text: str):
+        """Send message already encoded as json to user."""
+        await self.websocket.send_text(text)
+
+    async def try_send_text(self, text: str) -> None:
+        """Send to the player, a broken connection must not stop sending to others."""
+        try:
+            await self.send_text(text=text)
+        except Exception as e:
+            self.send_failures += 1
+            logger.warning("Sending to %s failed: %r", self.username, e)
+
+
+class RemoteUser(User):
+    """Represents a player connected to another server worker."""
+
+    __slots__ = ("worker_id", "bus")
+
+    def __init__(self, username: str, worker_id: str, bus: "BaseBus"):
+        super().__init__(username=username)
+        self.worker_id = worker_id
+        self.bus = bus
+
+    async def send_data(self, data: Dict):
+        """Publish the message to the worker holding player's connection."""
+        await self.send_batch(users=[self], data=data)
+
+    @staticmethod
+    async def send_batch(users: List["RemoteUser"], data: Dict):
+        """Publish the message once per worker for all given players."""
+        workers: Dict[str, List[str]] = {}
+        for user in users:
+            workers.setdefault(user.worker_id, []).append(user.username)
+        for worker_id, usernames in workers.items():
+            await users[0].bus.publish(
+                f"worker.{worker_id}", {"usernames": usernames, "message": data}
+            )
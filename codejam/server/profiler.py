@@ -0,0 +1,97 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from types import FrameType
+from typing import Dict, List
+
+
+def collapse(frame: FrameType) -> str:
+    """Returns the stack of the frame as semicolon separated file:function, root first."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class StackSampler:
+    """Samples the stack of a thread from a background thread."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Dict[str, int] = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="codejam-profiler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = collapse(frame)
+            self.stacks[stack] = self.stacks.get(stack, 0) + 1
+            self.samples += 1
+
+    def start(self) -> None:
+        """Start sampling."""
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling and wait for the sampler thread."""
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self) -> str:
+        """Returns the samples in the collapsed format read by flame graph tools."""
+        ordered = sorted(self.stacks.items(), key=lambda x: x[1], reverse=True)
+        return "".join(f"{stack} {count}\n" for stack, count in ordered)
+
+
+async def loop_lag(seconds: float, interval: float) -> List[float]:
+    """Returns delays of callbacks scheduled every interval behind their due time."""
+    lags = []
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + seconds
+    while loop.time() < deadline:
+        due = loop.time() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, loop.time() - due))
+    return lags
+
+
+class Profiler:
+    """Profiles the event loop on demand, only a single profile runs at a time."""
+
+    def __init__(self):
+        self.running = False
+
+    async def profile(
+        self, seconds: float, interval: float = 0.005, lag_interval: float = 0.01
+    ) -> Dict:
+        """Sample stacks of the event loop thread and its lag for the given seconds."""
+        self.running = True
+        sampler = StackSampler(thread_id=threading.get_ident(), interval=interval)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            lags = await loop_lag(seconds=seconds, interval=lag_interval)
+        finally:
+            sampler.stop()
+            self.running = False
+        lags_ms = sorted(round(x * 1000, 3) for x in lags)
+        return {
+            "duration": round(time.perf_counter() - started, 3),
+            "samples": sampler.samples,
+            "collapsed": sampler.collapsed(),
+            "loop_lag_ms": {
+                "samples": len(lags_ms),
+                "mean": round(sum(lags_ms) / len(lags_ms), 3) if lags_ms else None,
+                "p99": lags_ms[int(len(lags_ms) * 0.99)] if lags_ms else None,
+                "max": lags_ms[-1] if lags_ms else None,
+            },
+        }
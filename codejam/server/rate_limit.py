@@ -0,0 +1,107 @@
+import time
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+from codejam.server.interfaces.topics import DrawOperations, TopicEnum
+from codejam.server.settings import settings
+
+if TYPE_CHECKING:  # pragma: no cover
+    from codejam.server.models.user import User
+
+
+class TokenBucket:
+    """Allows rate messages per second on average and bursts of up to burst messages."""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        """Add tokens earned since the last update."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, now: float = None) -> bool:
+        """Take a single token if available."""
+        self._refill(now if now is not None else time.monotonic())
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def delay(self, now: float = None) -> float:
+        """Returns seconds until a token is available."""
+        self._refill(now if now is not None else time.monotonic())
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+def supersedes(previous: Dict, data: Dict) -> bool:
+    """Check if raw draw message continues the line of the previous one."""
+    try:
+        first, second = previous["value"]["data"], data["value"]["data"]
+        return (
+            previous["topic"]["operation"] == DrawOperations.LINE.value
+            and data["topic"]["operation"] == DrawOperations.LINE.value
+            and previous.get("game_id") == data.get("game_id")
+            and first["colour"] == second["colour"]
+            and first["width"] == second["width"]
+            and second["line"][: len(first["line"])] == first["line"]
+        )
+    except (KeyError, TypeError):
+        return False
+
+
+class RateLimiter:
+    """Per-user token buckets of limited topics, counts rejected and coalesced messages."""
+
+    def __init__(self, limits: Dict[str, Tuple[float, float]] = None, max_pending: int = None):
+        self.limits = limits if limits is not None else settings.rate_limits
+        self.max_pending = max_pending if max_pending is not None else settings.max_pending_draws
+        self.rejected: Dict[str, int] = {x: 0 for x in self.limits}
+        self.coalesced = 0
+
+    def bucket(self, user: "User", topic: Optional[str]) -> Optional[TokenBucket]:
+        """Returns user's bucket of the topic, None if the topic is not limited."""
+        limit = self.limits.get(topic)
+        if limit is None:
+            return None
+        bucket = user.buckets.get(topic)
+        if bucket is None:
+            bucket = user.buckets[topic] = TokenBucket(*limit)
+        return bucket
+
+    def allow(self, user: "User", topic: Optional[str]) -> bool:
+        """Take a token of the user for the topic."""
+        bucket = self.bucket(user=user, topic=topic)
+        return bucket is None or bucket.take()
+
+    def reject(self, topic: str) -> None:
+        """Count message dropped over the limit."""
+        self.rejected[topic] += 1
+
+    def defer(self, user: "User", data: Dict) -> None:
+        """
+        Keep draw message over the limit to send it later.
+
+        Lines are sent as cumulative points, so a message continuing the line of the last
+        deferred one replaces it. When too many messages wait the oldest one is dropped.
+        """
+        pending = user.pending_draws
+        if pending and supersedes(previous=pending[-1], data=data):
+            pending[-1] = data
+            self.coalesced += 1
+            return
+        pending.append(data)
+        if len(pending) > self.max_pending:
+            pending.popleft()
+            self.reject(topic=TopicEnum.DRAW.value)
+
+    def stats(self) -> Dict[str, int]:
+        """Returns numbers of messages over the limits."""
+        return {
+            **{f"rate_limited_{key.lower()}": value for key, value in self.rejected.items()},
+            "rate_coalesced_draw": self.coalesced,
+        }
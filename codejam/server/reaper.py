@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import os
+import resource
+import time
+from typing import Dict, Optional
+
+from codejam.server.connection_manager import ConnectionManager
+from codejam.server.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def get_rss() -> int:
+    """Returns resident memory of the process in bytes."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:  # pragma: no cover
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Reaper:
+    """Periodically collects abandoned games and idle connections."""
+
+    def __init__(
+        self,
+        manager: ConnectionManager,
+        interval: float = None,
+        empty_game_ttl: float = None,
+        finished_game_ttl: float = None,
+        idle_connection_ttl: float = None,
+        resume_ttl: float = None,
+    ):
+        self.manager = manager
+        self.interval = interval if interval is not None else settings.reaper_interval
+        self.empty_game_ttl = (
+            empty_game_ttl if empty_game_ttl is not None else settings.empty_game_ttl
+        )
+        self.finished_game_ttl = (
+            finished_game_ttl if finished_game_ttl is not None else settings.finished_game_ttl
+        )
+        self.idle_connection_ttl = (
+            idle_connection_ttl
+            if idle_connection_ttl is not None
+            else settings.idle_connection_ttl
+        )
+        self.resume_ttl = resume_ttl if resume_ttl is not None else settings.resume_ttl
+        self.reaped = {
+            "empty_games": 0,
+            "finished_games": 0,
+            "idle_connections": 0,
+            "detached_members": 0,
+        }
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start periodic collection."""
+        self._task = asyncio.create_task(self.run())
+
+    async def close(self) -> None:
+        """Stop periodic collection."""
+        if self._task:
+            self._task.cancel()
+
+    async def run(self) -> None:  # pragma: no cover
+        """Collect every interval."""
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.reap()
+
+    async def reap(self) -> Dict[str, int]:
+        """Remove expired games and close silent connections, returns numbers collected."""
+        now = time.monotonic()
+        reaped = {key: 0 for key in self.reaped}
+        for game in list(self.manager.active_games.values()):
+            for member in list(game.members):
+                if member.detached_at is not None and now - member.detached_at > self.resume_ttl:
+                    reaped["detached_members"] += 1
+                    game.leave(member)
+            if game.creator.detached_at is not None and game.creator not in game.members:
+                self.manager.remove_game(game=game)
+                continue
+            if game.empty_since is not None and now - game.empty_since > self.empty_game_ttl:
+                reaped["empty_games"] += 1
+            elif game.finished_at is not None and now - game.finished_at > self.finished_game_ttl:
+                reaped["finished_games"] += 1
+            else:
+                continue
+            self.manager.remove_game(game=game)
+        for user in list(self.manager.active_connections):
+            if now - user.last_heard > self.idle_connection_ttl:
+                # only close, the endpoint then detaches the player like on any other drop
+                reaped["idle_connections"] += 1
+                try:
+                    await user.websocket.close(code=1001)
+                except Exception as e:  # pragma: no cover
+                    logger.debug("Closing idle connection of %s failed: %s", user.username, e)
+        for key, value in reaped.items():
+            self.reaped[key] += value
+        return reaped
+
+    def stats(self) -> Dict[str, int]:
+        """Returns resource usage to watch for leaks."""
+        games = self.manager.active_games.values()
+        return {
+            "rss_bytes": get_rss(),
+            "tasks": len(asyncio.all_tasks()),
+            "active_connections": len(self.manager.active_connections),
+            "remote_users": len(self.manager.remote_users),
+            "active_games": len(games),
+            "empty_games": sum(1 for x in games if x.empty_since is not None),
+            "finished_games": sum(1 for x in games if x.finished_at is not None),
+            "history_messages": sum(len(x.history) for x in games),
+            "pending_timers": sum(
+                1
+                for x in games
+                for task in (x.active_turn, x.active_trick)
+                if task and not task.done()
+            ),
+            **{f"reaped_{key}": value for key, value in self.reaped.items()},
+        }
@@ -0,0 +1,154 @@
+import asyncio
+import time
+from typing import Dict, Optional, cast
+
+import pydantic
+
+from codejam import logger
+from codejam.log import topic_of
+from codejam.serialization import loads
+from codejam.server.connection_manager import ConnectionManager
+from codejam.server.controllers.chat_controller import ChatController
+from codejam.server.controllers.draw_controller import DrawController
+from codejam.server.controllers.error_controller import ErrorController
+from codejam.server.controllers.game_controller import GameController
+from codejam.server.controllers.heartbeat_controller import HeartbeatController
+from codejam.server.exceptions import (
+    FrameTooLarge,
+    InvalidFrame,
+    RateLimitExceeded,
+    StrokeTooLong,
+    WhiteBoardException,
+)
+from codejam.server.interfaces.error_message import ErrorMessage
+from codejam.server.interfaces.message import Message
+from codejam.server.interfaces.topics import ErrorOperations, GameOperations, TopicEnum
+from codejam.server.metrics import metrics
+from codejam.server.models.user import User
+from codejam.server.rate_limit import RateLimiter
+from codejam.server.settings import settings
+from codejam.server.tracing import Tracer, annotate, span
+
+
+class Router:
+    """Validates incoming messages and dispatches them to topic controllers."""
+
+    def __init__(self, manager: ConnectionManager):
+        self.manager = manager
+        self.limiter = RateLimiter()
+        self.tracer = Tracer()
+        self.controllers = {
+            TopicEnum.DRAW.value: DrawController,
+            TopicEnum.GAME.value: GameController,
+            TopicEnum.CHAT.value: ChatController,
+            TopicEnum.HEARTBEAT.value: HeartbeatController,
+        }
+
+    async def receive(self, user: User, text: str, game_id: str = None) -> Optional[str]:
+        """Check limits of a frame received from the user's connection and route it."""
+        trace = self.tracer.start(username=user.username)
+        try:
+            return await self._receive(user=user, text=text, game_id=game_id)
+        finally:
+            self.tracer.finish(trace)
+
+    async def _receive(self, user: User, text: str, game_id: Optional[str]) -> Optional[str]:
+        """Decode the frame and route it, errors are reported to the user."""
+        try:
+            with span("decode"):
+                size = len(text) if text.isascii() else len(text.encode())
+                if size > settings.max_frame_size:
+                    raise FrameTooLarge(
+                        f"Message can have at most {settings.max_frame_size} bytes"
+                    )
+                try:
+                    data = loads(text)
+                except ValueError:
+                    raise InvalidFrame("Message is not a valid json")
+            annotate(topic=topic_of(data), frame_bytes=size)
+            logger.debug("Received %s", text, extra={"topic": topic_of(data)})
+            self.check_limits(data=data)
+            if self.throttle(user=user, data=data, game_id=game_id):
+                annotate(deferred=True)
+                return game_id
+        except WhiteBoardException as e:
+            user.last_heard = time.monotonic()
+            await self.send_error(user=user, error=e, game_id=game_id)
+            return game_id
+        return await self.route(user=user, data=data, game_id=game_id)
+
+    def throttle(self, user: User, data: Dict, game_id: Optional[str]) -> bool:
+        """
+        Enforce user's rate of the message topic, returns True if the message was deferred.
+
+        Drawings over the limit are deferred and coalesced, other messages are rejected.
+        Drawings wait behind the deferred ones so their order is kept.
+        """
+        topic = topic_of(data)
+        if topic == TopicEnum.DRAW.value and (
+            user.pending_draws or not self.limiter.allow(user=user, topic=topic)
+        ):
+            user.last_heard = user.last_seen = time.monotonic()
+            self.limiter.defer(user=user, data=data)
+            if user.flush_task is None or user.flush_task.done():
+                user.flush_task = asyncio.create_task(self.flush_draws(user=user, game_id=game_id))
+            return True
+        if topic != TopicEnum.DRAW.value and not self.limiter.allow(user=user, topic=topic):
+            self.limiter.reject(topic=topic)
+            raise RateLimitExceeded(f"Too many {topic} messages, slow down!")
+        return False
+
+    async def flush_draws(self, user: User, game_id: Optional[str]) -> None:
+        """Route deferred drawings of the user as its tokens refill."""
+        bucket = self.limiter.bucket(user=user, topic=TopicEnum.DRAW.value)
+        while user.pending_draws:
+            await asyncio.sleep(bucket.delay())
+            if bucket.take():
+                await self.route(user=user, data=user.pending_draws.popleft(), game_id=game_id)
+
+    @staticmethod
+    def check_limits(data: Dict) -> None:
+        """Reject drawings over the size limits before they are validated."""
+        if topic_of(data) != TopicEnum.DRAW.value:
+            return
+        try:
+            points = len(data["value"]["data"].get("line") or ()) // 2
+        except (KeyError, TypeError, AttributeError):
+            return
+        if points > settings.max_stroke_points:
+            raise StrokeTooLong(f"Line can have at most {settings.max_stroke_points} points")
+
+    async def route(self, user: User, data: Dict, game_id: str = None) -> Optional[str]:
+        """Handle single message, returns the game_id the user plays in."""
+        now = time.monotonic()
+        user.last_heard = now
+        try:
+            with span("validate"):
+                message = Message(**data)
+            metrics.messages_in.inc(message.topic.type, message.topic.operation)
+            if message.topic.type != TopicEnum.HEARTBEAT.value:
+                user.last_seen = now
+            game_id = message.game_id
+            created = message.topic.operation == GameOperations.CREATE.value
+            if not created and self.manager.is_remote(game_id=game_id):
+                await self.manager.forward(user=user, game_id=game_id, data=data)
+                return game_id
+            controller = self.controllers[cast(str, message.topic.type)]
+            with span("controller"):
+                await controller(manager=self.manager).dispatch(message=message)  # type: ignore
+        except (pydantic.ValidationError, WhiteBoardException) as e:
+            await self.send_error(user=user, error=e, game_id=game_id)
+        return game_id
+
+    async def send_error(self, user: User, error: Exception, game_id: Optional[str]) -> None:
+        """Report the error to the user or the whole game."""
+        metrics.failures.inc(error.__class__.__name__)
+        message = Message.trusted(
+            type=TopicEnum.ERROR,
+            operation=ErrorOperations.BROADCAST,
+            username=user.username,
+            game_id=game_id,
+            value=ErrorMessage.construct(exception=error.__class__.__name__, value=str(error)),
+        )
+        annotate(error=error.__class__.__name__)
+        await ErrorController(manager=self.manager).dispatch(message=message)
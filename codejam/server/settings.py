@@ -0,0 +1,51 @@
+from typing import Dict, Optional, Tuple
+
+from pydantic import BaseSettings
+
+
+class Settings(BaseSettings):
+    """Server configuration, can be overwritten with CODEJAM_* environment variables."""
+
+    class Config:
+        env_prefix = "CODEJAM_"
+
+    leaderboard_db: str = "leaderboard.sqlite3"
+    leaderboard_flush_interval: float = 1.0
+    leaderboard_batch_size: int = 500
+    leaderboard_top_k: int = 100
+    leaderboard_refresh_interval: float = 10.0
+    snapshot_db: str = "snapshots.sqlite3"
+    snapshot_interval: float = 5.0
+    bus: str = "local"
+    bus_socket: str = "/tmp/codejam-bus.sock"
+    bus_max_buffer: int = 16 * 2**20
+    affinity: bool = False
+    worker_announce_interval: float = 5.0
+    forward_timeout: float = 2.0
+    reaper_interval: float = 30.0
+    empty_game_ttl: float = 300.0
+    finished_game_ttl: float = 60.0
+    idle_connection_ttl: float = 600.0
+    heartbeat_interval: float = 15.0
+    heartbeat_timeout: float = 45.0
+    replay_buffer_size: int = 512
+    resume_ttl: float = 60.0
+    drain_retry_after: float = 10.0
+    max_frame_size: int = 256 * 1024
+    max_stroke_points: int = 5000
+    max_history_bytes: int = 8 * 1024 * 1024
+    rate_limits: Dict[str, Tuple[float, float]] = {
+        "DRAW": (60, 120),
+        "CHAT": (2, 10),
+        "GAME": (5, 20),
+    }
+    max_pending_draws: int = 64
+    trace_sample_rate: float = 0.0
+    trace_export: Optional[str] = None
+    trace_keep: int = 1000
+    capture_file: Optional[str] = None
+    admin_token: Optional[str] = None
+    max_profile_seconds: float = 60.0
+
+
+settings = Settings()
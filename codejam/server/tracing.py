@@ -0,0 +1,179 @@
+import contextlib
+import random
+import secrets
+import time
+from collections import deque
+from contextvars import ContextVar, Token
+from typing import IO, Any, ContextManager, Deque, Dict, Iterator, List, Optional
+
+from codejam.serialization import dumps
+from codejam.server.settings import settings
+
+current: ContextVar[Optional["Trace"]] = ContextVar("trace", default=None)
+NO_SPAN: ContextManager = contextlib.nullcontext()
+
+
+class Trace:
+    """Timings of the stages of a single message, identified by a correlation id."""
+
+    __slots__ = (
+        "trace_id",
+        "username",
+        "started",
+        "started_at",
+        "duration",
+        "stages",
+        "attributes",
+        "token",
+    )
+
+    def __init__(self, username: str):
+        self.trace_id = secrets.token_hex(16)
+        self.username = username
+        self.started = time.perf_counter()
+        self.started_at = time.time()
+        self.duration: Optional[float] = None
+        self.stages: List[tuple] = []
+        self.attributes: Dict[str, Any] = {}
+        self.token: Optional[Token] = None
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[None]:
+        """Record duration of a stage."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append(
+                (name, started - self.started, time.perf_counter() - started, attributes)
+            )
+
+    def dict(self) -> Dict:
+        """Returns the trace with times in milliseconds."""
+        return {
+            "trace_id": self.trace_id,
+            "username": self.username,
+            "started_at": self.started_at,
+            "duration_ms": round((self.duration or 0) * 1000, 3),
+            "stages": [
+                {
+                    "name": name,
+                    "start_ms": round(start * 1000, 3),
+                    "duration_ms": round(duration * 1000, 3),
+                    **({"attributes": attributes} if attributes else {}),
+                }
+                for name, start, duration, attributes in self.stages
+            ],
+            "attributes": self.attributes,
+        }
+
+
+def active_trace() -> Optional[Trace]:
+    """Returns the open trace of the message being handled, None when it is not traced."""
+    trace = current.get()
+    if trace is None or trace.duration is not None:
+        return None
+    return trace
+
+
+def span(name: str, **attributes: Any) -> ContextManager:
+    """Record a stage of the message being handled, does nothing when it is not traced."""
+    trace = active_trace()
+    if trace is None:
+        return NO_SPAN
+    return trace.span(name, **attributes)
+
+
+def annotate(**attributes: Any) -> None:
+    """Add attributes to the trace of the message being handled."""
+    trace = current.get()
+    if trace is not None and trace.duration is None:
+        trace.attributes.update(attributes)
+
+
+def otlp_attributes(attributes: Dict[str, Any]) -> List[Dict]:
+    """Attributes in the OTLP json encoding."""
+    return [
+        {"key": f"codejam.{key}", "value": {"stringValue": str(value)}}
+        for key, value in attributes.items()
+    ]
+
+
+def otlp_span(trace: Trace, name: str, start: float, duration: float, span_id: str) -> Dict:
+    """Single span in the OTLP json encoding."""
+    started = int((trace.started_at + start) * 1e9)
+    result = {
+        "traceId": trace.trace_id,
+        "spanId": span_id,
+        "name": name,
+        "kind": 2 if span_id == trace.trace_id[:16] else 1,
+        "startTimeUnixNano": str(started),
+        "endTimeUnixNano": str(started + int(duration * 1e9)),
+    }
+    if span_id != trace.trace_id[:16]:
+        result["parentSpanId"] = trace.trace_id[:16]
+    return result
+
+
+def otlp(trace: Trace) -> Dict:
+    """Trace in the OTLP json encoding read by the collector's otlpjsonfile receiver."""
+    title = f"{trace.attributes.get('topic')} message"
+    root = otlp_span(trace, title, 0, trace.duration, trace.trace_id[:16])
+    root["attributes"] = otlp_attributes({"username": trace.username, **trace.attributes})
+    spans = [root]
+    for name, start, duration, attributes in trace.stages:
+        spans.append(otlp_span(trace, name, start, duration, secrets.token_hex(8)))
+        if attributes:
+            spans[-1]["attributes"] = otlp_attributes(attributes)
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [{"key": "service.name", "value": {"stringValue": "codejam"}}]
+                },
+                "scopeSpans": [{"scope": {"name": "codejam.server"}, "spans": spans}],
+            }
+        ]
+    }
+
+
+class Tracer:
+    """Samples incoming messages, keeps recent traces and exports them as OTLP json lines."""
+
+    def __init__(self, sample_rate: float = None, export: Optional[str] = None, keep: int = None):
+        self.sample_rate = settings.trace_sample_rate if sample_rate is None else sample_rate
+        self.export = settings.trace_export if export is None else export
+        self.recent: Deque[Trace] = deque(maxlen=settings.trace_keep if keep is None else keep)
+        self._file: Optional[IO] = None
+
+    def start(self, username: str) -> Optional[Trace]:
+        """Start tracing the message being handled if it is sampled."""
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+        trace = Trace(username=username)
+        trace.token = current.set(trace)
+        return trace
+
+    def finish(self, trace: Optional[Trace]) -> None:
+        """Stop the trace, keep it and export it."""
+        if trace is None:
+            return
+        trace.duration = time.perf_counter() - trace.started
+        current.reset(trace.token)
+        self.recent.append(trace)
+        if self.export:
+            if self._file is None:
+                self._file = open(self.export, "a")
+            self._file.write(dumps(otlp(trace)) + "\n")
+            self._file.flush()
+
+    def slowest(self, limit: int = 10) -> List[Dict]:
+        """Returns the slowest of the recent traces."""
+        ordered = sorted(self.recent, key=lambda x: x.duration, reverse=True)
+        return [x.dict() for x in ordered[:limit]]
+
+    def close(self) -> None:
+        """Close the export file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -1,3 +1,8 @@
+import os
+
+os.environ.setdefault("CODEJAM_LEADERBOARD_DB", ":memory:")
+os.environ.setdefault("CODEJAM_SNAPSHOT_DB", ":memory:")
+
 import pytest
 
 from codejam.server.interfaces.chat_message import ChatMessage
@@ -7,6 +7,7 @@ class WebsocketMock:
         self.refuse_connection = False
         self.cancel = False
         self.messages = []
+        self.sent = []
         self.url = ""
 
     async def __aenter__(self):
@@ -23,6 +24,7 @@ class WebsocketMock:
 
     async def send(self, value: str):
         self.messages.append(value)
+        self.sent.append(value)
 
     async def recv(self):
         if self.cancel:
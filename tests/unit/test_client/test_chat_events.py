@@ -63,6 +63,7 @@ class ChatTestCase(GraphicUnitTest):
             "topic": self.test_message.topic.dict(),
             "username": self.test_message.username,
             "game_id": self.test_message.game_id,
+            "seq": None,
             "value": self.test_message.value.dict(),
         }
         self.advance_frames(2)
@@ -112,6 +112,7 @@ class BasicDrawingTestCase(GraphicUnitTest):
             "topic": self.test_line.topic.dict(),
             "username": self.test_line.username,
             "game_id": root_widget.game_id,
+            "seq": None,
             "value": {
                 "draw_id": json.loads(wb_screen.message)["value"]["draw_id"],
                 "data": {
@@ -153,6 +154,7 @@ class BasicDrawingTestCase(GraphicUnitTest):
             "topic": self.test_line.topic.dict(),
             "username": self.test_line.username,
             "game_id": root_widget.game_id,
+            "seq": None,
             "value": {
                 "draw_id": json.loads(wb_screen.message)["value"]["draw_id"],
                 "data": {
@@ -193,6 +195,7 @@ class BasicDrawingTestCase(GraphicUnitTest):
             "topic": self.test_frame.topic.dict(),
             "username": self.test_frame.username,
             "game_id": root_widget.game_id,
+            "seq": None,
             "value": {
                 "draw_id": json.loads(wb_screen.message)["value"]["draw_id"],
                 "data": {
@@ -232,6 +235,7 @@ class BasicDrawingTestCase(GraphicUnitTest):
             "topic": self.test_rectangle.topic.dict(),
             "username": self.test_rectangle.username,
             "game_id": root_widget.game_id,
+            "seq": None,
             "value": {
                 "draw_id": json.loads(wb_screen.message)["value"]["draw_id"],
                 "data": {
@@ -8,9 +8,11 @@ from kivy.uix.modalview import ModalView
 from kivy.uix.screenmanager import NoTransition
 
 from codejam.client.client import root_widget
+from codejam.server.interfaces.error_message import ErrorMessage
 from codejam.server.interfaces.game_message import GameMessage, TurnMessage
 from codejam.server.interfaces.message import Message
 from codejam.server.interfaces.topics import (
+    ErrorOperations,
     GameOperations,
     Topic,
     TopicEnum,
@@ -218,6 +220,42 @@ class GameTestCase(GraphicUnitTest):
         self.advance_frames(2)
         assert len(wb_screen.ids.score_board.ids.scores.children) == 1
 
+    def test_resuming_game_from_websocket(self, *args):
+        self.root_widget = root_widget
+        self.render(self.root_widget)
+        wb_screen = self.root_widget.get_screen("whiteboard")
+
+        incoming_message = self.game_join_message.copy(deep=True)
+        incoming_message.value.resume_token = "token"
+        incoming_message.seq = 7
+        wb_screen.received = incoming_message.json()
+        assert wb_screen.manager.resume_token == "token"
+        assert wb_screen.manager.last_seq == 7
+
+        incoming_message = self.game_join_message.copy(deep=True)
+        incoming_message.topic.operation = GameOperations.RESUME.value
+        incoming_message.value.members = [root_widget.username, "third_user"]
+        incoming_message.value.resume_token = "next_token"
+        wb_screen.received = incoming_message.json()
+        self.advance_frames(2)
+        assert wb_screen.manager.resume_token == "next_token"
+        assert set(wb_screen.ids.score_board.ids.keys()) == {
+            "scores",
+            root_widget.username,
+            "third_user",
+        }
+
+        incoming_message = Message(
+            topic=Topic(type=TopicEnum.ERROR, operation=ErrorOperations.BROADCAST),
+            username=root_widget.username,
+            game_id=root_widget.game_id,
+            value=ErrorMessage(exception="ResumeFailed", value="No session"),
+        )
+        wb_screen.received = incoming_message.json()
+        assert wb_screen.manager.resume_token == ""
+        assert json.loads(wb_screen.message)["topic"]["operation"] == GameOperations.JOIN.value
+        wb_screen.message = ""
+
 
 
 
@@ -15,7 +15,7 @@ from codejam.server.interfaces.topics import (
     DrawOperations, GameOperations, Topic,
     TopicEnum, TrickOperations,
 )
-from codejam.server.interfaces.trick_message import TrickMessage
+from codejam.server.interfaces.trick_message import PacmanData, TrickMessage
 from codejam.server.models.phrase_generator import PhraseDifficulty
 
 
@@ -141,8 +141,15 @@ class TricksTestCase(GraphicUnitTest):
 
         incoming_message = self.test_trick_message.copy(deep=True)
         incoming_message.topic.operation = TrickOperations.PACMAN
+        incoming_message.value.pacman = PacmanData(
+            origin=[0.5, 0.25], direction="horizontal", duration=0.1, interval=0.2, seed=1
+        )
         wb_screen.received = incoming_message.json()
         assert json.loads(wb_screen.received_raw) == incoming_message.dict()
+        cvs = wb_screen.cvs
+        first_line = wb_screen.pacman_line
+        x1, y1, _, y2 = first_line.points
+        assert (x1, y1) == (cvs.x + 20, cvs.y + 20 + (cvs.height - 40) * 0.25) and y1 == y2
 
         popup = next((x for x in self._win.children if isinstance(x, ModalView)), None)
         assert popup.title == incoming_message.topic.operation.value
@@ -153,21 +160,13 @@ class TricksTestCase(GraphicUnitTest):
 
         self.render(self.root)
         self.assertLess(len(self._win.children), 2)
-        self.advance_frames(5)
-
-        assert json.loads(wb_screen.second_message) == {
-            "topic": Topic(type=TopicEnum.DRAW, operation=DrawOperations.LINE).dict(),
-            "username": root_widget.username,
-            "game_id": root_widget.game_id,
-            "value": {
-                "draw_id": json.loads(wb_screen.second_message)["value"]["draw_id"],
-                "data": {
-                    "line": json.loads(wb_screen.second_message)["value"]["data"]["line"],
-                    "colour": [.2, .9, .5],
-                    "width": 15,
-                },
-            },
-        }
+        self.advance_frames(30)
+        assert first_line.points[2] > x1
+        direction = wb_screen.direction
+        wb_screen.run_packman(0.2)
+        assert wb_screen.pacman_line is not first_line
+        assert wb_screen.direction != direction
+        assert not wb_screen.second_message
         wb_screen.cancel_trick()
         self.advance_frames(300)
 
@@ -262,6 +261,7 @@ class TricksTestCase(GraphicUnitTest):
             "topic": Topic(type=TopicEnum.DRAW, operation=DrawOperations.LINE),
             "username": root_widget.username,
             "game_id": root_widget.game_id,
+            "seq": None,
             "value": {
                 "draw_id": json.loads(wb_screen.message)["value"]["draw_id"],
                 "data": {
@@ -1,9 +1,21 @@
+import json
 from typing import Dict
 
 import pytest
+from websockets.exceptions import ConnectionClosedOK, InvalidHandshake
+from websockets.frames import Close
 
 from codejam.client.client import root_widget
+from codejam.client.events_handlers.utils import reconnect_delay, retry_hint
 from codejam.client.widgets.whiteboard_screen import WhiteBoardScreen
+from codejam.server.interfaces.heartbeat_message import HeartbeatMessage
+from codejam.server.interfaces.message import Message
+from codejam.server.interfaces.topics import (
+    GameOperations,
+    HeartbeatOperations,
+    Topic,
+    TopicEnum,
+)
 from tests.unit.test_client.mocks import WebsocketMock
 
 URL = f"ws://127.0.0.1:8000/ws/{root_widget.username}"
@@ -40,7 +52,7 @@ async def test_websockets(
     if attributes:
         for key, value in attributes.items():
             setattr(mocked_websockets, key, value)
-    screen = WhiteBoardScreen(manager=mocker.Mock(username=root_widget.username, game_id=root_widget.game_id))
+    screen = WhiteBoardScreen(manager=mocker.Mock(username=root_widget.username, game_id=root_widget.game_id, resume_token=""))
     message = "test message"
     screen.message = message
     screen.second_message = message
@@ -52,3 +64,91 @@ async def test_websockets(
     assert screen.received == expected_received
     assert screen.message == expected_message
     assert mocked_websockets.url == expected_url
+
+
+@pytest.mark.asyncio
+async def test_websocket_answers_ping(mocker, mocked_websockets: WebsocketMock):
+    screen = WhiteBoardScreen(manager=mocker.Mock(username=root_widget.username, game_id=root_widget.game_id))
+    ping = Message(
+        topic=Topic(type=TopicEnum.HEARTBEAT, operation=HeartbeatOperations.PING),
+        username=root_widget.username,
+        value=HeartbeatMessage(sent_at=1.0),
+    )
+    mocked_websockets.messages.append(ping.json(models_as_dict=True))
+    await screen.run_websocket()
+    pong = Message(**json.loads(mocked_websockets.sent[0]))
+    assert pong.topic.operation == HeartbeatOperations.PONG.value
+    assert pong.value.sent_at == 1.0
+    assert WhiteBoardScreen.answer_ping(mocked_websockets.sent[0]) is None
+    assert WhiteBoardScreen.answer_ping('{"topic": "CHAT"}') is None
+
+
+@pytest.mark.asyncio
+async def test_websocket_reconnects_and_resumes(mocker, mocked_websockets: WebsocketMock):
+    screen = WhiteBoardScreen(
+        manager=mocker.Mock(
+            username=root_widget.username,
+            game_id=root_widget.game_id,
+            resume_token="",
+            last_seq=3,
+        )
+    )
+    sleep = mocker.patch("codejam.client.widgets.whiteboard_screen.asyncio.sleep")
+    serve = mocker.patch.object(
+        screen, "serve_websocket", mocker.AsyncMock(side_effect=[ConnectionRefusedError, None])
+    )
+    with pytest.raises(ConnectionRefusedError):
+        await screen.run_websocket()
+
+    screen.manager.resume_token = "token"
+    serve.side_effect = [ConnectionRefusedError, InvalidHandshake, None]
+    await screen.run_websocket()
+    assert [x.kwargs["resume"] for x in serve.call_args_list[1:]] == [False, True, True]
+    assert sleep.await_count == 2
+
+    screen.reconnect_attempt = screen.max_reconnect_attempts
+    serve.side_effect = [ConnectionRefusedError]
+    with pytest.raises(ConnectionRefusedError):
+        await screen.run_websocket()
+
+    await WhiteBoardScreen.serve_websocket(screen, resume=True)
+    assert mocked_websockets.url == f"{URL}?resume_token=token"
+    resume = Message(**json.loads(mocked_websockets.sent[0]))
+    assert resume.topic.operation == GameOperations.RESUME.value
+    assert resume.value.resume_token == "token"
+    assert resume.value.last_seq == 3
+    assert screen.reconnect_attempt == 0
+
+
+def test_reconnect_delay_is_capped():
+    assert all(0 <= reconnect_delay(attempt=x) <= 30 for x in range(20))
+
+
+@pytest.mark.asyncio
+async def test_websocket_waits_for_hint_of_draining_server(mocker):
+    screen = WhiteBoardScreen(
+        manager=mocker.Mock(username=root_widget.username, game_id="", resume_token="")
+    )
+    sleep = mocker.patch("codejam.client.widgets.whiteboard_screen.asyncio.sleep")
+    refused = ConnectionClosedOK(rcvd=Close(1013, "retry after 2.5"), sent=None)
+    sent = []
+
+    async def send_and_refuse(resume: bool):
+        sent.append(screen.message)
+        screen.message = ""
+        if len(sent) == 1:
+            raise refused
+
+    serve = mocker.patch.object(
+        screen, "serve_websocket", mocker.AsyncMock(side_effect=send_and_refuse)
+    )
+    create = screen._prepare_message(operation=GameOperations.CREATE).json(models_as_dict=True)
+    screen.pending_intent = screen.message = create
+    await screen.run_websocket()
+    sleep.assert_awaited_once_with(2.5)
+    assert serve.await_args.kwargs["resume"] is False
+    assert sent == [create, create]
+
+    assert retry_hint(ConnectionClosedOK(rcvd=Close(1000, "retry after 2.5"), sent=None)) is None
+    assert retry_hint(ConnectionClosedOK(rcvd=Close(1012, "retry after soon"), sent=None)) is None
+    assert retry_hint(ConnectionRefusedError()) is None
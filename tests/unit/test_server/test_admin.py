@@ -0,0 +1,31 @@
+from starlette.testclient import TestClient
+
+from codejam.server import app
+from codejam.server.application import manager
+from codejam.server.interfaces.message import Message
+from codejam.server.settings import settings
+
+
+def test_games_are_listed_heaviest_first(
+    mocker, test_client: str, test_data: Message, game_creation_message: Message
+):
+    mocker.patch.object(settings, "admin_token", "secret")
+    headers = {"X-Admin-Token": "secret"}
+    client = TestClient(app)
+    assert client.get("/admin/games?sort=game_id", headers=headers).status_code == 422
+    with client.websocket_connect(f"/ws/{test_client}") as websocket:
+        game_ids = []
+        for _ in range(2):
+            websocket.send_json(game_creation_message.dict())
+            game_ids.append(websocket.receive_json()["value"]["game_id"])
+        test_data.game_id = game_ids[1]
+        websocket.send_json(test_data.dict())
+        websocket.receive_json()
+
+        response = client.get("/admin/games?sort=points&limit=1", headers=headers)
+    assert response.status_code == 200
+    [game] = response.json()
+    assert game["game_id"] == game_ids[1]
+    assert game["strokes"] == 1
+    assert game["points"] == len(test_data.value.data.line) // 2
+    assert game["owner"] == game["worker_id"] == manager.worker_id
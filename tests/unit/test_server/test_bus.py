@@ -0,0 +1,264 @@
+import asyncio
+import json
+
+import pytest
+
+from codejam.server.bus.affinity import HashRing
+from codejam.server.bus.local_bus import LocalBus
+from codejam.server.bus.unix_bus import BusBroker, UnixSocketBus, encode_frame, read_frame
+from codejam.server.connection_manager import ConnectionManager
+from codejam.server.interfaces.message import Message
+from codejam.server.interfaces.topics import DrawOperations, ErrorOperations, GameOperations
+from codejam.server.router import Router
+from codejam.server.models.user import User
+from codejam.server.settings import settings
+
+
+async def wait_for(condition, timeout: float = 2):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("Condition not met in time")
+
+
+def prepare_user(mocker, username: str) -> User:
+    return User(
+        username=username,
+        websocket=mocker.MagicMock(accept=mocker.AsyncMock(), send_text=mocker.AsyncMock()),
+    )
+
+
+def received_operations(user: User):
+    sent = [json.loads(x.args[0]) for x in user.websocket.send_text.call_args_list]
+    return [x["topic"]["operation"] for x in sent]
+
+
+@pytest.mark.asyncio
+async def test_local_bus_delivers_to_subscribers(mocker):
+    bus = LocalBus()
+    handler = mocker.AsyncMock()
+    bus.subscribe("topic", handler)
+    await bus.publish("topic", {"key": "value"})
+    handler.assert_awaited_once_with("topic", {"key": "value"})
+
+
+@pytest.mark.asyncio
+async def test_players_of_one_game_on_different_workers(
+    mocker,
+    tmp_path,
+    test_data: Message,
+    game_creation_message: Message,
+    game_join_message: Message,
+):
+    path = str(tmp_path.joinpath("bus.sock"))
+    broker = BusBroker(path=path)
+    await broker.start()
+    managers = [ConnectionManager(bus=UnixSocketBus(path=path)) for _ in range(2)]
+    for manager in managers:
+        manager.on_forwarded = Router(manager=manager).route
+        await manager.bus.start()
+    first, second = managers
+
+    creator = prepare_user(mocker, "creator")
+    await first.connect(creator)
+    game_creation_message.username = creator.username
+    await Router(manager=first).route(user=creator, data=game_creation_message.dict())
+    game_id = next(iter(first.active_games))
+    assert not second.is_remote(game_id=None)
+
+    player = prepare_user(mocker, "player")
+    await second.connect(player)
+    game_join_message.username = player.username
+    game_join_message.game_id = game_id
+    await Router(manager=second).route(user=player, data=game_join_message.dict())
+
+    await wait_for(lambda: GameOperations.JOIN.value in received_operations(player))
+    assert GameOperations.JOIN.value in received_operations(creator)
+    assert first.get_members(game_id=game_id) == ["creator", "player"]
+
+    test_data.username = creator.username
+    test_data.game_id = game_id
+    await Router(manager=first).route(user=creator, data=test_data.dict())
+    await wait_for(lambda: DrawOperations.LINE.value in received_operations(player))
+
+    await second.forward(user=player, game_id=game_id)
+    await wait_for(lambda: first.get_members(game_id=game_id) == ["creator"])
+    assert first.remote_users == {}
+
+    for manager in managers:
+        await manager.bus.close()
+    await broker.close()
+
+
+@pytest.mark.asyncio
+async def test_unknown_games_are_reported_across_workers(
+    mocker, tmp_path, game_creation_message: Message, game_join_message: Message
+):
+    mocker.patch.object(settings, "forward_timeout", 0.05)
+    path = str(tmp_path.joinpath("bus.sock"))
+    broker = BusBroker(path=path)
+    await broker.start()
+    first, second = [ConnectionManager(bus=UnixSocketBus(path=path)) for _ in range(2)]
+    for manager in (first, second):
+        manager.on_forwarded = Router(manager=manager).route
+        await manager.bus.start()
+
+    creator = prepare_user(mocker, "creator")
+    await first.connect(creator)
+    game_creation_message.username = creator.username
+    game_creation_message.game_id = "client-game"
+    await Router(manager=first).route(user=creator, data=game_creation_message.dict())
+    assert "client-game" in first.active_games
+    assert received_operations(creator) == [GameOperations.CREATE.value]
+
+    player = prepare_user(mocker, "player")
+    await second.connect(player)
+    game_join_message.username = player.username
+    game_join_message.game_id = "client-game"
+    await Router(manager=second).route(user=player, data=game_join_message.dict())
+    await wait_for(lambda: GameOperations.JOIN.value in received_operations(player))
+    await wait_for(lambda: second.unanswered == {})
+
+    lost = prepare_user(mocker, "lost")
+    await second.connect(lost)
+    game_join_message.username = lost.username
+    game_join_message.game_id = "missing"
+    await Router(manager=second).route(user=lost, data=game_join_message.dict())
+    await wait_for(lambda: received_operations(lost) == [ErrorOperations.BROADCAST.value])
+    error = json.loads(lost.websocket.send_text.call_args.args[0])
+    assert error["value"]["exception"] == "GameNotExist"
+    assert ErrorOperations.BROADCAST.value not in received_operations(player)
+
+    for manager in (first, second):
+        await manager.bus.close()
+    await broker.close()
+
+
+@pytest.mark.asyncio
+async def test_slow_handler_does_not_block_other_players(tmp_path):
+    path = str(tmp_path.joinpath("bus.sock"))
+    broker = BusBroker(path=path)
+    await broker.start()
+    bus = UnixSocketBus(path=path)
+    released = asyncio.Event()
+    handled = []
+
+    async def handler(topic, payload):
+        if payload["username"] == "winner":
+            await released.wait()
+        handled.append(payload["username"])
+
+    bus.subscribe("games", handler)
+    await bus.start()
+    for username in ("winner", "other", "winner"):
+        await bus.publish("games", {"game_id": "game", "username": username})
+    await wait_for(lambda: handled == ["other"])
+    released.set()
+    await wait_for(lambda: handled == ["other", "winner", "winner"])
+
+    await bus.close()
+    await broker.close()
+
+
+@pytest.mark.asyncio
+async def test_dead_recipient_does_not_stop_delivery(mocker):
+    manager = ConnectionManager()
+    dead, alive = prepare_user(mocker, "dead"), prepare_user(mocker, "alive")
+    dead.websocket.send_text.side_effect = RuntimeError("closed")
+    for user in (dead, alive):
+        await manager.connect(user)
+    await manager._deliver("users", {"usernames": ["dead", "alive"], "message": {"seq": 1}})
+    alive.websocket.send_text.assert_awaited_once_with('{"seq":1}')
+    assert dead.send_failures == 1
+
+
+@pytest.mark.asyncio
+async def test_frames_are_routed_without_decoding_payload():
+    data = encode_frame(op="pub", topic="inbox.worker", payload={"game_id": "game"})
+    reader = asyncio.StreamReader()
+    reader.feed_data(data + encode_frame(op="sub", topic="games"))
+    published, subscribed = await read_frame(reader), await read_frame(reader)
+    assert (published.op, published.topic) == ("pub", "inbox.worker")
+    assert json.loads(published.payload) == {"game_id": "game"}
+    assert published.raw == data
+    assert (subscribed.op, subscribed.topic, subscribed.payload) == ("sub", "games", b"")
+
+
+def test_broker_drops_subscriber_falling_behind(mocker):
+    broker = BusBroker(path="unused", max_buffer=100)
+    slow, fast = [mocker.MagicMock() for _ in range(2)]
+    slow.transport.get_write_buffer_size.return_value = 90
+    fast.transport.get_write_buffer_size.return_value = 0
+    broker.subscribers["games"] = {slow, fast}
+    broker.connections.update({slow, fast})
+    for subscriber in (slow, fast):
+        broker.send(subscriber=subscriber, data=b"x" * 20)
+    slow.write.assert_not_called()
+    slow.close.assert_called_once()
+    fast.write.assert_called_once_with(b"x" * 20)
+    assert broker.subscribers["games"] == {fast} and broker.connections == {fast}
+
+
+def test_consistent_hashing_moves_only_games_of_changed_worker():
+    ring = HashRing()
+    for worker in ["first", "second", "third"]:
+        ring.add(worker)
+    owners = {f"game{x}": ring.get(f"game{x}") for x in range(200)}
+    assert set(owners.values()) == {"first", "second", "third"}
+
+    ring.remove("third")
+    for game_id, owner in owners.items():
+        assert ring.get(game_id) == owner if owner != "third" else ring.get(game_id) != "third"
+    assert HashRing().get("game") is None
+
+
+@pytest.mark.asyncio
+async def test_games_are_held_by_owning_worker(
+    mocker,
+    tmp_path,
+    game_creation_message: Message,
+    game_join_message: Message,
+):
+    path = str(tmp_path.joinpath("bus.sock"))
+    broker = BusBroker(path=path)
+    await broker.start()
+    first = ConnectionManager(bus=UnixSocketBus(path=path), affinity=True)
+    first.on_forwarded = Router(manager=first).route
+    first.on_adopted = mocker.MagicMock()
+    await first.start()
+
+    creator = prepare_user(mocker, "creator")
+    await first.connect(creator)
+    game_creation_message.username = creator.username
+    await Router(manager=first).route(user=creator, data=game_creation_message.dict())
+    game_id = next(iter(first.active_games))
+
+    second = ConnectionManager(bus=UnixSocketBus(path=path), affinity=True)
+    second.on_forwarded = Router(manager=second).route
+    second.on_adopted = mocker.MagicMock()
+    await second.start()
+    await wait_for(lambda: len(first.membership.last_seen) == len(second.membership.last_seen) == 1)
+    if first.membership.owner(game_id) == first.worker_id:
+        owner, holder = first, second
+    else:
+        owner, holder = second, first
+    await wait_for(lambda: game_id in owner.active_games)
+    assert game_id not in holder.active_games
+    assert owner.get_members(game_id=game_id) == ["creator"]
+
+    player = prepare_user(mocker, "player")
+    await holder.connect(player)
+    game_join_message.username = player.username
+    game_join_message.game_id = game_id
+    await Router(manager=holder).route(user=player, data=game_join_message.dict())
+    await wait_for(lambda: GameOperations.JOIN.value in received_operations(player))
+    assert owner.get_members(game_id=game_id) == ["creator", "player"]
+
+    await owner.close()
+    await wait_for(lambda: game_id in holder.active_games)
+    assert holder.get_members(game_id=game_id) == ["creator", "player"]
+    holder.on_adopted.assert_called_once()
+
+    await holder.close()
+    await broker.close()
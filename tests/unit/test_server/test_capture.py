@@ -0,0 +1,46 @@
+import json
+
+import pytest
+from starlette.testclient import TestClient
+
+from codejam.server import app
+from codejam.server.application import recorder
+from codejam.server.capture import CONNECT, DISCONNECT, FRAME, Recorder, read_capture
+from codejam.server.interfaces.message import Message
+
+
+def test_inbound_frames_are_captured_with_created_game(
+    mocker, tmp_path, test_client: str, game_creation_message: Message
+):
+    path = tmp_path / "capture.jsonl"
+    mocker.patch.object(recorder, "path", str(path))
+    client = TestClient(app)
+    with client.websocket_connect(f"/ws/{test_client}") as websocket:
+        websocket.send_json(game_creation_message.dict())
+        game_id = websocket.receive_json()["value"]["game_id"]
+    recorder.close()
+
+    records = list(read_capture(str(path)))
+    assert [x[1:3] for x in records] == [
+        [CONNECT, test_client],
+        [FRAME, test_client],
+        [DISCONNECT, test_client],
+    ]
+    assert records[1][3] == game_id
+    assert json.loads(records[1][4]) == json.loads(game_creation_message.json())
+    assert records[0][0] <= records[1][0] <= records[2][0]
+
+
+def test_restarted_capture_continues_in_time(tmp_path):
+    path = str(tmp_path / "capture.jsonl")
+    for started in (10.0, 20.0):
+        capture = Recorder(path=path)
+        capture.frame(username="player", game_id=None, text="{}", received=started)
+        capture.frame(username="player", game_id=None, text="{}", received=started + 1.5)
+        capture.close()
+    assert [x[0] for x in read_capture(path)] == [0.0, 1.5, 1.5, 3.0]
+
+    with open(path, "w") as f:
+        f.write('{"version": 0}\n')
+    with pytest.raises(ValueError):
+        list(read_capture(path))
@@ -16,4 +16,4 @@ def test_basic_chat_message(
         chat_message.game_id = created_mesage.value.game_id
         websocket.send_json(chat_message.dict())
         data = websocket.receive_json()
-        assert data == chat_message.dict()
+        assert data == {**chat_message.dict(), "seq": 1}
@@ -0,0 +1,106 @@
+import pytest
+from starlette.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from codejam.server import app
+from codejam.server.application import manager
+from codejam.server.bus.unix_bus import BusBroker, UnixSocketBus
+from codejam.server.connection_manager import SERVICE_RESTART, TRY_AGAIN_LATER, ConnectionManager
+from codejam.server.interfaces.message import Message
+from codejam.server.models.snapshots import SnapshotStore
+from codejam.server.models.user import User
+from codejam.server.router import Router
+from codejam.server.settings import settings
+from tests.unit.test_server.test_bus import prepare_user, wait_for
+
+
+def close_like_endpoint(mocker, manager: ConnectionManager, user: User, game_id: str):
+    async def close(code: int, reason: str):
+        manager.detach(game_id=game_id, member=user)
+        manager.disconnect(user=user)
+
+    user.websocket.close = mocker.AsyncMock(side_effect=close)
+    return user.websocket.close
+
+
+def test_draining_worker_refuses_new_players(mocker, test_client: str):
+    mocker.patch.object(manager, "draining", True)
+    client = TestClient(app)
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(round(settings.drain_retry_after))
+    with client.websocket_connect(f"/ws/{test_client}") as websocket:
+        with pytest.raises(WebSocketDisconnect) as e:
+            websocket.receive_json()
+    assert e.value.code == TRY_AGAIN_LATER
+    assert manager.active_connections == []
+
+    mocker.patch.object(manager, "draining", False)
+    assert client.get("/ready").json() == {"ready": True}
+
+
+@pytest.mark.asyncio
+async def test_drain_keeps_seats_and_replay_in_snapshot(
+    mocker, tmp_path, test_data: Message, game_creation_message: Message
+):
+    path = str(tmp_path.joinpath("snapshots.db"))
+    drained = ConnectionManager(snapshots=SnapshotStore(path=path))
+    creator = prepare_user(mocker, "creator")
+    await drained.connect(creator)
+    game_creation_message.username = creator.username
+    await Router(manager=drained).route(user=creator, data=game_creation_message.dict())
+    game_id = next(iter(drained.active_games))
+    test_data.username, test_data.game_id = creator.username, game_id
+    for _ in range(2):
+        await Router(manager=drained).route(user=creator, data=test_data.dict())
+    close = close_like_endpoint(mocker, drained, creator, game_id)
+
+    await drained.drain(timeout=1)
+    assert drained.draining and drained.active_connections == []
+    assert close.await_args.kwargs["code"] == SERVICE_RESTART
+    reason = close.await_args.kwargs["reason"]
+    assert 1 <= float(reason.split()[-1]) <= settings.drain_retry_after
+    assert drained.active_games[game_id].members[0].detached_at is not None
+
+    await drained.snapshots.close()
+    (restored,) = await SnapshotStore(path=path).load()
+    assert restored.secret == game_id
+    missed = restored.resume(User(username="creator"), creator.resume_token, last_seq=1)
+    assert [x.seq for x in missed] == [2]
+
+
+@pytest.mark.asyncio
+async def test_drain_hands_games_over_to_peer(mocker, tmp_path):
+    path = str(tmp_path.joinpath("bus.sock"))
+    broker = BusBroker(path=path)
+    await broker.start()
+    first, second = [
+        ConnectionManager(
+            bus=UnixSocketBus(path=path),
+            snapshots=SnapshotStore(path=str(tmp_path.joinpath(f"{x}.db"))),
+            affinity=True,
+        )
+        for x in range(2)
+    ]
+    for worker in (first, second):
+        worker.on_adopted = mocker.MagicMock()
+        await worker.start()
+    await wait_for(lambda: first.membership.last_seen and second.membership.last_seen)
+    game_id = next(
+        f"game{x}" for x in range(100) if first.membership.owner(f"game{x}") == first.worker_id
+    )
+    creator = prepare_user(mocker, "creator")
+    await first.connect(creator)
+    first.register_game(creator=creator, game_id=game_id).join(creator)
+    close_like_endpoint(mocker, first, creator, game_id)
+
+    await first.drain(timeout=1)
+    await wait_for(lambda: game_id in second.active_games)
+    assert game_id not in first.active_games
+    game = second.active_games[game_id]
+    assert game.members[0].detached_at is not None
+    assert game.resume(User(username="creator"), creator.resume_token, last_seq=0) == []
+
+    await first.close()
+    await second.close()
+    await broker.close()
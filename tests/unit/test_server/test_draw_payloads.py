@@ -17,7 +17,7 @@ def test_basic_line_draw(
         test_data.game_id = created_mesage.value.game_id
         websocket.send_json(test_data.dict())
         data = websocket.receive_json()
-        assert data == test_data.dict()
+        assert data == {**test_data.dict(), "seq": 1}
 
 
 def test_basic_frame_draw(
@@ -33,7 +33,7 @@ def test_basic_frame_draw(
         test_frame.game_id = created_mesage.value.game_id
         websocket.send_json(test_frame.dict())
         data = websocket.receive_json()
-        assert data == test_frame.dict()
+        assert data == {**test_frame.dict(), "seq": 1}
 
 
 def test_basic_rectangle_draw(
@@ -49,4 +49,4 @@ def test_basic_rectangle_draw(
         test_rect.game_id = created_mesage.value.game_id
         websocket.send_json(test_rect.dict())
         data = websocket.receive_json()
-        assert data == test_rect.dict()
+        assert data == {**test_rect.dict(), "seq": 1}
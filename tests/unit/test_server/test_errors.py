@@ -16,6 +16,7 @@ def test_wrong_operation_per_topic(test_client: str, test_data: Message):
         data = websocket.receive_json()
         assert data == {
             "game_id": None,
+            "seq": None,
             "topic": {"operation": "BROADCAST", "type": "ERROR"},
             "username": "client",
             "value": {
@@ -38,6 +39,7 @@ def test_drawing_before_joining_raises_exception(test_client: str, test_data: Me
         data = websocket.receive_json()
         assert data == {
             "game_id": None,
+            "seq": None,
             "topic": {"operation": "BROADCAST", "type": "ERROR"},
             "username": "client",
             "value": {
@@ -58,6 +60,7 @@ def test_wrong_message_for_topic_raises_exception(
         data = websocket.receive_json()
         assert data == {
             "game_id": None,
+            "seq": None,
             "topic": {"operation": "BROADCAST", "type": "ERROR"},
             "username": "client",
             "value": {
@@ -87,7 +90,7 @@ def test_starting_game_by_not_creator_raises_exception(
         test_data.game_id = game_id
         websocket.send_json(test_data.dict())
         data = websocket.receive_json()
-        assert data == test_data.dict()
+        assert data == {**test_data.dict(), "seq": 1}
 
         with client.websocket_connect(f"/ws/{second_test_client}") as websocket2:
             game_join_message.game_id = game_id
@@ -101,6 +104,7 @@ def test_starting_game_by_not_creator_raises_exception(
             data = websocket2.receive_json()
             assert data == {
                 "game_id": game_id,
+                "seq": 3,
                 "topic": {"operation": "BROADCAST", "type": "ERROR"},
                 "username": "client2",
                 "value": {
@@ -1,5 +1,6 @@
 from codejam.server.models.game import Game, Turn
 from codejam.server.models.phrase_generator import PhraseDifficulty, PhraseGenerator
+from codejam.server.models.user import User
 
 
 def test_phrase_is_generated(mocker):
@@ -15,9 +16,60 @@ def test_difficulty_level(mocker):
     assert isinstance(phrase, str)
     assert phrase in PhraseGenerator.read_phrase_file("hard")
 
-    game.members.append(mocker.MagicMock())
-    game.members.append(mocker.MagicMock())
-    game.members.append(mocker.MagicMock())
+    game.members.append(mocker.MagicMock(detached_at=None))
+    game.members.append(mocker.MagicMock(detached_at=None))
+    game.members.append(mocker.MagicMock(detached_at=None))
 
     game.turn()
     assert game.current_turn.level == game.difficulty_level
+
+
+def test_score_is_updated_incrementally(mocker):
+    creator = User(username="creator")
+    game = Game(creator=creator, difficulty=PhraseDifficulty.EASY.value)
+    players = [creator, User(username="second"), User(username="third")]
+    for player in players:
+        game.join(player)
+    assert game.score == {"creator": 0, "second": 0, "third": 0}
+
+    game.turn()
+    game.win(players[1])
+    assert game.score == {"creator": 0, "second": 50, "third": 0}
+    assert game.score is game.score
+    assert game.rank("second") == 1
+    assert game.rank("creator") == game.rank("third") == 2
+
+    game.win(players[2])
+    assert game.score == {"creator": 0, "second": 0, "third": 50}
+    assert game.rank("third") == 1
+
+
+def test_score_is_restored_when_player_returns(mocker):
+    creator = User(username="creator")
+    game = Game(creator=creator)
+    players = [creator, User(username="second"), User(username="third")]
+    for player in players:
+        game.join(player)
+    game.turn()
+    game.win(players[1])
+
+    game.leave(players[1])
+    assert game.score == {"creator": 0, "third": 0}
+    game.join(players[1])
+    assert game.score == {"creator": 0, "third": 0, "second": 100}
+
+
+def test_detached_player_joining_again_takes_its_seat_back(mocker):
+    creator = User(username="creator")
+    game = Game(creator=creator)
+    players = [creator, User(username="second"), User(username="third")]
+    for player in players:
+        game.join(player)
+    game.turn()
+    game.win(players[1])
+
+    game.detach(players[1])
+    returning = User(username="second")
+    game.join(returning)
+    assert game.members == [creator, players[2], returning]
+    assert game.score == {"creator": 0, "third": 0, "second": 100}
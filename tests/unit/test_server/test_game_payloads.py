@@ -2,8 +2,12 @@ import pytest
 from starlette.testclient import TestClient
 
 from codejam.server import app
+from codejam.server.controllers.game_controller import GameController
 from codejam.server.exceptions import UserAlreadyExists
+from codejam.server.interfaces.game_message import GameMessage, TurnMessage
 from codejam.server.interfaces.message import Message
+from codejam.server.interfaces.topics import GameOperations, Topic, TopicEnum
+from codejam.server.models.phrase_generator import PhraseDifficulty
 
 
 def test_joining_player_receive_history(
@@ -22,7 +26,7 @@ def test_joining_player_receive_history(
         test_data.game_id = game_id
         websocket.send_json(test_data.dict())
         data = websocket.receive_json()
-        assert data == test_data.dict()
+        assert data == {**test_data.dict(), "seq": 1}
 
         with client.websocket_connect(f"/ws/{second_test_client}") as websocket2:
             game_join_message.game_id = game_id
@@ -32,7 +36,7 @@ def test_joining_player_receive_history(
             assert joined_message.value.game_id == game_id
             assert joined_message.value.success
             data = websocket2.receive_json()
-            assert data == test_data.dict()
+            assert data == {**test_data.dict(), "seq": 1}
 
 
 def test_ending_game(
@@ -59,6 +63,7 @@ def test_ending_game(
             data = websocket2.receive_json()
             assert data == {
                 "game_id": game_id,
+                "seq": 2,
                 "topic": {"operation": "BROADCAST", "type": "ERROR"},
                 "username": "client",
                 "value": {
@@ -84,6 +89,7 @@ def test_ending_not_existing(
         data = websocket.receive_json()
         assert data == {
             "game_id": "dummy_game_id",
+            "seq": None,
             "topic": {"operation": "BROADCAST", "type": "ERROR"},
             "username": "client",
             "value": {
@@ -106,3 +112,50 @@ def test_joining_with_existing_username_raises_error(
         with client.websocket_connect(f"/ws/{test_client}"):
             with client.websocket_connect(f"/ws/{test_client}"):
                 pass  # pragma: no cover
+
+
+def test_trusted_message_matches_validated_one():
+    fields = dict(
+        turn_no=1, drawer="test_user", duration=60, phrase="phrase", score={"test_user": 0}
+    )
+    turn = TurnMessage.trusted(level=PhraseDifficulty.EASY, **fields)
+    trusted = Message.trusted(
+        type=TopicEnum.GAME,
+        operation=GameOperations.TURN,
+        username="test_user",
+        game_id="game",
+        value=GameMessage.construct(success=True, game_id="game", turn=turn),
+    )
+    validated = Message(
+        topic=Topic(type=TopicEnum.GAME, operation=GameOperations.TURN),
+        username="test_user",
+        game_id="game",
+        value=GameMessage(
+            success=True, game_id="game", turn=TurnMessage(level=PhraseDifficulty.EASY, **fields)
+        ),
+    )
+    assert trusted.dict() == validated.dict()
+    assert trusted.json() == validated.json()
+    assert Message(**trusted.dict()) == validated
+
+
+def test_masked_turn_message_shares_fragments():
+    score = {"test_user": 0}
+    message = Message.trusted(
+        type=TopicEnum.GAME,
+        operation=GameOperations.TURN,
+        username="test_user",
+        game_id="game",
+        value=GameMessage.construct(
+            success=True,
+            game_id="game",
+            turn=TurnMessage.trusted(
+                level=PhraseDifficulty.EASY, turn_no=1, duration=60, phrase="secret", score=score
+            ),
+        ),
+    )
+    masked = GameController.mask_turn_message(message=message)
+    assert message.value.turn.phrase == "secret"
+    assert masked.value.turn.phrase == "*" * 10
+    assert masked.value.turn.score is score
+    assert masked.topic is message.topic
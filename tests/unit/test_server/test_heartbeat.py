@@ -0,0 +1,98 @@
+import json
+import time
+
+import pytest
+from starlette.testclient import TestClient
+
+from codejam.server import app
+from codejam.server.connection_manager import ConnectionManager
+from codejam.server.heartbeat import Heartbeat
+from codejam.server.interfaces.game_message import GameMessage
+from codejam.server.interfaces.heartbeat_message import HeartbeatMessage
+from codejam.server.interfaces.message import Message
+from codejam.server.interfaces.topics import (
+    GameOperations,
+    HeartbeatOperations,
+    Topic,
+    TopicEnum,
+)
+from codejam.server.models.user import User
+
+
+def prepare_manager(mocker):
+    manager = ConnectionManager()
+    user = User(
+        username="client",
+        websocket=mocker.MagicMock(send_text=mocker.AsyncMock(), close=mocker.AsyncMock()),
+    )
+    manager.active_connections.append(user)
+    return manager, user
+
+
+@pytest.mark.asyncio
+async def test_ping_and_eviction(mocker):
+    _, user = prepare_manager(mocker)
+    heartbeat = Heartbeat(user=user, interval=0, timeout=5)
+    await heartbeat.ping()
+    sent = json.loads(user.websocket.send_text.await_args.args[0])
+    assert sent["topic"] == {"type": "HEARTBEAT", "operation": "PING"}
+
+    user.websocket.send_text.side_effect = RuntimeError("closed")
+    await heartbeat.ping()
+    assert user.send_failures == 1
+
+    def stop_answering():
+        user.last_heard = time.monotonic() - 10
+
+    mocker.patch.object(heartbeat, "ping", mocker.AsyncMock(side_effect=stop_answering))
+    await heartbeat.run()
+    heartbeat.ping.assert_awaited_once()
+    user.websocket.close.assert_awaited_once_with(code=1001)
+
+
+@pytest.mark.asyncio
+async def test_broadcast_survives_broken_connection(mocker):
+    manager, user = prepare_manager(mocker)
+    broken = User(
+        username="broken",
+        websocket=mocker.MagicMock(send_text=mocker.AsyncMock(side_effect=RuntimeError)),
+    )
+    game = manager.register_game(creator=user)
+    game.join(broken)
+    game.join(user)
+    message = Message(
+        topic=Topic(type=TopicEnum.GAME, operation=GameOperations.JOIN),
+        username=user.username,
+        game_id=game.secret,
+        value=GameMessage(success=True, game_id=game.secret),
+    )
+    await game.broadcast(message=message)
+    assert broken.send_failures == 1
+    user.websocket.send_text.assert_awaited_once()
+
+
+def test_pong_records_rtt(test_client: str, game_creation_message: Message):
+    with TestClient(app) as client:
+        with client.websocket_connect(f"/ws/{test_client}") as websocket:
+            websocket.send_json(game_creation_message.dict())
+            game_id = websocket.receive_json()["value"]["game_id"]
+            ping = Message(
+                topic=Topic(type=TopicEnum.HEARTBEAT, operation=HeartbeatOperations.PING),
+                username=test_client,
+                value=HeartbeatMessage(sent_at=time.monotonic() - 0.5),
+            ).dict()
+            websocket.send_json(ping)
+            pong = websocket.receive_json()
+            assert pong["topic"]["operation"] == "PONG"
+            websocket.send_json(pong)
+            websocket.send_json(pong)
+
+            response = client.get(f"/games/{game_id}/rtt")
+            assert response.status_code == 200
+            stats = response.json()
+            player = stats["players"][test_client]
+            assert player["samples"] == 2
+            assert player["min"] >= 0.5
+            assert stats["median"] == player["smoothed"]
+
+        assert client.get("/games/unknown/rtt").status_code == 404
@@ -0,0 +1,80 @@
+import asyncio
+import signal
+import time
+
+import pytest
+import uvicorn
+
+from codejam.server.application import manager
+from codejam.server.launcher import DrainingServer, drain, main, parse_args, self_check
+from codejam.server.models.game import Game, Turn
+from codejam.server.models.user import User
+
+
+def test_options_and_self_check(monkeypatch):
+    monkeypatch.setenv("CODEJAM_SERVER_WORKERS", "4")
+    options, check = parse_args(["--port", "9000", "--loop", "asyncio"])
+    assert (options.port, options.workers, options.loop, check) == (9000, 4, "asyncio", False)
+    options, check = parse_args(["--no-ws-per-message-deflate", "--check"])
+    assert options.ws_per_message_deflate is False and check
+    options, _ = parse_args(["--port", "9000", "--loop", "asyncio", "--ws-max-size", "10"])
+    lines = self_check(options)
+    assert any(x.startswith("event loop") and x.endswith("SLOW") for x in lines)
+    assert "WARNING ws_max_size is below CODEJAM_MAX_FRAME_SIZE" in lines
+    assert "WARNING workers do not share games without CODEJAM_BUS" in lines
+
+
+@pytest.mark.asyncio
+async def test_drain_waits_for_running_turns(mocker):
+    sleep = mocker.patch("codejam.server.launcher.asyncio.sleep", mocker.AsyncMock())
+    mocker.patch.object(manager, "draining", False)
+    hand_over = mocker.patch.object(manager, "drain", mocker.AsyncMock())
+    creator = User(username="creator")
+    game = Game(creator=creator, game_id="drained")
+    game.active = True
+    game.turns_history.append(Turn(turn_no=1, drawer=creator, duration=60, phrase="phrase"))
+    game.current_turn.started_at = time.time() - 50
+    mocker.patch.dict(manager.active_games, {game.secret: game})
+    await drain(timeout=30)
+    assert 9 < sleep.await_args.args[0] <= 10
+    assert manager.draining
+    hand_over.assert_awaited_once()
+    await drain(timeout=5)
+    assert sleep.await_args.args[0] == 5
+
+
+@pytest.mark.asyncio
+async def test_sigterm_drains_before_exit(mocker):
+    drained = asyncio.Event()
+
+    async def wait(timeout: float):
+        await drained.wait()
+
+    mocker.patch("codejam.server.launcher.drain", wait)
+    server = DrainingServer(config=uvicorn.Config("codejam.server:app"), drain_timeout=5)
+    server.handle_exit(signal.SIGTERM, None)
+    for _ in range(3):
+        await asyncio.sleep(0)
+    assert not server.should_exit
+    drained.set()
+    await server.draining
+    await asyncio.sleep(0)
+    assert server.should_exit
+
+    server = DrainingServer(config=uvicorn.Config("codejam.server:app"), drain_timeout=5)
+    server.handle_exit(signal.SIGINT, None)
+    assert server.should_exit and server.draining is None
+
+
+def test_main_runs_configured_server(mocker, capsys):
+    run = mocker.patch.object(DrainingServer, "run")
+    main(["--check"])
+    assert "json" in capsys.readouterr().out
+    run.assert_not_called()
+
+    main(["--drain-timeout", "7"])
+    run.assert_called_once()
+    multiprocess = mocker.patch("codejam.server.launcher.Multiprocess")
+    mocker.patch.object(uvicorn.Config, "bind_socket")
+    main(["--workers", "2"])
+    multiprocess.return_value.run.assert_called_once()
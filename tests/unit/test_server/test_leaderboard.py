@@ -0,0 +1,91 @@
+import pytest
+from starlette.testclient import TestClient
+
+from codejam.server import app
+from codejam.server.application import manager
+from codejam.server.models.game import Game
+from codejam.server.models.leaderboard import Leaderboard
+from codejam.server.models.user import User
+
+
+def test_ranking_players():
+    leaderboard = Leaderboard(path=":memory:", top_k=2)
+    leaderboard.record_win(username="first", game_id="game", points=100)
+    leaderboard.record_win(username="second", game_id="game", points=50)
+    leaderboard.record_win(username="third", game_id="game", points=50)
+    leaderboard.record_game_end(game_id="game", score={"first": 100, "second": 50, "third": 50})
+
+    top = leaderboard.top()
+    assert [(x.username, x.rank) for x in top] == [("first", 1), ("second", 2)]
+    assert top[0].games_won == 1 and top[0].games_played == 1
+    assert leaderboard.top() is top
+    assert leaderboard.top(limit=1) == top[:1]
+
+    assert leaderboard.get_entry("second").rank == 2
+    assert leaderboard.get_entry("third").rank == 2
+    assert leaderboard.get_entry("fourth") is None
+    assert leaderboard.pending == 6
+
+
+@pytest.mark.asyncio
+async def test_batched_writes_are_persisted(tmp_path):
+    path = str(tmp_path.joinpath("leaderboard.sqlite3"))
+    leaderboard = Leaderboard(path=path, flush_interval=0)
+    leaderboard.record_win(username="first", game_id="game", points=100)
+    leaderboard.record_win(username="first", game_id="game2", points=50)
+    leaderboard.record_game_end(game_id="game", score={"first": 150, "second": 0})
+    await leaderboard._flush_task
+    assert leaderboard.pending == 0
+    await leaderboard.close()
+
+    restored = Leaderboard(path=path)
+    await restored.start()
+    assert restored.get_entry("first").points == 150
+    assert restored.get_entry("first").games_won == 1
+    assert restored.get_entry("second").games_played == 1
+    await restored.close()
+
+
+@pytest.mark.asyncio
+async def test_records_added_during_flush_are_written(mocker):
+    leaderboard = Leaderboard(path=":memory:", flush_interval=0)
+    write = leaderboard._write
+
+    def slow_write(wins, results):
+        if not write_calls:
+            leaderboard.record_win(username="late", game_id="game", points=10)
+        write_calls.append(wins)
+        write(wins, results)
+
+    write_calls = []
+    mocker.patch.object(leaderboard, "_write", slow_write)
+    leaderboard.record_win(username="first", game_id="game", points=100)
+    await leaderboard._flush_task
+    assert leaderboard.pending == 0
+    assert [[x[0] for x in wins] for wins in write_calls] == [["first"], ["late"]]
+    await leaderboard.close()
+
+
+def test_game_feeds_leaderboard():
+    leaderboard = Leaderboard(path=":memory:")
+    creator = User(username="creator")
+    game = Game(creator=creator, leaderboard=leaderboard)
+    for player in [creator, User(username="second"), User(username="third")]:
+        game.join(player)
+    game.turn()
+    game.win(creator)
+    assert leaderboard.get_entry("creator").points == 100
+
+
+def test_leaderboard_endpoints():
+    manager.leaderboard.record_win(username="api_player", game_id="game", points=5000)
+    client = TestClient(app)
+    response = client.get("/leaderboard?limit=1")
+    assert response.status_code == 200
+    assert response.json()[0]["username"] == "api_player"
+
+    response = client.get("/leaderboard/api_player")
+    assert response.json()["rank"] == 1
+
+    response = client.get("/leaderboard/not_a_player")
+    assert response.status_code == 404
@@ -0,0 +1,105 @@
+import pytest
+from starlette.testclient import TestClient
+
+from codejam.server import app
+from codejam.server.application import manager
+from codejam.server.interfaces.message import Message
+from codejam.server.exceptions import HistoryFull
+from codejam.server.models.game import Game
+from codejam.server.models.snapshots import encode_snapshot
+from codejam.server.models.user import User
+from codejam.server.settings import settings
+
+
+def create_game(websocket, game_creation_message: Message) -> str:
+    websocket.send_json(game_creation_message.dict())
+    return websocket.receive_json()["value"]["game_id"]
+
+
+def test_oversized_and_invalid_frames_are_rejected_for_sender(
+    mocker, test_client: str, test_data: Message
+):
+    mocker.patch.object(settings, "max_frame_size", 100)
+    client = TestClient(app)
+    with client.websocket_connect(f"/ws/{test_client}") as websocket:
+        test_data.value.data.line = [1.0] * 100
+        websocket.send_json(test_data.dict())
+        assert websocket.receive_json()["value"]["exception"] == "FrameTooLarge"
+        websocket.send_text('"' + "ż" * 60 + '"')
+        assert websocket.receive_json()["value"]["exception"] == "FrameTooLarge"
+        websocket.send_text("{not json")
+        assert websocket.receive_json()["value"]["exception"] == "InvalidFrame"
+
+
+def test_drawing_limits_are_reported_only_to_sender(
+    mocker,
+    test_client: str,
+    second_test_client: str,
+    test_data: Message,
+    game_creation_message: Message,
+    game_join_message: Message,
+):
+    mocker.patch.object(settings, "max_stroke_points", 2)
+    client = TestClient(app)
+    with client.websocket_connect(f"/ws/{test_client}") as websocket:
+        game_id = create_game(websocket, game_creation_message)
+        with client.websocket_connect(f"/ws/{second_test_client}") as websocket2:
+            game_join_message.game_id = game_id
+            websocket2.send_json(game_join_message.dict())
+            websocket2.receive_json()
+            websocket.receive_json()
+
+            test_data.game_id = game_id
+            test_data.value.data.line = [1.0] * 6
+            websocket.send_json(test_data.dict())
+            assert websocket.receive_json()["value"]["exception"] == "StrokeTooLong"
+
+            test_data.value.data.line = [1.0] * 4
+            websocket.send_json(test_data.dict())
+            assert websocket.receive_json()["topic"]["type"] == "DRAW"
+            assert websocket2.receive_json()["topic"]["type"] == "DRAW"
+
+            game = manager.get_game(game_id=game_id)
+            assert len(game.history) == 1
+            game.history_bytes = settings.max_history_bytes
+            websocket.send_json(test_data.dict())
+            assert websocket.receive_json()["value"]["exception"] == "HistoryFull"
+
+
+@pytest.mark.asyncio
+async def test_history_is_stored_once_per_message(mocker, test_data: Message):
+    game = Game(creator=User(username="creator"))
+    for username in ("creator", "second", "third"):
+        websocket = mocker.MagicMock(send_text=mocker.AsyncMock())
+        game.join(User(username=username, websocket=websocket))
+    await game.broadcast(message=test_data)
+    assert len(game.history) == 1
+    assert game.history_bytes == len(test_data.copy(update={"seq": 1}).json())
+    game.release()
+    assert game.history_bytes == 0
+
+
+@pytest.mark.asyncio
+async def test_history_counters_and_budget(mocker, test_data: Message, chat_message: Message):
+    creator = User(username="creator", websocket=mocker.MagicMock(send_text=mocker.AsyncMock()))
+    game = Game(creator=creator)
+    game.join(creator)
+    test_data.value.data.line = [1.0] * 10
+    await game.broadcast(message=test_data)
+    await game.broadcast(message=chat_message)
+    assert game.stats()["strokes"] == 1
+    assert game.stats()["points"] == 5
+    assert game.stats()["history_messages"] == 2
+
+    restored = Game.from_snapshot(encode_snapshot(game.snapshot()))
+    assert restored.history_bytes == game.history_bytes
+    assert restored.history_points == 5
+
+    mocker.patch.object(settings, "max_history_bytes", game.history_bytes + 10)
+    await game.broadcast(message=chat_message)
+    assert game.history_dropped == 1
+    assert len(game.history) == 2
+    assert game.seq == 3
+    with pytest.raises(HistoryFull):
+        await game.broadcast(message=test_data)
+    assert game.seq == 3
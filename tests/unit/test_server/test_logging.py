@@ -0,0 +1,77 @@
+import io
+import json
+import logging
+import sys
+
+import pytest
+
+from codejam.log import JsonFormatter, LogSettings, TopicSampler, configure, lazy, topic_of
+from codejam.server.interfaces.message import Message
+from codejam.server.models.user import User
+
+
+@pytest.fixture
+def codejam_logger():
+    logger = logging.getLogger("codejam")
+    handlers, level = list(logger.handlers), logger.level
+    yield logger
+    logger.handlers, logger.level = handlers, level
+
+
+def make_record(topic: str = None) -> logging.LogRecord:
+    record = logging.LogRecord("codejam.test", logging.INFO, __file__, 1, "hello %s", ("x",), None)
+    if topic:
+        record.topic = topic
+    return record
+
+
+def test_sampler_passes_every_nth_record_of_sampled_topic():
+    sampler = TopicSampler(rates={"DRAW": 3})
+    draws = [sampler.filter(make_record("DRAW")) for _ in range(7)]
+    assert draws == [True, False, False, True, False, False, True]
+    assert all(sampler.filter(make_record("CHAT")) for _ in range(3))
+    assert sampler.filter(make_record())
+
+
+def test_json_formatter_includes_extra_fields():
+    data = json.loads(JsonFormatter().format(make_record("CHAT")))
+    assert data["message"] == "hello x"
+    assert data["level"] == "INFO"
+    assert data["topic"] == "CHAT"
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logging.LogRecord("codejam", logging.ERROR, "", 1, "failed", (), sys.exc_info())
+    assert "boom" in json.loads(JsonFormatter().format(record))["exc_info"]
+
+
+def test_topic_of_raw_data():
+    assert topic_of({"topic": {"type": "DRAW"}}) == "DRAW"
+    assert topic_of({"topic": None}) is None
+    assert topic_of([]) is None
+
+
+def test_configure_from_environment(monkeypatch, codejam_logger):
+    monkeypatch.setenv("CODEJAM_LOG_LEVEL", "debug")
+    monkeypatch.setenv("CODEJAM_LOG_FORMAT", "json")
+    monkeypatch.setenv("CODEJAM_LOG_SAMPLE", '{"DRAW": 2}')
+    handler = configure()
+    assert codejam_logger.handlers == [handler]
+    assert codejam_logger.level == logging.DEBUG
+    assert isinstance(handler.formatter, JsonFormatter)
+    stream = handler.stream = io.StringIO()
+    for _ in range(4):
+        codejam_logger.debug("draw", extra={"topic": "DRAW"})
+    assert len(stream.getvalue().splitlines()) == 2
+
+
+@pytest.mark.asyncio
+async def test_send_message_does_not_serialize_when_debug_is_off(
+    mocker, codejam_logger, test_data: Message
+):
+    configure(LogSettings(level="INFO"))
+    user = User(username="test_user", websocket=mocker.MagicMock(send_text=mocker.AsyncMock()))
+    json_mock = mocker.patch.object(Message, "json")
+    await user.send_message(message=test_data)
+    json_mock.assert_not_called()
+    assert str(lazy(lambda x: x * 2, 21)) == "42"
@@ -0,0 +1,52 @@
+from starlette.testclient import TestClient
+
+from codejam.server import app
+from codejam.server.interfaces.message import Message
+from codejam.server.metrics import Counter, Histogram, format_labels
+
+
+def test_counter_and_histogram_render_text_format():
+    counter = Counter("test_total", "Test.", ("topic",))
+    counter.inc("DRAW")
+    counter.inc("DRAW", amount=2)
+    assert list(counter.render())[-1] == 'test_total{topic="DRAW"} 3'
+
+    histogram = Histogram("test_seconds", "Test.", buckets=(0.1, 1))
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value)
+    lines = list(histogram.render())
+    assert 'test_seconds_bucket{le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{le="1"} 2' in lines
+    assert 'test_seconds_bucket{le="+Inf"} 3' in lines
+    assert format_labels(("name",), ('a"b',)) == '{name="a\\"b"}'
+
+
+def test_metrics_endpoint(
+    test_client: str,
+    second_test_client: str,
+    game_creation_message: Message,
+    game_join_message: Message,
+):
+    client = TestClient(app)
+    with client.websocket_connect(f"/ws/{test_client}") as websocket:
+        websocket.send_json(game_creation_message.dict())
+        game_id = websocket.receive_json()["value"]["game_id"]
+        with client.websocket_connect(f"/ws/{second_test_client}") as websocket2:
+            game_join_message.game_id = game_id
+            websocket2.send_json(game_join_message.dict())
+            websocket2.receive_json()
+            websocket.send_text("{not json")
+            websocket.receive_json()
+
+            response = client.get("/metrics")
+    assert response.status_code == 200
+    text = response.text
+    assert "codejam_active_connections 2" in text
+    assert game_id not in text
+    assert 'codejam_game_history_bytes_bucket{le="1024"}' in text
+    assert "codejam_pending_draws 0" in text
+    assert "codejam_throttled_players 0" in text
+    assert 'codejam_messages_in_total{topic="GAME",operation="JOIN"}' in text
+    assert 'codejam_messages_out_total{topic="GAME",operation="JOIN"}' in text
+    assert 'codejam_rejected_messages_total{exception="InvalidFrame"}' in text
+    assert "codejam_broadcast_seconds_count" in text
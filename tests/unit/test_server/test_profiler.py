@@ -0,0 +1,37 @@
+import asyncio
+import time
+
+import pytest
+from starlette.testclient import TestClient
+
+from codejam.server import app
+from codejam.server.profiler import Profiler
+from codejam.server.settings import settings
+
+
+def busy_callback():
+    time.sleep(0.05)
+
+
+@pytest.mark.asyncio
+async def test_profile_reports_blocking_callbacks():
+    asyncio.get_running_loop().call_later(0.02, busy_callback)
+    result = await Profiler().profile(seconds=0.2, interval=0.002)
+    assert result["samples"] > 0
+    assert "test_profiler.py:busy_callback" in result["collapsed"]
+    assert result["loop_lag_ms"]["max"] >= 30
+    assert result["loop_lag_ms"]["samples"] > 0
+
+
+def test_profile_endpoint_is_admin_only(mocker):
+    client = TestClient(app)
+    assert client.get("/admin/profile").status_code == 404
+    mocker.patch.object(settings, "admin_token", "secret")
+    assert client.get("/admin/profile").status_code == 403
+    headers = {"X-Admin-Token": "secret"}
+    assert client.get("/admin/profile?seconds=0", headers=headers).status_code == 422
+    response = client.get("/admin/profile?seconds=0.05", headers=headers)
+    assert response.status_code == 200
+    assert set(response.json()) == {"duration", "samples", "collapsed", "loop_lag_ms"}
+    mocker.patch("codejam.server.application.profiler.running", True)
+    assert client.get("/admin/profile", headers=headers).status_code == 409
@@ -0,0 +1,72 @@
+from collections import deque
+
+from starlette.testclient import TestClient
+
+from codejam.server import app
+from codejam.server.application import router
+from codejam.server.interfaces.message import Message
+from codejam.server.rate_limit import RateLimiter, TokenBucket, supersedes
+
+
+def draw(line, colour=(0, 0, 0, 1)):
+    return {
+        "topic": {"type": "DRAW", "operation": "LINE"},
+        "game_id": "game",
+        "value": {"data": {"line": line, "colour": list(colour), "width": 2}},
+    }
+
+
+def test_token_bucket_allows_bursts_and_refills():
+    bucket = TokenBucket(rate=2, burst=3)
+    now = bucket.updated
+    assert [bucket.take(now=now) for _ in range(4)] == [True, True, True, False]
+    assert bucket.delay(now=now) == 0.5
+    assert bucket.take(now=now + 0.5)
+    bucket.take(now=now + 100)
+    assert bucket.tokens == 2
+
+
+def test_supersedes_only_continued_lines():
+    assert supersedes(draw([1, 1]), draw([1, 1, 2, 2]))
+    assert not supersedes(draw([1, 1]), draw([2, 2, 1, 1]))
+    assert not supersedes(draw([1, 1]), draw([1, 1, 2, 2], colour=(1, 1, 1, 1)))
+    assert not supersedes(draw([1, 1]), {"topic": None})
+
+
+def test_limiter_coalesces_and_bounds_deferred_draws(mocker):
+    limiter = RateLimiter(limits={"DRAW": (1, 1), "CHAT": (1, 1)}, max_pending=2)
+    user = mocker.MagicMock(buckets={}, pending_draws=deque())
+    assert limiter.allow(user=user, topic="CHAT")
+    assert not limiter.allow(user=user, topic="CHAT")
+    assert limiter.allow(user=user, topic="HEARTBEAT")
+    limiter.defer(user=user, data=draw([1, 1]))
+    limiter.defer(user=user, data=draw([1, 1, 2, 2]))
+    limiter.defer(user=user, data=draw([5, 5]))
+    limiter.defer(user=user, data=draw([7, 7]))
+    assert list(user.pending_draws) == [draw([5, 5]), draw([7, 7])]
+    assert limiter.stats() == {
+        "rate_limited_draw": 1,
+        "rate_limited_chat": 0,
+        "rate_coalesced_draw": 1,
+    }
+
+
+def test_router_throttles_messages(
+    mocker, test_client: str, test_data: Message, game_creation_message: Message
+):
+    mocker.patch.dict(router.limiter.limits, {"DRAW": (50, 1), "GAME": (0.01, 1)})
+    coalesced = router.limiter.coalesced
+    client = TestClient(app)
+    with client.websocket_connect(f"/ws/{test_client}") as websocket:
+        websocket.send_json(game_creation_message.dict())
+        test_data.game_id = websocket.receive_json()["value"]["game_id"]
+        for points in range(1, 4):
+            test_data.value.data.line = [1.0, 1.0] * points
+            websocket.send_json(test_data.dict())
+        assert websocket.receive_json()["value"]["data"]["line"] == [1.0, 1.0]
+        assert websocket.receive_json()["value"]["data"]["line"] == [1.0, 1.0] * 3
+        assert router.limiter.coalesced == coalesced + 1
+
+        websocket.send_json(game_creation_message.dict())
+        assert websocket.receive_json()["value"]["exception"] == "RateLimitExceeded"
+        assert client.get("/stats").json()["rate_limited_game"] >= 1
@@ -0,0 +1,101 @@
+import time
+
+import pytest
+from starlette.testclient import TestClient
+
+from codejam.server import app
+from codejam.server.connection_manager import ConnectionManager
+from codejam.server.models.user import User
+from codejam.server.reaper import Reaper
+
+
+def prepare_manager(mocker):
+    manager = ConnectionManager()
+    creator = User(username="creator", websocket=mocker.MagicMock(close=mocker.AsyncMock()))
+    manager.active_connections.append(creator)
+    return manager, creator
+
+
+@pytest.mark.asyncio
+async def test_reaping_empty_and_finished_games(mocker):
+    manager, creator = prepare_manager(mocker)
+    empty = manager.register_game(creator=creator)
+    finished = manager.register_game(creator=creator)
+    running = manager.register_game(creator=creator)
+    for game in (finished, running):
+        game.join(creator)
+    timer = mocker.MagicMock(done=mocker.MagicMock(return_value=False))
+    running.active_turn = timer
+    finished.finish()
+    finished.finished_at -= 10
+    empty.empty_since -= 10
+
+    reaper = Reaper(manager=manager, empty_game_ttl=5, finished_game_ttl=5)
+    assert reaper.stats()["pending_timers"] == 1
+    assert await reaper.reap() == {
+        "empty_games": 1,
+        "finished_games": 1,
+        "idle_connections": 0,
+        "detached_members": 0,
+    }
+    assert list(manager.active_games) == [running.secret]
+    assert creator.owned_games == [running]
+    assert finished.members == [] and finished.history == []
+
+    stats = reaper.stats()
+    assert stats["active_games"] == 1
+    assert stats["reaped_empty_games"] == stats["reaped_finished_games"] == 1
+    assert stats["rss_bytes"] > 0
+
+    manager.disconnect(user=creator)
+    timer.cancel.assert_called_once()
+    assert running.active_turn is None
+
+
+@pytest.mark.asyncio
+async def test_reaping_idle_connections(mocker):
+    manager, creator = prepare_manager(mocker)
+    game = manager.register_game(creator=creator)
+    for member in (creator, User(username="second"), User(username="third")):
+        game.join(member)
+    game.active = True
+    reaper = Reaper(manager=manager, idle_connection_ttl=5)
+    creator.last_seen = time.monotonic() - 10
+    assert (await reaper.reap())["idle_connections"] == 0
+    creator.last_heard = time.monotonic() - 10
+    assert (await reaper.reap())["idle_connections"] == 1
+    creator.websocket.close.assert_awaited_once_with(code=1001)
+    assert list(manager.active_games) == [game.secret]
+    assert manager.active_connections == [creator]
+
+
+@pytest.mark.asyncio
+async def test_reaping_detached_members(mocker):
+    manager, creator = prepare_manager(mocker)
+    player = User(username="player", websocket=mocker.MagicMock())
+    owner = User(username="owner", websocket=mocker.MagicMock())
+    game = manager.register_game(creator=creator)
+    other = manager.register_game(creator=owner)
+    for joined, members in ((game, (creator, player)), (other, (owner,))):
+        for member in members:
+            joined.join(member)
+        joined.active = True
+    game.detach(player)
+    manager.detach(game_id=other.secret, member=owner)
+    manager.disconnect(user=owner)
+    assert other.secret in manager.active_games
+
+    reaper = Reaper(manager=manager, resume_ttl=5)
+    assert (await reaper.reap())["detached_members"] == 0
+    player.detached_at -= 10
+    owner.detached_at -= 10
+    assert (await reaper.reap())["detached_members"] == 2
+    assert game.members == [creator]
+    assert list(manager.active_games) == [game.secret]
+
+
+def test_stats_endpoint():
+    with TestClient(app) as client:
+        response = client.get("/stats")
+    assert response.status_code == 200
+    assert response.json()["tasks"] > 0
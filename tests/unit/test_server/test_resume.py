@@ -0,0 +1,135 @@
+import pytest
+from starlette.testclient import TestClient
+
+from codejam.server import app
+from codejam.server.application import manager
+from codejam.server.connection_manager import ConnectionManager
+from codejam.server.controllers.game_controller import MASK, GameController
+from codejam.server.exceptions import NotEnoughPlayers, UserAlreadyExists
+from codejam.server.interfaces.game_message import GameMessage
+from codejam.server.interfaces.message import Message
+from codejam.server.interfaces.topics import GameOperations, Topic, TopicEnum, TrickOperations
+from codejam.server.models.game import Game, Turn
+from codejam.server.models.tricks_generator import TrickGenerator
+from codejam.server.models.user import User
+from tests.unit.test_server.test_bus import prepare_user
+
+
+def resume_message(username: str, game_id: str, resume_token: str, last_seq: int) -> dict:
+    return Message(
+        topic=Topic(type=TopicEnum.GAME, operation=GameOperations.RESUME),
+        username=username,
+        game_id=game_id,
+        value=GameMessage(
+            success=False, game_id=game_id, resume_token=resume_token, last_seq=last_seq
+        ),
+    ).dict()
+
+
+def test_resume_replays_only_missed_messages(
+    test_client: str, test_data: Message, game_creation_message: Message
+):
+    client = TestClient(app)
+    with client.websocket_connect(f"/ws/{test_client}") as websocket:
+        websocket.send_json(game_creation_message.dict())
+        created = Message(**websocket.receive_json())
+        game_id = created.value.game_id
+        resume_token = created.value.resume_token
+        game = manager.get_game(game_id=game_id)
+        game.active = True
+        test_data.game_id = game_id
+        for _ in range(3):
+            websocket.send_json(test_data.dict())
+            websocket.receive_json()
+
+    assert game_id in manager.active_games
+    assert game.members[0].detached_at is not None
+
+    with client.websocket_connect(f"/ws/{test_client}") as websocket:
+        websocket.send_json(resume_message(test_client, game_id, resume_token, last_seq=2))
+        resumed = Message(**websocket.receive_json())
+        assert resumed.topic.operation == GameOperations.RESUME.value
+        assert resumed.value.last_seq == 2
+        assert websocket.receive_json()["seq"] == 3
+        resume_token = resumed.value.resume_token
+
+    with client.websocket_connect(f"/ws/{test_client}") as websocket:
+        websocket.send_json(resume_message(test_client, game_id, "forged", last_seq=3))
+        assert websocket.receive_json()["value"]["exception"] == "ResumeFailed"
+
+    game.replay.popleft()
+    game.turns_history.append(Turn(turn_no=1, drawer=game.creator, duration=30, phrase="phrase"))
+    with client.websocket_connect(f"/ws/{test_client}") as websocket:
+        websocket.send_json(resume_message(test_client, game_id, resume_token, last_seq=0))
+        resumed = Message(**websocket.receive_json())
+        assert resumed.value.last_seq is None
+        assert [websocket.receive_json()["seq"] for _ in game.history] == [1, 2, 3]
+        assert websocket.receive_json()["value"]["turn"]["phrase"] == "phrase"
+        assert game.creator.websocket is not None
+        game.active = False
+    assert game_id not in manager.active_games
+
+
+def test_replay_since():
+    game = Game(creator=User(username="creator"))
+    assert game.replay_since(last_seq=0) == []
+    assert game.replay_since(last_seq=None) is None
+    assert game.replay_since(last_seq=1) is None
+
+
+@pytest.mark.asyncio
+async def test_drawer_detaching_mid_game(mocker):
+    mocker.patch("codejam.server.models.tricks_generator.asyncio.sleep", mocker.AsyncMock())
+    detached_manager = ConnectionManager()
+    players = [prepare_user(mocker, f"player{x}") for x in range(4)]
+    for player in players:
+        await detached_manager.connect(player)
+    game = detached_manager.register_game(creator=players[0])
+    for player in players:
+        game.join(player)
+    game.game_length = 100
+    game.active = True
+    controller = GameController(manager=detached_manager)
+
+    await controller.play_turn(game=game)
+    drawer = game.current_turn.drawer
+    last_seq = game.seq - 1
+    game.detach(drawer)
+    trick = TrickGenerator(game=game)
+    mocker.patch.object(trick, "generate_trick", return_value=TrickOperations.SNAIL)
+    await trick.release_the_kraken()
+    for _ in range(5):
+        await controller.play_turn(game=game)
+        assert game.current_turn.drawer is not drawer
+
+    missed = game.resume(User(username=drawer.username), drawer.resume_token, last_seq)
+    assert [x.value.turn.phrase for x in missed if x.value.turn] == [MASK] * 5
+
+    game.detach(game.current_turn.drawer)
+    game.detach(next(x for x in game.members if x.detached_at is None))
+    with pytest.raises(NotEnoughPlayers):
+        await controller.play_turn(game=game)
+
+
+@pytest.mark.asyncio
+async def test_resuming_player_replaces_stale_connection(mocker):
+    stale_manager = ConnectionManager()
+    stale = prepare_user(mocker, "player")
+    stale_websocket = stale.websocket
+    stale_websocket.close = mocker.AsyncMock()
+    await stale_manager.connect(stale)
+    game = stale_manager.register_game(creator=stale)
+    game.join(stale)
+    game.active = True
+
+    with pytest.raises(UserAlreadyExists):
+        await stale_manager.connect(prepare_user(mocker, "player"))
+    with pytest.raises(UserAlreadyExists):
+        await stale_manager.connect(prepare_user(mocker, "player"), resume_token="forged")
+
+    fresh = prepare_user(mocker, "player")
+    await stale_manager.connect(fresh, resume_token=stale.resume_token)
+    assert stale_manager.active_connections == [fresh]
+    stale_websocket.close.assert_awaited_once_with(code=1001)
+    assert game.resume(fresh, stale.resume_token, last_seq=game.seq) == []
+    assert game.members == [fresh]
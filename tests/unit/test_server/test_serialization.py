@@ -0,0 +1,31 @@
+import pytest
+
+from codejam import serialization
+from codejam.serialization import BACKENDS, JsonBackend, select_backend
+from codejam.server.interfaces.message import Message
+
+
+@pytest.mark.parametrize("name", list(BACKENDS))
+def test_backends_produce_same_data(name: str, test_data: Message):
+    backend = select_backend(name)
+    data = test_data.dict()
+    text = backend.dumps(data)
+    assert isinstance(text, str)
+    assert backend.loads(text) == data
+    assert backend.loads(text.encode()) == data
+    assert JsonBackend.loads(text) == data
+
+
+def test_select_backend(monkeypatch):
+    monkeypatch.setenv("CODEJAM_JSON", "json")
+    assert select_backend() is JsonBackend
+    monkeypatch.setenv("CODEJAM_JSON", "auto")
+    assert select_backend() is BACKENDS.get("orjson", JsonBackend)
+    with pytest.raises(ValueError):
+        select_backend("marshal")
+
+
+def test_message_uses_selected_backend(mocker, test_data: Message):
+    dumps = mocker.spy(serialization.backend, "dumps")
+    assert Message.parse_raw(test_data.json()) == test_data
+    dumps.assert_called_once()
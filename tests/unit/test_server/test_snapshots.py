@@ -0,0 +1,170 @@
+import asyncio
+
+import pytest
+from starlette.testclient import TestClient
+
+from codejam.server import app
+from codejam.server.application import manager
+from codejam.server.connection_manager import ConnectionManager
+from codejam.server.controllers.game_controller import GameController
+from codejam.server.interfaces.message import Message
+from codejam.server.models.game import Game
+from codejam.server.models.snapshots import SnapshotStore, compact_history
+from codejam.server.models.stroke import unpack
+from codejam.server.models.user import User
+
+
+def prepare_game() -> Game:
+    creator = User(username="creator")
+    game = Game(creator=creator)
+    players = [creator, User(username="second"), User(username="third")]
+    for player in players:
+        game.join(player)
+    game.active = True
+    game.turn()
+    game.win(players[1])
+    return game
+
+
+def test_compacting_history(test_data: Message, chat_message: Message):
+    first = test_data.copy(deep=True)
+    second = test_data.copy(deep=True)
+    second.value.draw_id = "second"
+    second.value.data.line = first.value.data.line + [5, 5]
+    other_colour = second.copy(deep=True)
+    other_colour.value.draw_id = "other"
+    other_colour.value.data.line = second.value.data.line + [6, 6]
+    other_colour.value.data.colour = [1, 1, 1, 1]
+
+    compacted = compact_history([first, first, chat_message, second, other_colour])
+    assert compacted == [chat_message, second, other_colour]
+
+
+@pytest.mark.asyncio
+async def test_history_is_written_incrementally(
+    mocker, tmp_path, test_data: Message, chat_message: Message
+):
+    path = str(tmp_path.joinpath("snapshots.sqlite3"))
+    store = SnapshotStore(path=path)
+    game = prepare_game()
+    games = {game.secret: game}
+    first = test_data.copy(deep=True)
+    game.history.extend([first, chat_message])
+    await store.save(games=games)
+
+    second = test_data.copy(deep=True)
+    second.value.draw_id = "second"
+    second.value.data.line = first.value.data.line + [5, 5]
+    game.history.append(second)
+    snapshot = mocker.spy(Game, "snapshot")
+    game.active = False
+    await store.save(games=games)
+    assert snapshot.call_args.kwargs == {"history_from": 2}
+    positions = store._connect().execute("SELECT position FROM history").fetchall()
+    assert positions == [(1,), (2,)]
+    await store.close()
+
+    restored_store = SnapshotStore(path=path)
+    (restored,) = await restored_store.load()
+    assert [unpack(x) for x in restored.history] == [chat_message, second]
+    restored.history.append(test_data.copy(update={"value": chat_message.value}))
+    restored.active = True
+    await restored_store.save(games={restored.secret: restored})
+    positions = restored_store._connect().execute("SELECT position FROM history").fetchall()
+    assert positions == [(1,), (2,), (3,)]
+    await restored_store.close()
+
+
+@pytest.mark.asyncio
+async def test_incremental_snapshots_and_recovery(tmp_path, test_data: Message):
+    path = str(tmp_path.joinpath("snapshots.sqlite3"))
+    store = SnapshotStore(path=path)
+    game = prepare_game()
+    test_data.game_id = game.secret
+    game.history.append(test_data)
+    games = {game.secret: game}
+
+    assert await store.save(games=games) == 1
+    assert await store.save(games=games) == 0
+    game.active = False
+    assert await store.save(games=games) == 1
+    await store.close()
+
+    restored_store = SnapshotStore(path=path)
+    restored = (await restored_store.load())[0]
+    assert restored.secret == game.secret
+    assert restored.game_length == game.game_length
+    assert [unpack(x) for x in restored.history] == [test_data]
+    assert restored.current_turn.phrase == game.current_turn.phrase
+    assert restored.current_turn.winner.username == "second"
+    assert [x.username for x in restored.members] == ["creator", "second", "third"]
+    assert all(x.detached_at is not None for x in restored.members)
+    assert restored.score == {"creator": 0, "second": 100, "third": 0}
+
+    creator = User(username="creator")
+    restored.join(creator)
+    restored.join(User(username="second"))
+    assert restored.creator is creator
+    assert creator.owned_games == [restored]
+    third = User(username="third")
+    resume_token = game.members[2].resume_token
+    assert restored.resume(new_member=third, resume_token=resume_token, last_seq=0) == []
+    assert restored.members == [third, creator, restored.members[2]]
+    assert restored.score == {"third": 0, "creator": 0, "second": 100}
+
+    assert await restored_store.save(games={}) == 0
+    assert await restored_store.load() == []
+    await restored_store.close()
+
+
+@pytest.mark.asyncio
+async def test_workers_sharing_store_load_only_released_games(tmp_path):
+    path = str(tmp_path.joinpath("snapshots.sqlite3"))
+    first, second = SnapshotStore(path=path), SnapshotStore(path=path)
+    first_game, second_game = prepare_game(), prepare_game()
+    await first.save(games={first_game.secret: first_game})
+    await second.save(games={second_game.secret: second_game})
+
+    restarted = SnapshotStore(path=path)
+    assert await restarted.load() == []
+    await second.save(games={})
+    await first.close(games={first_game.secret: first_game})
+    assert [x.secret for x in await restarted.load()] == [first_game.secret]
+    assert await SnapshotStore(path=path).load() == []
+    await restarted.close()
+    await second.close()
+
+
+@pytest.mark.asyncio
+async def test_periodic_snapshots(tmp_path):
+    store = SnapshotStore(path=str(tmp_path.joinpath("snapshots.sqlite3")), interval=0)
+    game = prepare_game()
+    store.start(games={game.secret: game})
+    await asyncio.sleep(0.1)
+    await store.close()
+    assert store._versions == {game.secret: game.version}
+
+
+@pytest.mark.asyncio
+async def test_resuming_interrupted_turn(mocker):
+    game = prepare_game()
+    game.current_turn.drawer = game.members[0]
+    controller = GameController(manager=ConnectionManager())
+    controller.resume_turn(game=game)
+    assert game.active_turn is not None
+    game.active_turn.cancel()
+
+    user = mocker.MagicMock(username="second", send_message=mocker.AsyncMock())
+    await controller.send_current_turn(game=game, user=user)
+    message = user.send_message.call_args.kwargs["message"]
+    assert message.value.turn.phrase == "*" * 10
+    assert 0 < message.value.turn.duration <= game.current_turn.duration
+
+
+def test_recovering_games_on_startup():
+    game = prepare_game()
+    game.active = False
+    asyncio.run(manager.snapshots.save(games={game.secret: game}))
+    with TestClient(app):
+        assert manager.active_games[game.secret].current_turn.turn_no == 1
+    manager.active_games.pop(game.secret)
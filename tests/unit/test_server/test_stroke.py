@@ -0,0 +1,36 @@
+from array import array
+
+import pytest
+
+from codejam.server.interfaces.message import Message
+from codejam.server.models.game import Game
+from codejam.server.models.stroke import Stroke, unpack
+from codejam.server.models.user import User
+
+
+def test_lines_are_packed_and_restored(test_data: Message, test_rect: Message):
+    test_data.seq = 7
+    stroke = Stroke.pack(test_data)
+    assert isinstance(stroke.points, array)
+    assert stroke.message() == test_data
+    assert stroke.message().json() == test_data.json()
+    assert stroke.dict() == test_data.dict()
+    assert list(stroke.dict()) == list(test_data.dict())
+    assert Stroke.pack(test_data.copy(deep=True)).colour is stroke.colour
+    assert Stroke.pack(test_rect) is test_rect
+    assert unpack(test_rect) is test_rect
+
+
+@pytest.mark.asyncio
+async def test_history_keeps_packed_strokes(mocker, test_data: Message, chat_message: Message):
+    creator = User(username="creator", websocket=mocker.MagicMock(send_text=mocker.AsyncMock()))
+    game = Game(creator=creator)
+    game.join(creator)
+    sent = await game.broadcast(message=test_data)
+    await game.broadcast(message=chat_message)
+    assert isinstance(game.history[0], Stroke)
+    assert game.replay_since(last_seq=0)[0] == sent
+
+    newcomer = User(username="newcomer", websocket=mocker.MagicMock(send_text=mocker.AsyncMock()))
+    await game.fill_history(new_member=newcomer)
+    assert newcomer.websocket.send_text.await_args_list[0].args[0] == sent.json()
@@ -0,0 +1,80 @@
+import json
+
+from starlette.testclient import TestClient
+
+from codejam.server import app
+from codejam.server.application import router
+from codejam.server.interfaces.message import Message
+from codejam.server.settings import settings
+from codejam.server.tracing import Tracer, current, span
+
+
+def test_spans_are_recorded_only_for_sampled_messages():
+    tracer = Tracer(sample_rate=0, keep=10)
+    assert tracer.start(username="player") is None
+    with span("decode"):
+        pass
+
+    tracer = Tracer(sample_rate=1, keep=10)
+    trace = tracer.start(username="player")
+    with span("decode"):
+        pass
+    tracer.finish(trace)
+    assert current.get() is None
+    with span("late"):
+        pass
+    assert [x[0] for x in trace.stages] == ["decode"]
+    assert tracer.slowest() == [trace.dict()]
+
+
+def test_traced_messages_are_exported_and_listed(
+    mocker,
+    tmp_path,
+    test_client: str,
+    second_test_client: str,
+    test_data: Message,
+    game_creation_message: Message,
+    game_join_message: Message,
+):
+    export = tmp_path / "traces.jsonl"
+    mocker.patch.object(router, "tracer", Tracer(sample_rate=1, export=str(export), keep=100))
+    client = TestClient(app)
+    with client.websocket_connect(f"/ws/{test_client}") as websocket:
+        websocket.send_json(game_creation_message.dict())
+        game_id = websocket.receive_json()["value"]["game_id"]
+        with client.websocket_connect(f"/ws/{second_test_client}") as websocket2:
+            game_join_message.game_id = game_id
+            websocket2.send_json(game_join_message.dict())
+            websocket2.receive_json()
+            websocket.receive_json()
+            test_data.game_id = game_id
+            websocket.send_json(test_data.dict())
+            websocket2.receive_json()
+            websocket.receive_json()
+
+    assert client.get("/debug/slowest").status_code == 404
+    mocker.patch.object(settings, "admin_token", "secret")
+    response = client.get("/debug/slowest", params={"limit": 100})
+    assert response.status_code == 403
+    traces = client.get(
+        "/debug/slowest", params={"limit": 100}, headers={"X-Admin-Token": "secret"}
+    ).json()
+    draw = next(x for x in traces if x["attributes"]["topic"] == "DRAW")
+    assert [x["name"] for x in draw["stages"]][:3] == ["decode", "validate", "history"]
+    assert "controller" in {x["name"] for x in draw["stages"]}
+    sends = [x["attributes"]["username"] for x in draw["stages"] if x["name"] == "send"]
+    assert sorted(sends) == ["client", "client2"]
+    router.tracer.close()
+    lines = [json.loads(x) for x in export.read_text().splitlines()]
+    assert len(lines) == len(traces)
+    spans = next(
+        x["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        for x in lines
+        if x["resourceSpans"][0]["scopeSpans"][0]["spans"][0]["name"] == "DRAW message"
+    )
+    assert all(x["parentSpanId"] == spans[0]["spanId"] for x in spans[1:])
+    send_spans = [x for x in spans if x["name"] == "send"]
+    assert sorted(x["attributes"][0]["value"]["stringValue"] for x in send_spans) == [
+        "client",
+        "client2",
+    ]
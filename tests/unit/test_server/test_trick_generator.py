@@ -55,7 +55,7 @@ async def test_releasing_the_kraken(mocker):
     game_mock = mocker.MagicMock(
         secret="secret",
         current_turn=mocker.MagicMock(
-            drawer=mocker.MagicMock(send_message=mocker.AsyncMock())
+            drawer=mocker.MagicMock(send_message=mocker.AsyncMock(), detached_at=None)
         ),
     )
     generator = TrickGenerator(game=game_mock)
@@ -71,3 +71,24 @@ async def test_releasing_the_kraken(mocker):
             ),
         )
     )
+
+
+@pytest.mark.asyncio
+async def test_pacman_is_broadcast_as_single_parametric_message(mocker):
+    mocker.patch(
+        "codejam.server.models.tricks_generator.TrickGenerator.generate_trick",
+        mocker.MagicMock(return_value=TrickOperations.PACMAN),
+    )
+    mocker.patch(
+        "codejam.server.models.tricks_generator.TrickGenerator.choose_delay",
+        mocker.MagicMock(return_value=0),
+    )
+    game_mock = mocker.MagicMock(secret="secret", broadcast=mocker.AsyncMock())
+    generator = TrickGenerator(game=game_mock)
+    await generator.release_the_kraken()
+    message = game_mock.broadcast.call_args.kwargs["message"]
+    assert message.topic.operation == TrickOperations.PACMAN.value
+    pacman = message.value.pacman
+    assert all(0 <= x <= 1 for x in pacman.origin)
+    assert pacman.direction in ("vertical", "horizontal")
+    game_mock.current_turn.drawer.send_message.assert_not_called()